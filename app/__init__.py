@@ -1,12 +1,14 @@
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import os
 from dotenv import load_dotenv
+from app.utils.db_routing import RoutingSession
 
 load_dotenv()
 
-db = SQLAlchemy()
+# Reads inside use_replica() go to the read replica bind when one is configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
 def create_app(config_name='development'):
@@ -22,10 +24,38 @@ def create_app(config_name='development'):
     from app.config import Config
     app.config.from_object(Config)
     
+    # Fast JSON encoding for API responses (orjson when installed)
+    from app.utils.json_provider import init_json_provider
+    init_json_provider(app)
+    
+    # Connection pool sizing, recycling, pre-ping and checkout metrics
+    from app.utils.db_pool import init_engine_options
+    init_engine_options(app)
+    
+    # Optional read replica bind
+    from app.utils.db_routing import init_replica
+    init_replica(app)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     
+    # Dashboard stats snapshot, kept current by ORM write listeners
+    from app.services.dashboard_service import DashboardService
+    DashboardService.init_app(app)
+    
+    # Cached public API responses, invalidated by ORM write listeners
+    from app.services.response_cache import ResponseCacheService
+    ResponseCacheService.init_app(app)
+    
+    # Related products index, kept current by ORM write listeners
+    from app.services.related_products import RelatedProductsService
+    RelatedProductsService.init_app(app)
+    
+    # Background WebP conversion of uploaded images
+    from app.services.image_service import ImageService
+    ImageService.init_app(app)
+    
     # Register blueprints (order doesn't matter since templates use unique names)
     from app.controllers.api import api_bp
     from app.controllers.frontend import frontend_bp
@@ -54,46 +84,15 @@ def create_app(config_name='development'):
     def uploaded_file(filename):
         """
         Serve uploaded files with automatic WebP fallback.
+        Missing responsive variants (<name>_w<width>.webp) fall back to the full image.
         If the requested file doesn't exist and it's an image file,
         try to serve the corresponding WebP version.
         If still not found, return a placeholder SVG image instead of 404.
+        Files are sent with strong ETags and long-lived immutable caching
+        (see UploadService).
         """
-        import os
-        from flask import Response
-        
-        upload_folder = app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, filename)
-        
-        # If file exists, serve it
-        if os.path.exists(file_path):
-            return send_from_directory(upload_folder, filename)
-        
-        # If file doesn't exist and it's an image file, try WebP fallback
-        image_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
-        file_ext = os.path.splitext(filename)[1].lower()
-        
-        if file_ext in image_extensions:
-            # Try to find corresponding WebP file
-            webp_filename = os.path.splitext(filename)[0] + '.webp'
-            webp_path = os.path.join(upload_folder, webp_filename)
-            
-            if os.path.exists(webp_path):
-                # Set proper content type for WebP
-                response = send_from_directory(upload_folder, webp_filename)
-                response.headers['Content-Type'] = 'image/webp'
-                return response
-            
-            # Image file not found - return placeholder SVG instead of 404
-            # This prevents browser from showing error page
-            placeholder_svg = '''<svg xmlns="http://www.w3.org/2000/svg" width="300" height="300">
-                <rect width="300" height="300" fill="#f0f0f0"/>
-                <text x="50%" y="50%" text-anchor="middle" dy=".3em" fill="#999" font-family="Arial" font-size="14">無圖片</text>
-            </svg>'''
-            return Response(placeholder_svg, mimetype='image/svg+xml')
-        
-        # Non-image file not found - return 404
-        from flask import abort
-        abort(404)
+        from app.services.upload_service import UploadService
+        return UploadService.serve(filename)
     
     # Helper function to handle errors
     def handle_error(error_code, error_title, error_message, error):
@@ -218,66 +217,41 @@ Sitemap: {request.url_root.rstrip('/')}/sitemap.xml
 """
         return Response(robots_content, mimetype='text/plain')
     
-    # SEO: sitemap.xml
+    # SEO: sitemap.xml (sitemap index) and its streamed shards
+    def sitemap_response(document):
+        """Stream a sitemap document, answering conditional GETs with 304"""
+        from flask import Response, request, stream_with_context
+        
+        response = Response(stream_with_context(document.body), mimetype='application/xml')
+        response.set_etag(document.etag)
+        if document.last_modified:
+            response.last_modified = document.last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config.get('SITEMAP_MAX_AGE', 3600)
+        return response.make_conditional(request)
+    
     @app.route('/sitemap.xml')
     def sitemap_xml():
-        """Generate sitemap.xml file"""
-        from flask import Response, url_for, request
-        from datetime import datetime
-        from app.utils.api_service import APIService
+        """Sitemap index pointing at the pages sitemap and product shards"""
+        from app.services.sitemap_service import SitemapService
+        return sitemap_response(SitemapService.index())
+    
+    @app.route('/sitemap-pages.xml')
+    def sitemap_pages():
+        """Sitemap of the homepage, product list and category pages"""
+        from app.services.sitemap_service import SitemapService
+        return sitemap_response(SitemapService.pages())
+    
+    @app.route('/sitemap-products-<int:shard>.xml')
+    def sitemap_products(shard):
+        """Sitemap of one product shard"""
+        from flask import abort
+        from app.services.sitemap_service import SitemapService
         
-        with app.app_context():
-            # Get all active products
-            products_response = APIService.get_products(is_active=True, per_page=1000)
-            products = products_response.get('data', []) if products_response.get('success') else []
-            
-            # Get all active categories
-            categories_response = APIService.get_categories(is_active=True)
-            categories = categories_response.get('data', []) if categories_response.get('success') else []
-            
-            sitemap = ['<?xml version="1.0" encoding="UTF-8"?>']
-            sitemap.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
-            
-            # Homepage
-            sitemap.append('  <url>')
-            sitemap.append(f'    <loc>{url_for("frontend.index", _external=True)}</loc>')
-            sitemap.append(f'    <lastmod>{datetime.now().strftime("%Y-%m-%d")}</lastmod>')
-            sitemap.append('    <changefreq>daily</changefreq>')
-            sitemap.append('    <priority>1.0</priority>')
-            sitemap.append('  </url>')
-            
-            # Product list page
-            sitemap.append('  <url>')
-            sitemap.append(f'    <loc>{url_for("frontend.product_list", _external=True)}</loc>')
-            sitemap.append(f'    <lastmod>{datetime.now().strftime("%Y-%m-%d")}</lastmod>')
-            sitemap.append('    <changefreq>daily</changefreq>')
-            sitemap.append('    <priority>0.8</priority>')
-            sitemap.append('  </url>')
-            
-            # Category pages
-            for category in categories:
-                sitemap.append('  <url>')
-                sitemap.append(f'    <loc>{url_for("frontend.product_list", category_id=category.get("id"), _external=True)}</loc>')
-                sitemap.append(f'    <lastmod>{datetime.now().strftime("%Y-%m-%d")}</lastmod>')
-                sitemap.append('    <changefreq>weekly</changefreq>')
-                sitemap.append('    <priority>0.7</priority>')
-                sitemap.append('  </url>')
-            
-            # Product detail pages
-            for product in products:
-                sitemap.append('  <url>')
-                if product.get('slug'):
-                    sitemap.append(f'    <loc>{url_for("frontend.product_detail", id=product.get("id"), slug=product.get("slug"), _external=True)}</loc>')
-                else:
-                    sitemap.append(f'    <loc>{url_for("frontend.product_detail", id=product.get("id"), _external=True)}</loc>')
-                sitemap.append(f'    <lastmod>{datetime.now().strftime("%Y-%m-%d")}</lastmod>')
-                sitemap.append('    <changefreq>weekly</changefreq>')
-                sitemap.append('    <priority>0.6</priority>')
-                sitemap.append('  </url>')
-            
-            sitemap.append('</urlset>')
-            
-            return Response('\n'.join(sitemap), mimetype='application/xml')
+        document = SitemapService.products(shard)
+        if document is None:
+            abort(404)
+        return sitemap_response(document)
     
     return app
 
@@ -18,10 +18,87 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = os.environ.get('FLASK_DEBUG') == 'True'
     
+    # Connection pool per process: persistent + overflow connections, wait for a free one (seconds),
+    # replace connections older than DB_POOL_RECYCLE seconds, and test connections on checkout
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # below MySQL wait_timeout and proxy idle timeouts
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    
+    # Read replica for read-only catalog and dashboard queries (full SQLAlchemy URI; unset: primary only).
+    # A visitor's reads stay on the primary for REPLICA_STICKY_SECONDS after they write
+    DB_REPLICA_URI = os.environ.get('DB_REPLICA_URI')
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    
     # File Upload Configuration
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16777216))  # 16MB
     
     # Allowed extensions for file uploads (will be converted to WebP)
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    
+    # Upload image processing: async (background process pool) or sync (in the request)
+    IMAGE_PROCESSING = os.environ.get('IMAGE_PROCESSING') or 'async'
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+    IMAGE_QUEUE_SIZE = int(os.environ.get('IMAGE_QUEUE_SIZE', 32))  # uploads beyond this are converted in the request
+    
+    # Serving /uploads: app (Flask sends the file), x-accel (nginx X-Accel-Redirect) or x-sendfile
+    UPLOADS_SERVE_MODE = os.environ.get('UPLOADS_SERVE_MODE') or 'app'
+    UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX') or '/protected-uploads/'  # nginx internal location
+    UPLOADS_MAX_AGE = int(os.environ.get('UPLOADS_MAX_AGE', 31536000))  # upload names are unique, so cache for a year
+    UPLOADS_NEGATIVE_CACHE_TTL = int(os.environ.get('UPLOADS_NEGATIVE_CACHE_TTL', 60))  # remember missing files (seconds)
+    
+    # Product Search Configuration
+    # auto: MySQL FULLTEXT on MySQL, in-process inverted index elsewhere
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND') or 'auto'  # auto, mysql, memory
+    SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 1000))  # memory: more matches fall back to substring matching
+    SEARCH_INDEX_TTL = int(os.environ.get('SEARCH_INDEX_TTL', 300))  # memory: rebuild at least this often (seconds) to pick up other processes' writes
+    
+    # Category tree cache lifetime in seconds (writes in this process invalidate it immediately)
+    CATEGORY_CACHE_TTL = int(os.environ.get('CATEGORY_CACHE_TTL', 300))
+    
+    # Related products index rebuild interval in seconds (orders and product writes in this process update it immediately)
+    RELATED_PRODUCTS_TTL = int(os.environ.get('RELATED_PRODUCTS_TTL', 3600))
+    RELATED_PRODUCTS_CARDS_SIZE = int(os.environ.get('RELATED_PRODUCTS_CARDS_SIZE', 1000))  # in-process LRU of serialized cards
+    
+    # Dashboard stats snapshot lifetime in seconds (ORM writes update it incrementally in between)
+    DASHBOARD_STATS_TTL = int(os.environ.get('DASHBOARD_STATS_TTL', 60))
+    
+    # Sitemap: URLs per product shard (max 50000), rows per query, and HTTP cache lifetime
+    SITEMAP_URLS_PER_SHARD = int(os.environ.get('SITEMAP_URLS_PER_SHARD', 50000))
+    SITEMAP_CHUNK_SIZE = int(os.environ.get('SITEMAP_CHUNK_SIZE', 1000))
+    SITEMAP_MAX_AGE = int(os.environ.get('SITEMAP_MAX_AGE', 3600))
+    
+    # Streaming exports: rows per database fetch and per response chunk
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+    
+    # Bulk product import: rows per batch, image download/convert workers and download timeout (seconds)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+    IMPORT_IMAGE_WORKERS = int(os.environ.get('IMPORT_IMAGE_WORKERS', 4))
+    IMPORT_IMAGE_TIMEOUT = int(os.environ.get('IMPORT_IMAGE_TIMEOUT', 15))
+    IMPORT_FOLDER = os.environ.get('IMPORT_FOLDER')  # uploaded import files and job status; defaults to instance/imports
+    
+    # Response cache for anonymous catalog API GETs (products, categories, banners)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))  # bounds staleness across processes without Redis
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1000))  # in-process LRU entries
+    RESPONSE_CACHE_MAX_AGE = int(os.environ.get('RESPONSE_CACHE_MAX_AGE', 60))  # Cache-Control max-age for browsers/CDNs
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL')  # e.g. redis://localhost:6379/0 (needs the redis package)
+    
+    # Homepage fragment cache (banners, featured products); writes invalidate it via the response cache tags
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', 'true').lower() == 'true'
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 300))  # re-render at least this often (seconds)
+    
+    # JSON encoder for API responses: auto (orjson when installed), orjson or stdlib
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'auto'
+    
+    # Cart storage: database (cart_lines table), sqlite (separate file), memory (per process) or session (cookie)
+    CART_STORE = os.environ.get('CART_STORE') or 'database'
+    CART_TTL = int(os.environ.get('CART_TTL', 14 * 86400))  # carts without writes for this long are purged (seconds)
+    CART_MAX_CARTS = int(os.environ.get('CART_MAX_CARTS', 10000))  # memory backend: least recently used carts beyond this are evicted
+    CART_SQLITE_PATH = os.environ.get('CART_SQLITE_PATH')  # sqlite backend; defaults to instance/carts.db
+    
+    # Stock reservation at checkout: conditional (batched guarded UPDATE) or lock (SELECT ... FOR UPDATE)
+    STOCK_RESERVATION_STRATEGY = os.environ.get('STOCK_RESERVATION_STRATEGY') or 'conditional'
 
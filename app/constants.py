@@ -27,20 +27,84 @@ SORT_NEWEST = 'newest'
 SORT_PRICE_ASC = 'price_asc'
 SORT_PRICE_DESC = 'price_desc'
 SORT_NAME = 'name'
+SORT_RELEVANCE = 'relevance'  # Only meaningful together with a search term
 
 SORT_OPTIONS = {
     SORT_NEWEST: 'Newest',
     SORT_PRICE_ASC: 'Price: Low to High',
     SORT_PRICE_DESC: 'Price: High to Low',
     SORT_NAME: 'Name',
+    SORT_RELEVANCE: 'Relevance',
 }
 
+# Admin product list sorting (adds stock sorts) and page sizes
+SORT_STOCK_ASC = 'stock_asc'
+SORT_STOCK_DESC = 'stock_desc'
+
+ADMIN_PRODUCT_SORT_OPTIONS = {
+    SORT_NEWEST: '最新上架',
+    SORT_PRICE_ASC: '價格低到高',
+    SORT_PRICE_DESC: '價格高到低',
+    SORT_NAME: '名稱',
+    SORT_STOCK_ASC: '庫存少到多',
+    SORT_STOCK_DESC: '庫存多到少',
+}
+
+ADMIN_PER_PAGE_OPTIONS = [10, 25, 50, 100]
+ADMIN_PER_PAGE_DEFAULT = 25
+
+# Stock Reservation Strategies
+STOCK_STRATEGY_CONDITIONAL = 'conditional'  # Guarded batch UPDATE ... WHERE stock >= qty
+STOCK_STRATEGY_LOCK = 'lock'                # SELECT ... FOR UPDATE in id order, then UPDATE
+
+STOCK_STRATEGIES = [STOCK_STRATEGY_CONDITIONAL, STOCK_STRATEGY_LOCK]
+
+# Bulk cart operations (PATCH /api/v1/cart)
+CART_OP_ADD = 'add'        # Increase the line quantity (creates the line)
+CART_OP_SET = 'set'        # Set the line quantity; 0 removes the line
+CART_OP_REMOVE = 'remove'  # Remove the line
+
+CART_OPERATIONS = [CART_OP_ADD, CART_OP_SET, CART_OP_REMOVE]
+CART_MAX_OPERATIONS = 100
+CART_UPDATE_ATTEMPTS = 3  # PATCH /cart re-applies operations this often when a concurrent request changed the cart
+
+# Co-purchase recommendations (build_recommendations.py)
+RECOMMENDATION_TOP_K = 20            # Neighbours stored per product
+RECOMMENDATION_CHUNK_SIZE = 10000    # Order lines read per query
+RECOMMENDATION_MAX_ORDER_SIZE = 100  # Orders with more distinct products are skipped
+RECOMMENDATION_DEFAULT_LIMIT = 8     # Products returned by the API by default
+
+# Data exports (CSV / JSONL)
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_JSONL = 'jsonl'
+
+EXPORT_FORMATS = [EXPORT_FORMAT_CSV, EXPORT_FORMAT_JSONL]
+EXPORT_ENTITIES = ['orders', 'products', 'users']
+
+# Bulk product import (import_products.py, admin import)
+IMPORT_FORMAT_CSV = 'csv'
+IMPORT_FORMAT_JSONL = 'jsonl'
+
+IMPORT_FORMATS = [IMPORT_FORMAT_CSV, IMPORT_FORMAT_JSONL]
+IMPORT_MAX_ERRORS = 100  # Row errors kept in the import report
+
+# Responsive image variant widths (px), generated for every uploaded image
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+
 # Pagination
 PRODUCTS_PER_PAGE_FRONTEND = 12
 PRODUCTS_PER_PAGE_ADMIN = 20
 ORDERS_PER_PAGE_ADMIN = 20
 USERS_PER_PAGE_ADMIN = 20
 
+# Total count modes for paginated lists
+COUNT_EXACT = 'exact'        # COUNT(*) over the whole filtered set
+COUNT_ESTIMATE = 'estimate'  # Bounded count, capped at COUNT_ESTIMATE_CAP
+COUNT_NONE = 'none'          # Skip counting entirely
+
+COUNT_MODES = [COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE]
+COUNT_ESTIMATE_CAP = 10000
+
 # Flash Message Categories
 FLASH_SUCCESS = 'success'
 FLASH_ERROR = 'danger'
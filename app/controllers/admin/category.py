@@ -8,6 +8,7 @@ from app.utils.decorators import login_required
 from app.models import Category
 from app import db
 from app.utils.helpers import save_uploaded_file, delete_file, slugify
+from app.services.category_service import CategoryService
 from typing import Optional
 
 @backend_bp.route('/categories')
@@ -73,6 +74,7 @@ def create_category():
             
             db.session.add(category)
             db.session.commit()
+            CategoryService.invalidate()
             flash('分類建立成功', 'success')
             return redirect(url_for('backend.categories'))
             
@@ -145,6 +147,7 @@ def edit_category(id):
                         category.image = image_path
             
             db.session.commit()
+            CategoryService.invalidate()
             flash('分類更新成功', 'success')
             return redirect(url_for('backend.categories'))
             
@@ -189,6 +192,7 @@ def delete_category(id):
         
         db.session.delete(category)
         db.session.commit()
+        CategoryService.invalidate()
         flash('分類刪除成功', 'success')
     except Exception as e:
         db.session.rollback()
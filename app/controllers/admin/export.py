@@ -0,0 +1,34 @@
+"""
+Data export controller for backend admin panel.
+Streams CSV / JSONL downloads without loading the rows into memory.
+"""
+from flask import request, redirect, url_for, flash, abort
+from app.controllers.admin import backend_bp
+from app.utils.decorators import admin_required
+from app.services.export_service import ExportService
+from app.constants import EXPORT_ENTITIES, EXPORT_FORMATS, EXPORT_FORMAT_CSV
+
+@backend_bp.route('/exports/<entity>')
+@admin_required
+def export_data(entity):
+    """
+    Download orders, products or users.
+    
+    Args:
+        entity: orders, products or users
+    
+    Query params: format (csv, jsonl) plus the filters of
+    GET /api/v1/exports/<entity>.
+    """
+    if entity not in EXPORT_ENTITIES:
+        abort(404)
+    
+    fmt = request.args.get('format', EXPORT_FORMAT_CSV).strip().lower()
+    filters, error = ExportService.parse_filters(request.args)
+    if fmt not in EXPORT_FORMATS:
+        error = '不支援的匯出格式'
+    if error:
+        flash(error, 'danger')
+        return redirect(url_for(f'backend.{entity}'))
+    
+    return ExportService.response(entity, fmt, filters)
@@ -5,8 +5,15 @@ Optimized queries to prevent N+1 problems.
 from flask import render_template, request, redirect, url_for, flash
 from app.controllers.admin import backend_bp
 from app.utils.decorators import login_required
+from datetime import datetime, timedelta
 from app.models import Order, OrderItem
 from app import db
+from app.services.export_service import ExportService, ExportFilters
+from app.services.dashboard_service import DashboardService
+from app.utils.pagination import ORDER_SORT_KEYS, paginate_keyset, query_args
+from app.constants import (SORT_NEWEST, COUNT_NONE, COUNT_ESTIMATE, ORDER_STATUS_PENDING, ADMIN_PER_PAGE_OPTIONS,
+                           ADMIN_PER_PAGE_DEFAULT)
+from sqlalchemy import or_
 from sqlalchemy.orm import joinedload
 
 @backend_bp.route('/orders')
@@ -15,16 +22,71 @@ def orders():
     """
     Order management list.
     
+    Query params:
+        status: Order status
+        date_from, date_to: Ordered between these dates, inclusive (YYYY-MM-DD)
+        customer: Shipping name or phone contains
+        order_number: Order number starts with
+        per_page: Rows per page (10, 25, 50, 100)
+        cursor: Keyset cursor of the page to show
+    
     Optimizations:
-    - Eager loads order items to prevent N+1 queries when displaying order data
+    - Keyset pagination on (created_at, id), served by the created_at indexes
+    - Selects only the listed columns; order items are not loaded
+    - Total from the dashboard snapshot when unfiltered or filtered by
+      pending status only, otherwise a bounded count estimate
     """
-    # Eager load order items to prevent N+1 queries
-    orders = db.session.query(Order)\
-        .options(joinedload(Order.items))\
-        .order_by(Order.created_at.desc())\
-        .all()
+    parsed, error = ExportService.parse_filters(request.args)
+    if error:
+        flash(error, 'danger')
+        parsed = ExportFilters()
+    filters = {
+        'status': parsed.status or '',
+        'date_from': parsed.date_from.isoformat() if parsed.date_from else '',
+        'date_to': parsed.date_to.isoformat() if parsed.date_to else '',
+        'customer': request.args.get('customer', '').strip(),
+        'order_number': request.args.get('order_number', '').strip().upper(),
+        'per_page': request.args.get('per_page', ADMIN_PER_PAGE_DEFAULT, type=int),
+    }
+    if filters['per_page'] not in ADMIN_PER_PAGE_OPTIONS:
+        filters['per_page'] = ADMIN_PER_PAGE_DEFAULT
+    
+    query = db.session.query(
+        Order.id, Order.order_number, Order.shipping_name, Order.shipping_phone,
+        Order.total_amount, Order.status, Order.created_at
+    )
+    if parsed.status:
+        query = query.filter(Order.status == parsed.status)
+    if parsed.date_from:
+        query = query.filter(Order.created_at >= datetime.combine(parsed.date_from, datetime.min.time()))
+    if parsed.date_to:
+        query = query.filter(Order.created_at < datetime.combine(parsed.date_to + timedelta(days=1),
+                                                                 datetime.min.time()))
+    if filters['customer']:
+        query = query.filter(or_(Order.shipping_name.contains(filters['customer'], autoescape=True),
+                                 Order.shipping_phone.contains(filters['customer'], autoescape=True)))
+    if filters['order_number']:
+        # Prefix match can use the unique order_number index
+        query = query.filter(Order.order_number.startswith(filters['order_number'], autoescape=True))
+    
+    # Counters the dashboard snapshot already keeps
+    snapshot_key = None
+    if not any(filters[key] for key in ('date_from', 'date_to', 'customer', 'order_number')):
+        snapshot_key = {'': 'total_orders', ORDER_STATUS_PENDING: 'pending_orders'}.get(filters['status'])
+    
+    try:
+        pagination = paginate_keyset(query, filters['per_page'], SORT_NEWEST, ORDER_SORT_KEYS,
+                                     cursor=request.args.get('cursor'),
+                                     count=COUNT_NONE if snapshot_key else COUNT_ESTIMATE)
+    except ValueError:
+        flash('無效的分頁游標，已回到第一頁', 'warning')
+        return redirect(url_for('backend.orders', **query_args(filters)))
+    if snapshot_key:
+        pagination.total = DashboardService.get_stats()[snapshot_key]
     
-    return render_template('orders/list.html', orders=orders)
+    return render_template('orders/list.html', orders=pagination.items, pagination=pagination,
+                           filters=filters, query_args=query_args(filters),
+                           per_page_options=ADMIN_PER_PAGE_OPTIONS)
 
 @backend_bp.route('/orders/<int:id>')
 @login_required
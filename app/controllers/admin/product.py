@@ -2,34 +2,88 @@
 Product management controller for backend admin panel.
 Optimized queries to prevent N+1 problems.
 """
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, session
 from app.controllers.admin import backend_bp
-from app.utils.decorators import login_required
+from app.utils.decorators import login_required, admin_required
 from app.models import Product, Category
 from app import db
 from app.utils.helpers import save_uploaded_file, delete_file, slugify
-from sqlalchemy.orm import joinedload
+from app.services.search_service import SearchService
+from app.services.product_import import ProductImportService, JOB_DONE, JOB_FAILED
+from app.services.category_service import CategoryService
+from app.utils.pagination import ADMIN_PRODUCT_SORT_KEYS, paginate_keyset, query_args
+from app.constants import (SORT_NEWEST, COUNT_ESTIMATE, ADMIN_PRODUCT_SORT_OPTIONS, ADMIN_PER_PAGE_OPTIONS,
+                           ADMIN_PER_PAGE_DEFAULT)
 from typing import Optional, List
 
+# Flask session key: this admin's background import jobs not reported yet
+IMPORT_JOBS_KEY = 'product_import_jobs'
+
 @backend_bp.route('/products')
 @login_required
 def products():
     """
     Product management list.
     
+    Query params:
+        q: Name contains
+        category_id: Category ID (including its subcategories)
+        status: active or inactive
+        stock_min, stock_max: Stock range, inclusive
+        sort: newest, price_asc, price_desc, name, stock_asc, stock_desc
+        per_page: Rows per page (10, 25, 50, 100)
+        cursor: Keyset cursor of the page to show
+    
     Optimizations:
-    - Eager loads category relationship to prevent N+1 queries
+    - Keyset pagination: every page is an index seek plus LIMIT, no OFFSET
+    - Selects only the listed columns (no ORM objects, descriptions or images)
+    - Total is a bounded count estimate; categories come from the cached tree
     """
-    # Eager load category to prevent N+1 queries
-    products = db.session.query(Product)\
-        .options(joinedload(Product.category))\
-        .order_by(Product.created_at.desc())\
-        .all()
+    filters = {
+        'q': request.args.get('q', '').strip(),
+        'category_id': request.args.get('category_id', type=int),
+        'status': request.args.get('status', ''),
+        'stock_min': request.args.get('stock_min', type=int),
+        'stock_max': request.args.get('stock_max', type=int),
+        'sort': request.args.get('sort', SORT_NEWEST),
+        'per_page': request.args.get('per_page', ADMIN_PER_PAGE_DEFAULT, type=int),
+    }
+    if filters['sort'] not in ADMIN_PRODUCT_SORT_KEYS:
+        filters['sort'] = SORT_NEWEST
+    if filters['per_page'] not in ADMIN_PER_PAGE_OPTIONS:
+        filters['per_page'] = ADMIN_PER_PAGE_DEFAULT
     
-    # Categories for filter dropdown
-    categories = Category.query.all()
+    _flash_finished_imports()
+    tree = CategoryService.get_tree()
+    query = db.session.query(
+        Product.id, Product.name, Product.price, Product.stock, Product.is_active,
+        Product.created_at, Category.name.label('category_name')
+    ).outerjoin(Category, Category.id == Product.category_id)
     
-    return render_template('products/list.html', products=products, categories=categories)
+    if filters['q']:
+        query = query.filter(Product.name.contains(filters['q'], autoescape=True))
+    if filters['category_id']:
+        category_ids = [filters['category_id']] + tree.descendant_ids(filters['category_id'])
+        query = query.filter(Product.category_id.in_(category_ids))
+    if filters['status'] in ('active', 'inactive'):
+        query = query.filter(Product.is_active == (filters['status'] == 'active'))
+    if filters['stock_min'] is not None:
+        query = query.filter(Product.stock >= filters['stock_min'])
+    if filters['stock_max'] is not None:
+        query = query.filter(Product.stock <= filters['stock_max'])
+    
+    try:
+        pagination = paginate_keyset(query, filters['per_page'], filters['sort'],
+                                     ADMIN_PRODUCT_SORT_KEYS[filters['sort']],
+                                     cursor=request.args.get('cursor'), count=COUNT_ESTIMATE)
+    except ValueError:
+        flash('無效的分頁游標，已回到第一頁', 'warning')
+        return redirect(url_for('backend.products', **query_args(filters)))
+    
+    return render_template('products/list.html', products=pagination.items, pagination=pagination,
+                           filters=filters, query_args=query_args(filters),
+                           categories=tree.list_categories(),
+                           sort_options=ADMIN_PRODUCT_SORT_OPTIONS, per_page_options=ADMIN_PER_PAGE_OPTIONS)
 
 @backend_bp.route('/products/create', methods=['GET', 'POST'])
 @login_required
@@ -82,6 +136,7 @@ def create_product():
             
             db.session.add(product)
             db.session.commit()
+            SearchService.index_product(product)
             flash('產品建立成功', 'success')
             return redirect(url_for('backend.products'))
             
@@ -142,6 +197,7 @@ def edit_product(id):
             product.set_images(images)
             
             db.session.commit()
+            SearchService.index_product(product)
             flash('產品更新成功', 'success')
             return redirect(url_for('backend.products'))
             
@@ -175,6 +231,7 @@ def delete_product(id):
         
         db.session.delete(product)
         db.session.commit()
+        SearchService.remove_product(id)
         flash('產品刪除成功', 'success')
     except Exception as e:
         db.session.rollback()
@@ -183,6 +240,56 @@ def delete_product(id):
     return redirect(url_for('backend.products'))
 
 
+@backend_bp.route('/products/import', methods=['POST'])
+@admin_required
+def import_products():
+    """
+    Bulk import products from an uploaded CSV or JSONL file in the background.
+    
+    Images must be http(s) URLs. See import_products.py for the columns.
+    The summary is shown on the product list once the import has finished.
+    
+    Returns:
+        Redirects to product list
+    """
+    file = request.files.get('file')
+    fmt = ProductImportService.format_for(file.filename) if file else None
+    if fmt is None:
+        flash('請上傳 CSV 或 JSONL 檔案', 'danger')
+        return redirect(url_for('backend.products'))
+    
+    job = ProductImportService.start_job(file, fmt)
+    session.setdefault(IMPORT_JOBS_KEY, []).append(job['id'])
+    session.modified = True
+    
+    flash('產品匯入已在背景開始，完成後重新整理頁面即可查看結果', 'info')
+    return redirect(url_for('backend.products'))
+
+
+def _flash_finished_imports() -> None:
+    """Flash the summary of this admin's background imports that have finished."""
+    job_ids = session.get(IMPORT_JOBS_KEY)
+    if not job_ids:
+        return
+    pending = []
+    for job_id in job_ids:
+        job = ProductImportService.get_job(job_id)
+        if job is None:
+            continue
+        if job['status'] == JOB_FAILED:
+            flash(f"產品匯入失敗: {job['error']}", 'danger')
+        elif job['status'] == JOB_DONE:
+            report = job['report']
+            flash(f"匯入完成：共 {report['total']} 筆，新增 {report['inserted']} 筆，更新 {report['updated']} 筆，"
+                  f"失敗 {report['failed']} 筆（{report['rows_per_second']:.0f} 筆/秒）",
+                  'success' if not report['failed'] and not report['image_failures'] else 'warning')
+            for error in report['errors'][:10]:
+                flash(f"第 {error['line']} 行：{error['message']}", 'danger')
+        else:
+            pending.append(job_id)
+    session[IMPORT_JOBS_KEY] = pending
+
+
 def _process_image_uploads(folder: str) -> List[str]:
     """
     Process uploaded image files.
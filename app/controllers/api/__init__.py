@@ -11,4 +11,6 @@ from app.controllers.api import orders
 from app.controllers.api import banners
 from app.controllers.api import dashboard
 from app.controllers.api import cart
-
+from app.controllers.api import uploads
+from app.controllers.api import exports
+from app.controllers.api import system
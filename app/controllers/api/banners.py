@@ -5,11 +5,15 @@ from flask import request
 from app.controllers.api import api_bp
 from app.utils.api_auth import api_login_required
 from app.utils.api_response import success_response, error_response
+from app.utils.db_routing import use_replica
 from app.models import Banner
 from app import db
 from app.utils.helpers import save_uploaded_file, delete_file
+from app.services.response_cache import ResponseCacheService, TAG_BANNERS
 
 @api_bp.route('/banners', methods=['GET'])
+@ResponseCacheService.cached([TAG_BANNERS])
+@use_replica()
 def get_banners():
     """
     Get list of banners.
@@ -42,6 +46,7 @@ def get_banners():
     return success_response(banners_data)
 
 @api_bp.route('/banners/<int:banner_id>', methods=['GET'])
+@ResponseCacheService.cached([TAG_BANNERS])
 def get_banner(banner_id):
     """
     Get banner by ID.
@@ -1,11 +1,15 @@
 """
 Cart API endpoints for frontend.
 """
-from flask import request, session
+from flask import request
 from app.controllers.api import api_bp
 from app.utils.api_response import success_response, error_response
 from app.models import Product
 from app.services.cart_service import CartService
+from app.utils.api_service import APIService
+from app.services.recommendation_service import RecommendationService
+from app.constants import (CART_OPERATIONS, CART_OP_ADD, CART_OP_REMOVE, CART_MAX_OPERATIONS,
+                           RECOMMENDATION_DEFAULT_LIMIT, RECOMMENDATION_TOP_K)
 
 @api_bp.route('/cart', methods=['GET'])
 def get_cart():
@@ -15,16 +19,84 @@ def get_cart():
     Returns:
         JSON response with cart items and total
     """
-    cart_items = CartService.get_cart_items()
-    total = CartService.calculate_total(cart_items)
+    # Serialized by APIService (cart items hold Product objects)
+    cart_response = APIService.get_cart()
+    return success_response(cart_response.get('data'))
+
+@api_bp.route('/cart/recommendations', methods=['GET'])
+def get_cart_recommendations():
+    """
+    Get products customers also bought with the products in the cart.
+    
+    Query params:
+        limit: Number of products (default: 8, max: 20)
+    
+    Returns:
+        JSON response with product cards (cart products excluded)
+    """
+    limit = min(max(request.args.get('limit', RECOMMENDATION_DEFAULT_LIMIT, type=int), 1), RECOMMENDATION_TOP_K)
+    product_ids = [int(product_key) for product_key in CartService.get_cart()]
     
-    cart_data = {
-        'items': cart_items,
-        'total': float(total),
-        'item_count': len(cart_items)
-    }
+    return success_response(RecommendationService.get_for_products(product_ids, limit))
+
+@api_bp.route('/cart', methods=['PATCH'])
+def patch_cart():
+    """
+    Apply several cart operations at once.
     
-    return success_response(cart_data)
+    Operations are applied in order and atomically: if any of them fails,
+    the cart is left unchanged and the per-operation results are returned
+    in errors.operations.
+    
+    Request body:
+        {
+            "operations": [
+                {"op": "add", "product_id": int, "quantity": int (default: 1)},
+                {"op": "set", "product_id": int, "quantity": int (0 removes)},
+                {"op": "remove", "product_id": int}
+            ]
+        }
+    
+    Returns:
+        JSON response with per-operation results and the updated cart
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    
+    if not isinstance(operations, list) or not operations:
+        return error_response('操作列表不能為空', 400)
+    if len(operations) > CART_MAX_OPERATIONS:
+        return error_response(f'一次最多{CART_MAX_OPERATIONS}個操作', 400)
+    
+    parsed = []
+    errors = {}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors[str(index)] = '操作格式錯誤'
+            continue
+        op = operation.get('op')
+        product_id = operation.get('product_id')
+        quantity = operation.get('quantity', 0 if op == CART_OP_REMOVE else 1)
+        if op not in CART_OPERATIONS:
+            errors[str(index)] = '不支援的操作'
+        elif not isinstance(product_id, int) or isinstance(product_id, bool) or product_id <= 0:
+            errors[str(index)] = '產品ID無效'
+        elif not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0 \
+                or (quantity == 0 and op == CART_OP_ADD):
+            errors[str(index)] = '數量無效'
+        else:
+            parsed.append({'op': op, 'product_id': product_id, 'quantity': quantity})
+    
+    if errors:
+        return error_response('操作格式錯誤', 400, errors)
+    
+    success, results = CartService.apply_operations(parsed)
+    
+    if not success:
+        return error_response('購物車更新失敗，未做任何變更', 409, {'operations': results})
+    
+    cart_response = APIService.get_cart()
+    return success_response({'operations': results, 'cart': cart_response.get('data')}, '購物車已更新')
 
 @api_bp.route('/cart/add', methods=['POST'])
 def add_to_cart():
@@ -5,11 +5,16 @@ from flask import request
 from app.controllers.api import api_bp
 from app.utils.api_auth import api_login_required
 from app.utils.api_response import success_response, error_response
+from app.utils.db_routing import use_replica
 from app.models import Category
 from app import db
 from app.utils.helpers import save_uploaded_file, delete_file, slugify
+from app.services.category_service import CategoryService
+from app.services.response_cache import ResponseCacheService, TAG_CATEGORIES
 
 @api_bp.route('/categories', methods=['GET'])
+@ResponseCacheService.cached([TAG_CATEGORIES])
+@use_replica()
 def get_categories():
     """
     Get list of categories.
@@ -24,33 +29,16 @@ def get_categories():
     parent_id = request.args.get('parent_id', type=int)
     is_active = request.args.get('is_active', type=bool)
     
-    query = Category.query
-    
-    if parent_id is not None:
-        query = query.filter_by(parent_id=parent_id)
-    if is_active is not None:
-        query = query.filter_by(is_active=is_active)
-    
-    categories = query.order_by(Category.sort_order, Category.id).all()
-    
-    categories_data = []
-    for category in categories:
-        categories_data.append({
-            'id': category.id,
-            'name': category.name,
-            'slug': category.slug,
-            'parent_id': category.parent_id,
-            'parent_name': category.parent.name if category.parent else None,
-            'description': category.description,
-            'image': category.image,
-            'sort_order': category.sort_order,
-            'is_active': category.is_active,
-            'children_count': len(category.children) if category.children else 0
-        })
+    # Served from the cached category tree
+    categories_data = CategoryService.get_tree().list_categories(
+        parent_id=parent_id,
+        is_active=is_active
+    )
     
     return success_response(categories_data)
 
 @api_bp.route('/categories/<int:category_id>', methods=['GET'])
+@ResponseCacheService.cached([TAG_CATEGORIES])
 def get_category(category_id):
     """
     Get category by ID.
@@ -123,6 +111,7 @@ def create_category():
         
         db.session.add(category)
         db.session.commit()
+        CategoryService.invalidate()
         
         category_data = {
             'id': category.id,
@@ -188,6 +177,7 @@ def update_category(category_id):
                     category.image = image_path
         
         db.session.commit()
+        CategoryService.invalidate()
         
         category_data = {
             'id': category.id,
@@ -230,6 +220,7 @@ def delete_category(category_id):
         
         db.session.delete(category)
         db.session.commit()
+        CategoryService.invalidate()
         return success_response(None, '分類刪除成功')
     except Exception as e:
         db.session.rollback()
@@ -5,29 +5,28 @@ from flask import request
 from app.controllers.api import api_bp
 from app.utils.api_auth import api_login_required
 from app.utils.api_response import success_response
-from app.models import User, Product, Order, Category, Banner
+from app.utils.db_routing import use_replica
+from app.models import Order
 from app import db
 from sqlalchemy.orm import joinedload
 from app.models import OrderItem
+from app.services.dashboard_service import DashboardService
 
 @api_bp.route('/dashboard/stats', methods=['GET'])
 @api_login_required
+@use_replica()
 def get_dashboard_stats():
     """
     Get dashboard statistics.
     
+    Query params:
+        refresh: Set to 1 to recompute the snapshot instead of serving it
+    
     Returns:
-        JSON response with dashboard statistics
+        JSON response with dashboard statistics and snapshot freshness
     """
-    stats = {
-        'total_users': User.query.count(),
-        'total_products': Product.query.count(),
-        'total_orders': Order.query.count(),
-        'total_categories': Category.query.count(),
-        'total_banners': Banner.query.count(),
-        'pending_orders': Order.query.filter_by(status='pending').count(),
-        'active_products': Product.query.filter_by(is_active=True).count(),
-    }
+    max_age = 0 if request.args.get('refresh', type=int) == 1 else None
+    stats = DashboardService.get_stats(max_age=max_age)
     return success_response(stats)
 
 @api_bp.route('/dashboard/recent-orders', methods=['GET'])
@@ -58,9 +57,9 @@ def get_recent_orders():
         orders_data.append({
             'id': order.id,
             'order_number': order.order_number,
-            'total_amount': float(order.total_amount),
+            'total_amount': order.total_amount,
             'status': order.status,
-            'created_at': order.created_at.isoformat(),
+            'created_at': order.created_at,
             'shipping_name': order.shipping_name
         })
     
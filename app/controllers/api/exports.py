@@ -0,0 +1,43 @@
+"""
+Export API endpoints (admin only).
+"""
+from flask import request
+from app.controllers.api import api_bp
+from app.utils.api_auth import api_admin_required
+from app.utils.api_response import error_response
+from app.services.export_service import ExportService
+from app.constants import EXPORT_ENTITIES, EXPORT_FORMATS, EXPORT_FORMAT_CSV
+
+@api_bp.route('/exports/<entity>', methods=['GET'])
+@api_admin_required
+def export_data(entity):
+    """
+    Stream an export of orders, products or users.
+    
+    Args:
+        entity: orders, products or users
+    
+    Query params:
+        format: csv or jsonl (default: csv)
+        status: Order status (orders)
+        date_from: Created on or after this date, YYYY-MM-DD
+        date_to: Created on or before this date, YYYY-MM-DD
+        category_id: Category ID (products)
+        is_active: Active status (products)
+        role: User role (users)
+    
+    Returns:
+        Streamed CSV or JSONL download
+    """
+    if entity not in EXPORT_ENTITIES:
+        return error_response('不支援的匯出類型', 404)
+    
+    fmt = request.args.get('format', EXPORT_FORMAT_CSV).strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        return error_response('不支援的匯出格式', 400)
+    
+    filters, error = ExportService.parse_filters(request.args)
+    if error:
+        return error_response(error, 400)
+    
+    return ExportService.response(entity, fmt, filters)
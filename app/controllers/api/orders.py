@@ -42,13 +42,13 @@ def get_orders():
         orders_data.append({
             'id': order.id,
             'order_number': order.order_number,
-            'total_amount': float(order.total_amount),
+            'total_amount': order.total_amount,
             'status': order.status,
             'shipping_name': order.shipping_name,
             'shipping_phone': order.shipping_phone,
             'shipping_email': order.shipping_email,
             'shipping_address': order.shipping_address,
-            'created_at': order.created_at.isoformat()
+            'created_at': order.created_at
         })
     
     return paginated_response(
@@ -98,9 +98,9 @@ def create_order():
     order_data = {
         'id': order.id,
         'order_number': order.order_number,
-        'total_amount': float(order.total_amount),
+        'total_amount': order.total_amount,
         'status': order.status,
-        'created_at': order.created_at.isoformat()
+        'created_at': order.created_at
     }
     
     return success_response(order_data, '訂單建立成功', 201)
@@ -133,14 +133,14 @@ def get_order(order_id):
             'product_id': item.product_id,
             'product_name': item.product.name if item.product else 'N/A',
             'quantity': item.quantity,
-            'price': float(item.price),
-            'subtotal': float(item.get_subtotal())
+            'price': item.price,
+            'subtotal': item.get_subtotal()
         })
     
     order_data = {
         'id': order.id,
         'order_number': order.order_number,
-        'total_amount': float(order.total_amount),
+        'total_amount': order.total_amount,
         'status': order.status,
         'shipping_name': order.shipping_name,
         'shipping_phone': order.shipping_phone,
@@ -148,8 +148,8 @@ def get_order(order_id):
         'shipping_address': order.shipping_address,
         'notes': order.notes,
         'items': items_data,
-        'created_at': order.created_at.isoformat(),
-        'updated_at': order.updated_at.isoformat()
+        'created_at': order.created_at,
+        'updated_at': order.updated_at
     }
     return success_response(order_data)
 
@@ -3,15 +3,24 @@ Products API endpoints.
 """
 from flask import request
 from app.controllers.api import api_bp
-from app.utils.api_auth import api_login_required
+from app.utils.api_auth import api_login_required, api_admin_required
 from app.utils.api_response import success_response, error_response, paginated_response
+from app.utils.db_routing import use_replica
 from app.models import Product, Category
 from app import db
 from app.utils.helpers import save_uploaded_file, delete_file, slugify
-from sqlalchemy.orm import joinedload
+from app.utils.serializers import PROJECTION_LIST, PROJECTION_DETAIL, product_load_options, serialize_product, serialize_products
+from app.utils.pagination import PRODUCT_SORT_KEYS, paginate_offset, paginate_keyset
+from app.services.search_service import SearchService
+from app.services.response_cache import ResponseCacheService, TAG_PRODUCTS, TAG_PRODUCTS_BULK, TAG_CATEGORIES, TAG_RECOMMENDATIONS, product_tag
+from app.services.recommendation_service import RecommendationService
+from app.services.product_import import ProductImportService
+from app.constants import SORT_NEWEST, SORT_RELEVANCE, COUNT_EXACT, COUNT_NONE, COUNT_MODES, RECOMMENDATION_DEFAULT_LIMIT, RECOMMENDATION_TOP_K
 from typing import List
 
 @api_bp.route('/products', methods=['GET'])
+@ResponseCacheService.cached([TAG_PRODUCTS, TAG_CATEGORIES])
+@use_replica()
 def get_products():
     """
     Get list of products.
@@ -20,8 +29,14 @@ def get_products():
         page: Page number (default: 1)
         per_page: Items per page (default: 20)
         category_id: Filter by category ID
-        search: Search in product name
+        search: Full-text search in product name and description
         is_active: Filter by active status
+        sort: Sort option (newest, price_asc, price_desc, name, relevance;
+            default: relevance when searching, newest otherwise)
+        cursor: Keyset cursor from a previous page; pass an empty value to
+            start cursor pagination (page is then ignored)
+        count: Total count mode (exact, estimate, none); defaults to exact
+            for page numbers and none for cursor pagination
     
     Returns:
         JSON response with paginated products list
@@ -31,41 +46,51 @@ def get_products():
     category_id = request.args.get('category_id', type=int)
     search = request.args.get('search', '').strip()
     is_active = request.args.get('is_active', type=bool)
+    sort = request.args.get('sort') or (SORT_RELEVANCE if search else SORT_NEWEST)
+    cursor = request.args.get('cursor')
+    count = request.args.get('count', COUNT_NONE if cursor is not None else COUNT_EXACT)
     
-    query = db.session.query(Product).options(joinedload(Product.category))
+    if count not in COUNT_MODES:
+        return error_response('無效的計數模式', 400)
+    
+    query = db.session.query(Product).options(*product_load_options(PROJECTION_LIST))
     
     if category_id:
         query = query.filter_by(category_id=category_id)
-    if search:
-        query = query.filter(Product.name.contains(search))
     if is_active is not None:
         query = query.filter_by(is_active=is_active)
+    if search:
+        query, relevance = SearchService.apply(query, search, category_id=category_id)
     
-    pagination = query.order_by(Product.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    if search and sort == SORT_RELEVANCE:
+        # Ranked results are paged by number; cursors need plain columns
+        sort_keys = ((relevance, 'desc'), (Product.id, 'desc'))
+        pagination = paginate_offset(query, page, per_page, SORT_RELEVANCE, sort_keys,
+                                     count=count, with_cursors=False)
+    else:
+        if sort not in PRODUCT_SORT_KEYS:
+            sort = SORT_NEWEST
+        sort_keys = PRODUCT_SORT_KEYS[sort]
+        
+        if cursor is not None:
+            try:
+                pagination = paginate_keyset(query, per_page, sort, sort_keys,
+                                             cursor=cursor, count=count)
+            except ValueError:
+                return error_response('無效的分頁游標', 400)
+        else:
+            pagination = paginate_offset(query, page, per_page, sort, sort_keys,
+                                         count=count)
     
-    products_data = []
-    for product in pagination.items:
-        products_data.append({
-            'id': product.id,
-            'name': product.name,
-            'slug': product.slug,
-            'description': product.description,
-            'price': float(product.price),
-            'stock': product.stock,
-            'category_id': product.category_id,
-            'category_name': product.category.name if product.category else None,
-            'images': product.get_images(),
-            'is_active': product.is_active,
-            'created_at': product.created_at.isoformat()
-        })
+    products_data = serialize_products(pagination.items, PROJECTION_LIST)
     
     return paginated_response(
-        products_data, page, per_page, pagination.total, '產品列表'
+        products_data, pagination.page, per_page, pagination.total, '產品列表',
+        cursors=pagination.cursor_info()
     )
 
 @api_bp.route('/products/<int:product_id>', methods=['GET'])
+@ResponseCacheService.cached(lambda product_id: [product_tag(product_id), TAG_PRODUCTS_BULK, TAG_CATEGORIES])
 def get_product(product_id):
     """
     Get product by ID.
@@ -77,24 +102,30 @@ def get_product(product_id):
         JSON response with product data
     """
     product = db.session.query(Product)\
-        .options(joinedload(Product.category))\
+        .options(*product_load_options(PROJECTION_DETAIL))\
         .get_or_404(product_id)
     
-    product_data = {
-        'id': product.id,
-        'name': product.name,
-        'slug': product.slug,
-        'description': product.description,
-        'price': float(product.price),
-        'stock': product.stock,
-        'category_id': product.category_id,
-        'category_name': product.category.name if product.category else None,
-        'images': product.get_images(),
-        'is_active': product.is_active,
-        'created_at': product.created_at.isoformat(),
-        'updated_at': product.updated_at.isoformat()
-    }
-    return success_response(product_data)
+    return success_response(serialize_product(product, PROJECTION_DETAIL))
+
+@api_bp.route('/products/<int:product_id>/recommendations', methods=['GET'])
+@ResponseCacheService.cached([TAG_RECOMMENDATIONS, TAG_PRODUCTS])
+def get_product_recommendations(product_id):
+    """
+    Get products customers also bought with a product.
+    
+    Served from the precomputed co-purchase neighbours
+    (see build_recommendations.py).
+    
+    Query params:
+        limit: Number of products (default: 8, max: 20)
+    
+    Returns:
+        JSON response with product cards, most often bought together first
+    """
+    limit = min(max(request.args.get('limit', RECOMMENDATION_DEFAULT_LIMIT, type=int), 1), RECOMMENDATION_TOP_K)
+    db.session.query(Product.id).filter(Product.id == product_id).first_or_404()
+    
+    return success_response(RecommendationService.get_for_product(product_id, limit))
 
 @api_bp.route('/products', methods=['POST'])
 @api_login_required
@@ -153,12 +184,13 @@ def create_product():
         
         db.session.add(product)
         db.session.commit()
+        SearchService.index_product(product)
         
         product_data = {
             'id': product.id,
             'name': product.name,
             'slug': product.slug,
-            'price': float(product.price),
+            'price': product.price,
             'stock': product.stock,
             'images': product.get_images()
         }
@@ -168,6 +200,47 @@ def create_product():
         db.session.rollback()
         return error_response(f'建立產品失敗: {str(e)}', 400)
 
+@api_bp.route('/products/import', methods=['POST'])
+@api_admin_required
+def import_products():
+    """
+    Bulk import products from a CSV or JSONL file in the background (admin only).
+    
+    Request body (multipart/form-data):
+        file: .csv or .jsonl file (name, price, category required; slug,
+            description, stock, is_active, images optional)
+        batch_size: Rows per batch (optional)
+    
+    Returns:
+        JSON response with the queued job (202); poll GET /products/import/<job_id>
+    """
+    file = request.files.get('file')
+    fmt = ProductImportService.format_for(file.filename) if file else None
+    if fmt is None:
+        return error_response('請上傳 CSV 或 JSONL 檔案', 400)
+    
+    batch_size = request.form.get('batch_size', type=int)
+    job = ProductImportService.start_job(file, fmt, batch_size=batch_size)
+    
+    return success_response(job, '產品匯入已開始', 202)
+
+@api_bp.route('/products/import/<job_id>', methods=['GET'])
+@api_admin_required
+def get_import_job(job_id):
+    """
+    Get the status and report of a background product import (admin only).
+    
+    Args:
+        job_id: Job ID returned by POST /products/import
+    
+    Returns:
+        JSON response with the job status and (partial) report
+    """
+    job = ProductImportService.get_job(job_id)
+    if job is None:
+        return error_response('找不到匯入工作', 404)
+    return success_response(job)
+
 @api_bp.route('/products/<int:product_id>', methods=['PUT'])
 @api_login_required
 def update_product(product_id):
@@ -226,11 +299,12 @@ def update_product(product_id):
         product.set_images(images)
         
         db.session.commit()
+        SearchService.index_product(product)
         
         product_data = {
             'id': product.id,
             'name': product.name,
-            'price': float(product.price),
+            'price': product.price,
             'stock': product.stock,
             'images': product.get_images()
         }
@@ -261,6 +335,7 @@ def delete_product(product_id):
         
         db.session.delete(product)
         db.session.commit()
+        SearchService.remove_product(product_id)
         return success_response(None, '產品刪除成功')
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,24 @@
+"""
+System status API endpoints (admin only).
+"""
+from app.controllers.api import api_bp
+from app.utils.api_auth import api_admin_required
+from app.utils.api_response import success_response
+from app.utils.db_pool import pool_status
+from app.utils.db_routing import REPLICA_BIND
+from app import db
+
+@api_bp.route('/system/db-pool', methods=['GET'])
+@api_admin_required
+def get_db_pool_status():
+    """
+    Get this worker process's database connection pool status.
+    
+    Returns:
+        JSON response with pool settings, current usage and checkout wait
+        metrics (the read replica's pool under 'replica' when configured)
+    """
+    status = pool_status(db.engine)
+    if REPLICA_BIND in db.engines:
+        status['replica'] = pool_status(db.engines[REPLICA_BIND])
+    return success_response(status)
@@ -0,0 +1,32 @@
+"""
+Uploads API endpoints.
+"""
+import re
+from app.controllers.api import api_bp
+from app.utils.api_auth import api_login_required
+from app.utils.api_response import success_response, error_response
+from app.services.image_service import ImageService
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+@api_bp.route('/uploads/jobs/<job_id>', methods=['GET'])
+@api_login_required
+def get_upload_job(job_id):
+    """
+    Get the status of a background image conversion.
+    
+    Args:
+        job_id: Job ID (the uuid part of the uploaded file name)
+    
+    Returns:
+        JSON response with job status and the current stored path
+    """
+    if not JOB_ID_RE.match(job_id):
+        return error_response('無效的任務ID', 400)
+    
+    job = ImageService.get_status(job_id)
+    if job is None:
+        return error_response('任務不存在', 404)
+    
+    job['queue'] = ImageService.get_pipeline().stats()
+    return success_response(job)
@@ -36,7 +36,7 @@ def get_users():
             'username': user.username,
             'email': user.email,
             'role': user.role,
-            'created_at': user.created_at.isoformat()
+            'created_at': user.created_at
         })
     
     return paginated_response(
@@ -61,8 +61,8 @@ def get_user(user_id):
         'username': user.username,
         'email': user.email,
         'role': user.role,
-        'created_at': user.created_at.isoformat(),
-        'updated_at': user.updated_at.isoformat()
+        'created_at': user.created_at,
+        'updated_at': user.updated_at
     }
     return success_response(user_data)
 
@@ -4,6 +4,7 @@ Includes context processor for global template variables.
 """
 from flask import Blueprint
 from app.utils.api_service import APIService
+from app.services.cart_service import CartService
 
 frontend_bp = Blueprint('frontend', __name__, template_folder='../../views/frontend')
 
@@ -12,6 +13,8 @@ def inject_categories():
     """
     Context processor to inject categories into all templates.
     This avoids duplicate API calls across different pages.
+    Categories come from the cached category tree, so a cache hit costs
+    no database queries.
     """
     categories_response = APIService.get_categories(
         parent_id=None,
@@ -20,4 +23,12 @@ def inject_categories():
     categories_data = categories_response.get('data', []) if categories_response.get('success') else []
     return dict(global_categories=categories_data)
 
+@frontend_bp.context_processor
+def inject_cart():
+    """
+    Context processor to inject the cart lines for the header mini cart.
+    Visitors without a cart token cost no store lookup.
+    """
+    return dict(cart_lines=CartService.get_cart())
+
 from app.controllers.frontend import home, product, cart, contact
@@ -5,30 +5,42 @@ Uses API service layer exclusively (all data from API).
 from flask import render_template
 from app.controllers.frontend import frontend_bp
 from app.utils.api_service import APIService
+from app.services.fragment_cache import FragmentCacheService
+from app.services.response_cache import TAG_BANNERS, TAG_PRODUCTS
 
 @frontend_bp.route('/')
 def index():
     """
     Homepage.
     
-    Uses API service layer to fetch all data (banners, products).
-    Categories are provided via context processor.
+    The banner and featured product sections are rendered from the API
+    service layer and kept in the fragment cache until banners or products
+    change, so most visits make no queries for them.
+    Categories are provided via context processor (cached category tree).
     """
-    # Fetch data using API service
+    banners_html = FragmentCacheService.render('home:banners', [TAG_BANNERS], render_banners)
+    featured_products_html = FragmentCacheService.render(
+        'home:featured_products', [TAG_PRODUCTS], render_featured_products
+    )
+    
+    return render_template('home/index.html',
+                         banners_html=banners_html,
+                         featured_products_html=featured_products_html)
+
+def render_banners() -> str:
+    """Render the homepage banner carousel."""
     banners_response = APIService.get_banners(is_active=True)
+    banners_data = banners_response.get('data', []) if banners_response.get('success') else []
+    return render_template('home/banners.html', banners=banners_data)
+
+def render_featured_products() -> str:
+    """Render the newest 8 active products."""
     products_response = APIService.get_products(
         page=1,
         per_page=8,
         is_active=True,
-        sort='newest'
+        sort='newest',
+        count='none'
     )
-    
-    # Extract data from responses
-    banners_data = banners_response.get('data', []) if banners_response.get('success') else []
     featured_products_data = products_response.get('data', []) if products_response.get('success') else []
-    
-    # Categories are available via context processor as 'global_categories'
-    # Pass API data directly to template (no database queries)
-    return render_template('home/index.html', 
-                         banners=banners_data, 
-                         featured_products=featured_products_data)
+    return render_template('home/featured_products.html', featured_products=featured_products_data)
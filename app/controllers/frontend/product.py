@@ -2,9 +2,10 @@
 Frontend product controller.
 Uses API service layer exclusively (all data from API).
 """
-from flask import render_template, request, abort
+from flask import render_template, request, abort, redirect, url_for
 from app.controllers.frontend import frontend_bp
 from app.utils.api_service import APIService
+from app.constants import SORT_NEWEST, SORT_RELEVANCE, COUNT_EXACT, COUNT_ESTIMATE
 
 @frontend_bp.route('/products')
 def product_list():
@@ -17,20 +18,30 @@ def product_list():
     page = request.args.get('page', 1, type=int)
     category_id = request.args.get('category_id', type=int)
     search = request.args.get('search', '').strip()
-    sort = request.args.get('sort', 'newest')  # newest, price_asc, price_desc, name
+    # newest, price_asc, price_desc, name, relevance (default when searching)
+    sort = request.args.get('sort') or (SORT_RELEVANCE if search else SORT_NEWEST)
+    cursor = request.args.get('cursor') or None  # Set by Previous/Next links
     
     # Fetch products using API service
     # Categories are available via context processor as 'global_categories'
+    # Previous/Next navigation uses keyset cursors with a bounded count,
+    # so paging deep into the catalog never issues large OFFSET scans
     products_response = APIService.get_products(
         page=page,
         per_page=12,
         category_id=category_id,
         search=search,
         is_active=True,
-        sort=sort
+        sort=sort,
+        cursor=cursor,
+        count=COUNT_ESTIMATE if cursor else COUNT_EXACT
     )
     
     if not products_response.get('success'):
+        if cursor:
+            # Stale or tampered cursor - fall back to the first page
+            return redirect(url_for('frontend.product_list', category_id=category_id,
+                                    search=search or None, sort=sort))
         abort(500)
     
     products_data = products_response.get('data', [])
@@ -38,16 +49,21 @@ def product_list():
     
     # Create pagination-like object for template
     class Pagination:
-        def __init__(self, items, page, per_page, total, pages):
+        def __init__(self, items, page, per_page, total, pages,
+                     has_prev=None, has_next=None, prev_cursor=None,
+                     next_cursor=None, total_is_estimate=False):
             self.items = items
             self.page = page
             self.per_page = per_page
-            self.total = total
-            self.pages = pages
-            self.has_prev = page > 1
-            self.has_next = page < pages
-            self.prev_num = page - 1 if page > 1 else None
-            self.next_num = page + 1 if page < pages else None
+            self.total = total or 0
+            self.pages = pages or 0
+            self.has_prev = page > 1 if has_prev is None else has_prev
+            self.has_next = page < self.pages if has_next is None else has_next
+            self.prev_num = page - 1 if self.has_prev else None
+            self.next_num = page + 1 if self.has_next else None
+            self.prev_cursor = prev_cursor
+            self.next_cursor = next_cursor
+            self.total_is_estimate = total_is_estimate
         
         def iter_pages(self, left_edge=2, right_edge=2, left_current=2, right_current=2):
             """
@@ -67,6 +83,11 @@ def product_list():
             if last == 0:
                 return
             
+            # The last page of a capped estimate isn't real - don't link to it
+            if self.total_is_estimate:
+                right_edge = 0
+                last = max(last, self.page)
+            
             # Calculate the range of pages to show around current page
             left_start = max(1, self.page - left_current)
             right_end = min(last, self.page + right_current)
@@ -96,7 +117,12 @@ def product_list():
         page=pagination_info.get('page', 1),
         per_page=pagination_info.get('per_page', 12),
         total=pagination_info.get('total', 0),
-        pages=pagination_info.get('pages', 0)
+        pages=pagination_info.get('pages', 0),
+        has_prev=pagination_info.get('has_prev'),
+        has_next=pagination_info.get('has_next'),
+        prev_cursor=pagination_info.get('prev_cursor'),
+        next_cursor=pagination_info.get('next_cursor'),
+        total_is_estimate=pagination_info.get('total_is_estimate', False)
     )
     
     return render_template('product/list.html', 
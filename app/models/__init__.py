@@ -3,6 +3,8 @@ from app.models.category import Category
 from app.models.product import Product
 from app.models.order import Order, OrderItem
 from app.models.banner import Banner
+from app.models.cart import CartLine
+from app.models.recommendation import ProductRecommendation
 
-__all__ = ['User', 'Category', 'Product', 'Order', 'OrderItem', 'Banner']
+__all__ = ['User', 'Category', 'Product', 'Order', 'OrderItem', 'Banner', 'CartLine', 'ProductRecommendation']
 
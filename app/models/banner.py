@@ -15,6 +15,11 @@ class Banner(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Active banners in display order (homepage carousel)
+        db.Index('ix_banners_active_sort', 'is_active', 'sort_order'),
+    )
+    
     def __repr__(self):
         return f'<Banner {self.title}>'
 
@@ -0,0 +1,17 @@
+from app import db
+from datetime import datetime
+
+class CartLine(db.Model):
+    """Server-side cart line, keyed by the cart token kept in the session"""
+    __tablename__ = 'cart_lines'
+    
+    token = db.Column(db.String(64), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Numeric(10, 2), nullable=False)  # Price when added
+    name = db.Column(db.String(200), nullable=False)
+    image = db.Column(db.String(255), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<CartLine {self.token}:{self.product_id}>'
@@ -25,19 +25,15 @@ class Category(db.Model):
         return f'<Category {self.name}>'
     
     def get_all_children(self):
-        """Get all descendant categories recursively"""
-        children = []
-        for child in self.children:
-            children.append(child)
-            children.extend(child.get_all_children())
-        return children
+        """Get all descendant categories (resolved from the cached category tree)"""
+        from app.services.category_service import CategoryService
+        descendant_ids = CategoryService.get_tree().descendant_ids(self.id)
+        return CategoryService.load_categories(descendant_ids)
     
     def get_path(self):
-        """Get category path as list"""
-        path = [self]
-        parent = self.parent
-        while parent:
-            path.insert(0, parent)
-            parent = parent.parent
-        return path
+        """Get category path as list (resolved from the cached category tree)"""
+        from app.services.category_service import CategoryService
+        path_ids = CategoryService.get_tree().path_ids(self.id)
+        ancestors = CategoryService.load_categories(path_ids[:-1])
+        return ancestors + [self]
 
@@ -22,6 +22,12 @@ class Order(db.Model):
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Order lists by date, optionally filtered by status (admin, API, dashboard, exports)
+        db.Index('ix_orders_status_created', 'status', 'created_at'),
+        db.Index('ix_orders_created', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<Order {self.order_number}>'
     
@@ -47,6 +53,12 @@ class OrderItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False)  # Price at time of order
     
+    __table_args__ = (
+        # Items of an order, and orders containing a product (co-purchases)
+        db.Index('ix_order_items_order_id', 'order_id'),
+        db.Index('ix_order_items_product_order', 'product_id', 'order_id'),
+    )
+    
     def __repr__(self):
         return f'<OrderItem {self.id}>'
     
@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime
 import json
+from app.utils.images import NO_IMAGE_PATH, parse_images
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -20,17 +21,25 @@ class Product(db.Model):
     # Relationships
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
     
+    __table_args__ = (
+        # Catalog listings: active products, optionally in one category, by date or price
+        db.Index('ix_products_active_created', 'is_active', 'created_at', 'id'),
+        db.Index('ix_products_active_category_created', 'is_active', 'category_id', 'created_at', 'id'),
+        db.Index('ix_products_active_price', 'is_active', 'price', 'id'),
+        db.Index('ix_products_active_category_price', 'is_active', 'category_id', 'price', 'id'),
+        # Admin list: all products newest first
+        db.Index('ix_products_created', 'created_at', 'id'),
+        # Full-text search index (MySQL only, ngram parser for CJK names)
+        db.Index('ft_products_name_description', 'name', 'description',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
+    
     def __repr__(self):
         return f'<Product {self.name}>'
     
     def get_images(self):
         """Parse images JSON string to list"""
-        if self.images:
-            try:
-                return json.loads(self.images)
-            except:
-                return []
-        return []
+        return list(parse_images(self.images).paths)
     
     def set_images(self, image_list):
         """Set images as JSON string"""
@@ -38,8 +47,16 @@ class Product(db.Model):
     
     def get_main_image(self):
         """Get first image or default"""
-        images = self.get_images()
-        return images[0] if images else '/static/images/no-image.png'
+        paths = parse_images(self.images).paths
+        return paths[0] if paths else NO_IMAGE_PATH
+    
+    def get_image_variants(self):
+        """Responsive variant paths for each image, keyed by width"""
+        return [dict(variants) for variants in parse_images(self.images).variants]
+    
+    def get_main_image_srcset(self):
+        """srcset value for the main image, or None without images"""
+        return parse_images(self.images).main_srcset
     
     def is_in_stock(self):
         """Check if product is in stock"""
@@ -0,0 +1,15 @@
+from app import db
+from datetime import datetime
+
+class ProductRecommendation(db.Model):
+    """Precomputed "customers also bought" neighbour of a product"""
+    __tablename__ = 'product_recommendations'
+    
+    product_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 1 = most often bought together
+    recommended_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Integer, nullable=False)  # Orders containing both products
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<ProductRecommendation {self.product_id}#{self.rank}:{self.recommended_id}>'
@@ -15,6 +15,11 @@ class User(db.Model):
     # Relationships
     orders = db.relationship('Order', backref='user', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # User lists, newest first (admin, API)
+        db.Index('ix_users_created_at', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<User {self.username}>'
     
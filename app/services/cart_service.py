@@ -1,25 +1,61 @@
 """
 Cart service for handling shopping cart operations
+
+Cart lines are kept in a server-side store (see app.services.cart_store);
+the session only holds the cart token.
 """
-from typing import List, Dict, Tuple, Optional
-from flask import session
+import secrets
+from typing import Any, List, Dict, Tuple, Optional
+from flask import session, g, current_app
 from app.models import Product
+from app import db
+from app.constants import CART_OP_ADD, CART_OP_SET, CART_OP_REMOVE, CART_UPDATE_ATTEMPTS
+from app.services.cart_store import CART_STORE_SESSION, CartConflict, CartStore, create_cart_store
 from decimal import Decimal
 
 
 class CartService:
     """Service for managing shopping cart operations"""
     
+    @staticmethod
+    def get_store() -> CartStore:
+        """Get (and lazily create) the cart store for the current app."""
+        app = current_app._get_current_object()
+        store = app.extensions.get('cart_store')
+        if store is None:
+            store = create_cart_store(app, db)
+            app.extensions['cart_store'] = store
+        return store
+    
     @staticmethod
     def get_cart() -> Dict:
-        """Get cart from session"""
-        return session.get('cart', {})
+        """Get cart lines (product ID -> line), memoized per request"""
+        cart = g.get('cart_lines')
+        if cart is not None:
+            return cart
+        
+        store = CartService.get_store()
+        token = CartService._get_token(create=False)
+        cart = store.get(token) if token else {}
+        
+        legacy = session.get('cart') if store.name != CART_STORE_SESSION else None
+        if legacy:
+            # Cart stored in the cookie before server-side carts: move it over
+            for product_key, line in legacy.items():
+                if product_key not in cart:
+                    cart[product_key] = line
+            store.replace(CartService._get_token(create=True), cart)
+            session.pop('cart', None)
+            session.modified = True
+        
+        g.cart_lines = cart
+        return cart
     
     @staticmethod
     def save_cart(cart: Dict) -> None:
-        """Save cart to session"""
-        session['cart'] = cart
-        session.modified = True
+        """Replace the whole cart"""
+        CartService.get_store().replace(CartService._get_token(create=True), cart)
+        CartService._reset_snapshot()
     
     @staticmethod
     def add_item(product_id: int, quantity: int = 1) -> Tuple[bool, str]:
@@ -44,16 +80,17 @@ class CartService:
             new_quantity = cart[product_key]['quantity'] + quantity
             if product.stock < new_quantity:
                 return False, "Insufficient stock"
-            cart[product_key]['quantity'] = new_quantity
+            line = dict(cart[product_key], quantity=new_quantity)
         else:
-            cart[product_key] = {
+            line = {
                 'quantity': quantity,
                 'price': float(product.price),
                 'name': product.name,
                 'image': product.get_main_image()
             }
         
-        CartService.save_cart(cart)
+        CartService.get_store().set_line(CartService._get_token(create=True), product_key, line)
+        CartService._reset_snapshot()
         return True, "Product added to cart"
     
     @staticmethod
@@ -80,8 +117,9 @@ class CartService:
         if product.stock < quantity:
             return False, "Insufficient stock"
         
-        cart[product_key]['quantity'] = quantity
-        CartService.save_cart(cart)
+        line = dict(cart[product_key], quantity=quantity)
+        CartService.get_store().set_line(CartService._get_token(create=True), product_key, line)
+        CartService._reset_snapshot()
         return True, "Cart updated"
     
     @staticmethod
@@ -91,24 +129,154 @@ class CartService:
         product_key = str(product_id)
         
         if product_key in cart:
-            del cart[product_key]
-            CartService.save_cart(cart)
+            CartService.get_store().remove_line(CartService._get_token(create=True), product_key)
+            CartService._reset_snapshot()
             return True
         return False
     
+    @staticmethod
+    def apply_operations(operations: List[Dict[str, Any]]) -> Tuple[bool, List[Dict[str, Any]]]:
+        """
+        Apply several add/set/remove operations to the cart, all or nothing
+        
+        Operations run in order against a working copy of the cart, so
+        several operations on the same product combine. All products are
+        loaded with a single IN query for the stock checks. The cart is only
+        written (in one store call) when every operation succeeds.
+        
+        The write is conditional on the changed lines still being as read.
+        If a concurrent request changed them, the cart is read again and
+        the operations are re-applied, up to CART_UPDATE_ATTEMPTS times.
+        
+        Args:
+            operations: Validated dicts with 'op', 'product_id' and 'quantity'
+        
+        Returns:
+            Tuple[bool, List[Dict]]: (all succeeded, per-operation results with
+            index, op, product_id, success, quantity and message)
+        """
+        product_ids = {
+            operation['product_id'] for operation in operations
+            if operation['op'] != CART_OP_REMOVE
+        }
+        products = {}
+        if product_ids:
+            products = {
+                product.id: product
+                for product in Product.query.filter(Product.id.in_(product_ids)).all()
+            }
+        
+        store = CartService.get_store()
+        for attempt in range(CART_UPDATE_ATTEMPTS):
+            if attempt:
+                # Read the other request's write, not the per-request memo
+                CartService._reset_snapshot()
+            cart = CartService.get_cart()
+            working, results = CartService._plan_operations(cart, operations, products)
+            if not all(result['success'] for result in results):
+                return False, results
+            
+            changes = {
+                key: working.get(key)
+                for key in set(cart) | set(working)
+                if working.get(key) != cart.get(key)
+            }
+            if not changes:
+                return True, results
+            try:
+                store.update_lines(CartService._get_token(create=True), changes,
+                                   expected={key: cart.get(key) for key in changes})
+            except CartConflict:
+                continue
+            CartService._reset_snapshot()
+            return True, results
+        
+        return False, [
+            dict(result, success=False, message="Cart was changed by another request, please retry")
+            for result in results
+        ]
+    
+    @staticmethod
+    def _plan_operations(cart: Dict, operations: List[Dict[str, Any]],
+                         products: Dict[int, Product]) -> Tuple[Dict, List[Dict[str, Any]]]:
+        """Apply operations to a copy of the cart; returns (new lines, per-operation results)"""
+        working = {key: dict(line) for key, line in cart.items()}
+        results = []
+        for index, operation in enumerate(operations):
+            op = operation['op']
+            product_id = operation['product_id']
+            product_key = str(product_id)
+            current = working[product_key]['quantity'] if product_key in working else 0
+            
+            if op == CART_OP_REMOVE or (op == CART_OP_SET and operation['quantity'] == 0):
+                # Removing a line that isn't there is not an error
+                success = True
+                message = "Item removed" if product_key in working else "Item not in cart"
+                working.pop(product_key, None)
+                quantity = 0
+            else:
+                quantity = current + operation['quantity'] if op == CART_OP_ADD else operation['quantity']
+                product = products.get(product_id)
+                success = False
+                if product is None:
+                    message = "Product not found"
+                elif not product.is_active:
+                    message = "Product is not available"
+                elif quantity <= 0:
+                    message = "Quantity must be greater than 0"
+                elif product.stock < quantity:
+                    message = "Insufficient stock"
+                else:
+                    success = True
+                    message = "Cart updated"
+                    line = working.get(product_key) or {
+                        'price': float(product.price),
+                        'name': product.name,
+                        'image': product.get_main_image()
+                    }
+                    working[product_key] = dict(line, quantity=quantity)
+                if not success:
+                    quantity = current
+            
+            results.append({
+                'index': index,
+                'op': op,
+                'product_id': product_id,
+                'success': success,
+                'quantity': quantity,
+                'message': message
+            })
+        return working, results
+    
     @staticmethod
     def get_cart_items() -> List[Dict]:
         """
         Get cart items with product details
         
+        All products are loaded with a single IN query. The result is a
+        per-request snapshot: later calls in the same request (get_cart,
+        calculate_total, is_empty, order creation) reuse it until the cart
+        is modified.
+        
         Returns:
             List of dicts with product, quantity, and subtotal
         """
+        snapshot = g.get('cart_items_snapshot')
+        if snapshot is not None:
+            return snapshot
+        
         cart = CartService.get_cart()
-        cart_items = []
+        product_ids = [int(product_id) for product_id in cart]
+        products = {}
+        if product_ids:
+            products = {
+                product.id: product
+                for product in Product.query.filter(Product.id.in_(product_ids)).all()
+            }
         
+        cart_items = []
         for product_id, item in cart.items():
-            product = Product.query.get(int(product_id))
+            product = products.get(int(product_id))
             if product:
                 quantity = item['quantity']
                 price = float(product.price)
@@ -120,6 +288,7 @@ class CartService:
                     'subtotal': subtotal
                 })
         
+        g.cart_items_snapshot = cart_items
         return cart_items
     
     @staticmethod
@@ -142,11 +311,39 @@ class CartService:
     @staticmethod
     def clear_cart() -> None:
         """Clear all items from cart"""
+        token = CartService._get_token(create=False)
+        if token:
+            CartService.get_store().clear(token)
         session.pop('cart', None)
         session.modified = True
+        CartService._reset_snapshot()
     
     @staticmethod
     def is_empty() -> bool:
-        """Check if cart is empty"""
-        return len(CartService.get_cart()) == 0
+        """
+        Check if cart is empty
+        
+        Lines whose product no longer exists don't count. Uses the
+        per-request snapshot, so a following get_cart or checkout in the
+        same request costs no extra queries.
+        """
+        if not CartService.get_cart():
+            return True
+        return len(CartService.get_cart_items()) == 0
+    
+    @staticmethod
+    def _reset_snapshot() -> None:
+        """Drop the per-request cart lines and items snapshot after a cart change"""
+        g.pop('cart_lines', None)
+        g.pop('cart_items_snapshot', None)
+    
+    @staticmethod
+    def _get_token(create: bool) -> Optional[str]:
+        """Cart token from the session; a new one is issued on the first write"""
+        token = session.get('cart_token')
+        if token is None and create:
+            token = secrets.token_urlsafe(24)
+            session['cart_token'] = token
+            session.modified = True
+        return token
 
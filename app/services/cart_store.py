@@ -0,0 +1,413 @@
+"""
+Server-side cart storage.
+
+The session cookie only carries a random cart token; cart lines live in a
+store keyed by that token. Lines are stored individually, so adding,
+updating or removing one product touches one entry/row instead of
+rewriting the whole cart. Backends (Config.CART_STORE):
+
+- database: cart_lines table in the application database (default; shared
+  by all worker processes)
+- sqlite: the same table in a separate SQLite file (CART_SQLITE_PATH),
+  for single-host deployments that want carts off the main database
+- memory: per-process dict with LRU eviction (CART_MAX_CARTS), for
+  development and single-process servers
+- session: the previous signed-cookie cart
+
+Carts without writes for CART_TTL seconds count as abandoned and are
+evicted (memory) or purged periodically (database/sqlite).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from flask import session
+from sqlalchemy import and_, create_engine, delete, false, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.models import CartLine
+
+CART_STORE_DATABASE = 'database'
+CART_STORE_SQLITE = 'sqlite'
+CART_STORE_MEMORY = 'memory'
+CART_STORE_SESSION = 'session'
+
+# How often SQL stores look for abandoned carts (seconds)
+PURGE_INTERVAL = 3600
+PURGE_BATCH_SIZE = 500
+
+
+class CartConflict(Exception):
+    """The cart changed since it was read (or a concurrent write collided)."""
+
+
+def _quantities(lines: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Optional[int]]:
+    return {key: line['quantity'] if line else None for key, line in lines.items()}
+
+
+class CartStore:
+    """
+    Base class for cart storage backends.
+
+    A cart is a dict of product ID (str) -> line, where a line is
+    {'quantity', 'price', 'name', 'image'}; the same shape the session
+    cart used.
+    """
+
+    def get(self, token: str) -> Dict[str, Dict[str, Any]]:
+        """Get all lines of a cart (empty dict if unknown)."""
+        raise NotImplementedError
+
+    def set_line(self, token: str, product_key: str, line: Dict[str, Any]) -> None:
+        """Insert or replace one line."""
+        raise NotImplementedError
+
+    def remove_line(self, token: str, product_key: str) -> bool:
+        """Remove one line; False if it wasn't there."""
+        raise NotImplementedError
+
+    def update_lines(self, token: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                     expected: Optional[Dict[str, Optional[Dict[str, Any]]]] = None) -> None:
+        """
+        Apply several line changes together.
+
+        Args:
+            token: Cart token
+            changes: product ID -> new line, or None to remove the line
+            expected: product ID -> line as read before computing the
+                changes (None: not in the cart); checked against the store
+
+        Raises:
+            CartConflict: A changed line no longer matches expected
+        """
+        if expected is not None:
+            cart = self.get(token)
+            if _quantities({key: cart.get(key) for key in changes}) != _quantities(expected):
+                raise CartConflict(token)
+        for product_key, line in changes.items():
+            if line is None:
+                self.remove_line(token, product_key)
+            else:
+                self.set_line(token, product_key, line)
+
+    def replace(self, token: str, cart: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the whole cart."""
+        self.clear(token)
+        for product_key, line in cart.items():
+            self.set_line(token, product_key, line)
+
+    def clear(self, token: str) -> None:
+        """Delete a cart."""
+        raise NotImplementedError
+
+    def purge(self) -> int:
+        """Remove abandoned carts; returns the number of carts removed."""
+        return 0
+
+
+class MemoryCartStore(CartStore):
+    """Per-process store bounded by cart count, evicting least recently used carts."""
+
+    name = CART_STORE_MEMORY
+
+    def __init__(self, max_carts: int = 10000, ttl: float = 14 * 86400):
+        self.max_carts = max_carts
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # token -> (last write time, lines)
+        self._carts: 'OrderedDict[str, List[Any]]' = OrderedDict()
+
+    def get(self, token: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            entry = self._carts.get(token)
+            if entry is None:
+                return {}
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._carts[token]
+                return {}
+            self._carts.move_to_end(token)
+            return {key: dict(line) for key, line in entry[1].items()}
+
+    def set_line(self, token: str, product_key: str, line: Dict[str, Any]) -> None:
+        with self._lock:
+            entry = self._touch(token)
+            entry[1][product_key] = dict(line)
+
+    def remove_line(self, token: str, product_key: str) -> bool:
+        with self._lock:
+            entry = self._carts.get(token)
+            if entry is None or product_key not in entry[1]:
+                return False
+            del entry[1][product_key]
+            entry[0] = time.monotonic()
+            return True
+
+    def update_lines(self, token: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                     expected: Optional[Dict[str, Optional[Dict[str, Any]]]] = None) -> None:
+        with self._lock:
+            entry = self._touch(token)
+            if expected is not None and \
+                    _quantities({key: entry[1].get(key) for key in changes}) != _quantities(expected):
+                raise CartConflict(token)
+            for product_key, line in changes.items():
+                if line is None:
+                    entry[1].pop(product_key, None)
+                else:
+                    entry[1][product_key] = dict(line)
+
+    def replace(self, token: str, cart: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            entry = self._touch(token)
+            entry[1] = {key: dict(line) for key, line in cart.items()}
+
+    def clear(self, token: str) -> None:
+        with self._lock:
+            self._carts.pop(token, None)
+
+    def purge(self) -> int:
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            expired = [token for token, entry in self._carts.items() if entry[0] < cutoff]
+            for token in expired:
+                del self._carts[token]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._carts)
+
+    def _touch(self, token: str) -> List[Any]:
+        entry = self._carts.get(token)
+        if entry is None:
+            entry = [time.monotonic(), {}]
+            self._carts[token] = entry
+            # Evict the least recently used carts beyond the bound
+            while len(self._carts) > self.max_carts:
+                self._carts.popitem(last=False)
+        else:
+            entry[0] = time.monotonic()
+            self._carts.move_to_end(token)
+        return entry
+
+
+class SQLCartStore(CartStore):
+    """One row per cart line in the cart_lines table."""
+
+    name = CART_STORE_DATABASE
+
+    def __init__(self, engine, ttl: float = 14 * 86400):
+        self.engine = engine
+        self.ttl = ttl
+        self.table = CartLine.__table__
+        self._last_purge = time.monotonic()
+        self._purge_lock = threading.Lock()
+
+    def get(self, token: str) -> Dict[str, Dict[str, Any]]:
+        t = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(t.c.product_id, t.c.quantity, t.c.price, t.c.name, t.c.image)
+                .where(t.c.token == token)
+                .order_by(t.c.product_id)
+            ).all()
+        return {
+            str(row.product_id): {
+                'quantity': row.quantity,
+                'price': float(row.price),
+                'name': row.name,
+                'image': row.image,
+            }
+            for row in rows
+        }
+
+    def set_line(self, token: str, product_key: str, line: Dict[str, Any]) -> None:
+        t = self.table
+        values = {
+            'quantity': line['quantity'],
+            'price': line['price'],
+            'name': line['name'],
+            'image': line.get('image'),
+            'updated_at': datetime.utcnow(),
+        }
+        key = (t.c.token == token, t.c.product_id == int(product_key))
+        with self.engine.begin() as conn:
+            updated = conn.execute(update(t).where(*key).values(**values)).rowcount
+        if not updated:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(t).values(token=token, product_id=int(product_key), **values))
+            except IntegrityError:
+                # A concurrent request inserted the line first
+                with self.engine.begin() as conn:
+                    conn.execute(update(t).where(*key).values(**values))
+        self._maybe_purge()
+
+    def remove_line(self, token: str, product_key: str) -> bool:
+        t = self.table
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                delete(t).where(t.c.token == token, t.c.product_id == int(product_key))
+            )
+        return result.rowcount > 0
+
+    def update_lines(self, token: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                     expected: Optional[Dict[str, Optional[Dict[str, Any]]]] = None) -> None:
+        """
+        Delete the changed lines and insert their new values in one transaction.
+
+        With expected, the DELETE only matches lines still holding the
+        expected quantities: if it deletes fewer rows, or the INSERT hits a
+        line another request added, the cart changed concurrently. That and
+        deadlocks between concurrent writers raise CartConflict for the
+        caller to retry; the transaction is rolled back.
+        """
+        if not changes:
+            return
+        t = self.table
+        lines = {key: line for key, line in changes.items() if line is not None}
+        condition = t.c.product_id.in_([int(product_key) for product_key in changes])
+        present = {}
+        if expected is not None:
+            present = {int(key): line['quantity'] for key, line in expected.items() if line}
+            condition = or_(false(), *[
+                and_(t.c.product_id == product_id, t.c.quantity == quantity)
+                for product_id, quantity in present.items()
+            ])
+        try:
+            with self.engine.begin() as conn:
+                deleted = conn.execute(delete(t).where(t.c.token == token, condition)).rowcount
+                if expected is not None and deleted != len(present):
+                    raise CartConflict(token)
+                if lines:
+                    conn.execute(insert(t), self._rows(token, lines))
+        except (IntegrityError, OperationalError) as e:
+            if isinstance(e, OperationalError) and not _is_lock_conflict(e):
+                raise
+            raise CartConflict(token) from e
+        self._maybe_purge()
+
+    def replace(self, token: str, cart: Dict[str, Dict[str, Any]]) -> None:
+        t = self.table
+        with self.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.token == token))
+            if cart:
+                conn.execute(insert(t), self._rows(token, cart))
+        self._maybe_purge()
+
+    def clear(self, token: str) -> None:
+        t = self.table
+        with self.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.token == token))
+
+    def purge(self) -> int:
+        """Delete carts whose newest line is older than the TTL, in batches."""
+        t = self.table
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        purged = 0
+        while True:
+            with self.engine.begin() as conn:
+                tokens = conn.execute(
+                    select(t.c.token)
+                    .group_by(t.c.token)
+                    .having(func.max(t.c.updated_at) < cutoff)
+                    .limit(PURGE_BATCH_SIZE)
+                ).scalars().all()
+                if not tokens:
+                    return purged
+                conn.execute(delete(t).where(t.c.token.in_(tokens)))
+            purged += len(tokens)
+
+    @staticmethod
+    def _rows(token: str, cart: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return [
+            {
+                'token': token,
+                'product_id': int(product_key),
+                'quantity': line['quantity'],
+                'price': line['price'],
+                'name': line['name'],
+                'image': line.get('image'),
+                'updated_at': now,
+            }
+            for product_key, line in cart.items()
+        ]
+
+    def _maybe_purge(self) -> None:
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        if not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_purge = time.monotonic()
+            self.purge()
+        finally:
+            self._purge_lock.release()
+
+
+class SessionCartStore(CartStore):
+    """The signed-cookie session cart; the token is ignored."""
+
+    name = CART_STORE_SESSION
+
+    def get(self, token: str) -> Dict[str, Dict[str, Any]]:
+        return session.get('cart', {})
+
+    def set_line(self, token: str, product_key: str, line: Dict[str, Any]) -> None:
+        cart = session.get('cart', {})
+        cart[product_key] = dict(line)
+        self.replace(token, cart)
+
+    def remove_line(self, token: str, product_key: str) -> bool:
+        cart = session.get('cart', {})
+        if product_key not in cart:
+            return False
+        del cart[product_key]
+        self.replace(token, cart)
+        return True
+
+    def update_lines(self, token: str, changes: Dict[str, Optional[Dict[str, Any]]],
+                     expected: Optional[Dict[str, Optional[Dict[str, Any]]]] = None) -> None:
+        # The cookie belongs to this request; there is nothing to conflict with
+        cart = session.get('cart', {})
+        for product_key, line in changes.items():
+            if line is None:
+                cart.pop(product_key, None)
+            else:
+                cart[product_key] = dict(line)
+        self.replace(token, cart)
+
+    def replace(self, token: str, cart: Dict[str, Dict[str, Any]]) -> None:
+        session['cart'] = cart
+        session.modified = True
+
+    def clear(self, token: str) -> None:
+        session.pop('cart', None)
+        session.modified = True
+
+
+def _is_lock_conflict(error: OperationalError) -> bool:
+    """Deadlock or lock wait timeout (MySQL 1213 / 1205), or a busy SQLite file."""
+    code = error.orig.args[0] if getattr(error.orig, 'args', None) else None
+    return code in (1205, 1213) or 'database is locked' in str(error.orig)
+
+
+def create_cart_store(app, db) -> CartStore:
+    """Create the cart store configured for an app."""
+    backend = app.config.get('CART_STORE', CART_STORE_DATABASE)
+    ttl = app.config.get('CART_TTL', 14 * 86400)
+
+    if backend == CART_STORE_MEMORY:
+        return MemoryCartStore(max_carts=app.config.get('CART_MAX_CARTS', 10000), ttl=ttl)
+    if backend == CART_STORE_SESSION:
+        return SessionCartStore()
+    if backend == CART_STORE_SQLITE:
+        path = app.config.get('CART_SQLITE_PATH') or os.path.join(app.instance_path, 'carts.db')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        engine = create_engine(f'sqlite:///{os.path.abspath(path)}',
+                               connect_args={'check_same_thread': False, 'timeout': 30})
+        CartLine.__table__.create(bind=engine, checkfirst=True)
+        store = SQLCartStore(engine, ttl=ttl)
+        store.name = CART_STORE_SQLITE
+        return store
+    return SQLCartStore(db.engine, ttl=ttl)
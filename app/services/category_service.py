@@ -0,0 +1,168 @@
+"""
+Category service with a process-level category tree cache.
+
+The whole category table is loaded in one column-only query and kept in
+memory as a tree. Category writes bump a version stamp, which makes the
+next reader rebuild the tree. A TTL bounds how long other worker
+processes can serve a tree that was invalidated elsewhere.
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from flask import current_app
+from app.models import Category
+from app import db
+from app.utils.db_routing import cache_fill
+
+
+class CategoryTree:
+    """Immutable snapshot of the category hierarchy."""
+
+    def __init__(self, rows: List[Any], version: int):
+        self.version = version
+        self.built_at = time.monotonic()
+        self._nodes: Dict[int, Dict[str, Any]] = {}
+        self._children: Dict[Optional[int], List[int]] = defaultdict(list)
+
+        # Rows arrive ordered by (sort_order, id), so child lists keep that order
+        for row in rows:
+            self._nodes[row.id] = {
+                'id': row.id,
+                'name': row.name,
+                'slug': row.slug,
+                'parent_id': row.parent_id,
+                'description': row.description,
+                'image': row.image,
+                'sort_order': row.sort_order,
+                'is_active': row.is_active,
+            }
+            self._children[row.parent_id].append(row.id)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def get(self, category_id: int) -> Optional[Dict[str, Any]]:
+        """Get a single category as dict (same shape as list_categories)."""
+        node = self._nodes.get(category_id)
+        return self._to_dict(node) if node else None
+
+    def list_categories(self, parent_id: Optional[int] = None,
+                        is_active: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        List categories ordered by sort order.
+
+        Args:
+            parent_id: Only direct children of this category (None for all)
+            is_active: Filter by active status
+        """
+        if parent_id is not None:
+            ids = self._children.get(parent_id, [])
+        else:
+            ids = self._nodes.keys()
+
+        categories = []
+        for category_id in ids:
+            node = self._nodes[category_id]
+            if is_active is not None and node['is_active'] != is_active:
+                continue
+            categories.append(self._to_dict(node))
+
+        if parent_id is None:
+            categories.sort(key=lambda c: (c['sort_order'] or 0, c['id']))
+        return categories
+
+    def children_ids(self, category_id: int) -> List[int]:
+        """Direct child category IDs."""
+        return list(self._children.get(category_id, []))
+
+    def descendant_ids(self, category_id: int) -> List[int]:
+        """All descendant category IDs, depth-first."""
+        result = []
+        seen = {category_id}
+        stack = list(reversed(self._children.get(category_id, [])))
+        while stack:
+            child_id = stack.pop()
+            if child_id in seen:
+                continue
+            seen.add(child_id)
+            result.append(child_id)
+            stack.extend(reversed(self._children.get(child_id, [])))
+        return result
+
+    def path_ids(self, category_id: int) -> List[int]:
+        """Category IDs from the root down to the given category."""
+        path = []
+        seen = set()
+        current = self._nodes.get(category_id)
+        while current and current['id'] not in seen:
+            seen.add(current['id'])
+            path.insert(0, current['id'])
+            current = self._nodes.get(current['parent_id'])
+        return path
+
+    def _to_dict(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        parent = self._nodes.get(node['parent_id'])
+        data = dict(node)
+        data['parent_name'] = parent['name'] if parent else None
+        data['children_count'] = len(self._children.get(node['id'], []))
+        return data
+
+
+class CategoryService:
+    """Service for cached category tree access"""
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_tree() -> CategoryTree:
+        """
+        Get the cached category tree, rebuilding it if it was invalidated
+        or is older than CATEGORY_CACHE_TTL seconds.
+        """
+        state = CategoryService._state()
+        tree = state['tree']
+        ttl = current_app.config.get('CATEGORY_CACHE_TTL', 300)
+
+        if tree is not None and tree.version == state['version'] \
+                and time.monotonic() - tree.built_at < ttl:
+            return tree
+
+        # Capture the version before querying: a write that lands while we
+        # build leaves the new tree stale, and the next reader rebuilds again
+        version = state['version']
+        with cache_fill():
+            rows = db.session.query(
+                Category.id, Category.name, Category.slug, Category.parent_id,
+                Category.description, Category.image, Category.sort_order,
+                Category.is_active
+            ).order_by(Category.sort_order, Category.id).all()
+
+        tree = CategoryTree(rows, version)
+        state['tree'] = tree
+        return tree
+
+    @staticmethod
+    def invalidate() -> None:
+        """Bump the version stamp after a category write has been committed."""
+        state = CategoryService._state()
+        with CategoryService._lock:
+            state['version'] += 1
+
+    @staticmethod
+    def load_categories(category_ids: List[int]) -> List[Category]:
+        """Load Category objects in one query, keeping the given order."""
+        if not category_ids:
+            return []
+        categories = Category.query.filter(Category.id.in_(category_ids)).all()
+        by_id = {category.id: category for category in categories}
+        return [by_id[category_id] for category_id in category_ids if category_id in by_id]
+
+    @staticmethod
+    def _state() -> Dict[str, Any]:
+        app = current_app._get_current_object()
+        state = app.extensions.get('category_tree')
+        if state is None:
+            with CategoryService._lock:
+                state = app.extensions.setdefault('category_tree', {'version': 0, 'tree': None})
+        return state
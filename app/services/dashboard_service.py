@@ -0,0 +1,210 @@
+"""
+Dashboard service with a materialized statistics snapshot.
+
+All counters are computed by a single aggregate query (one scalar
+subquery per counter) and kept in memory per process. The snapshot is
+recomputed when it is older than DASHBOARD_STATS_TTL seconds; in between,
+committed ORM writes to users, products, orders, categories and banners
+adjust the counters incrementally. Bulk UPDATE/DELETE statements bypass
+the ORM unit of work and are only picked up by the next TTL refresh.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import NO_VALUE
+from app.models import User, Product, Order, Category, Banner
+from app import db
+from app.utils.db_routing import cache_fill
+from app.constants import ORDER_STATUS_PENDING
+
+STAT_KEYS = [
+    'total_users', 'total_products', 'total_orders', 'total_categories',
+    'total_banners', 'pending_orders', 'active_products',
+]
+
+_DELTAS_KEY = 'dashboard_stat_deltas'
+# Delta entry set when a change can't be counted (old value never loaded)
+_STALE = '_stale'
+_listeners_registered = False
+
+
+class DashboardService:
+    """Service for dashboard statistics"""
+
+    @staticmethod
+    def init_app(app) -> None:
+        """Set up the per-app snapshot and the write listeners."""
+        global _listeners_registered
+        app.extensions['dashboard_stats'] = {
+            'lock': threading.Lock(),
+            'stats': None,
+            'computed_at': None,
+            'refreshed_at': None,
+            'updates': 0,
+        }
+        if not _listeners_registered:
+            event.listen(Session, 'after_flush', _collect_deltas)
+            event.listen(Session, 'after_commit', _apply_deltas)
+            event.listen(Session, 'after_rollback', _discard_deltas)
+            _listeners_registered = True
+
+    @staticmethod
+    def compute_stats() -> Dict[str, int]:
+        """Compute every counter with one aggregate query."""
+        def count(model, *criteria):
+            return select(func.count()).select_from(model.__table__)\
+                .where(*criteria).scalar_subquery()
+
+        row = db.session.execute(select(
+            count(User).label('total_users'),
+            count(Product).label('total_products'),
+            count(Order).label('total_orders'),
+            count(Category).label('total_categories'),
+            count(Banner).label('total_banners'),
+            count(Order, Order.status == ORDER_STATUS_PENDING).label('pending_orders'),
+            count(Product, Product.is_active.is_(True)).label('active_products'),
+        )).one()
+        return {key: int(row._mapping[key] or 0) for key in STAT_KEYS}
+
+    @staticmethod
+    def get_stats(max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get dashboard statistics from the snapshot.
+
+        Args:
+            max_age: Maximum snapshot age in seconds (default DASHBOARD_STATS_TTL)
+
+        Returns:
+            Dict of counters plus a 'freshness' entry describing the snapshot
+        """
+        state = current_app.extensions['dashboard_stats']
+        if max_age is None:
+            max_age = current_app.config.get('DASHBOARD_STATS_TTL', 60)
+
+        refreshed_at = state['refreshed_at']
+        if state['stats'] is None or refreshed_at is None \
+                or time.monotonic() - refreshed_at >= max_age:
+            DashboardService.refresh()
+
+        with state['lock']:
+            stats = dict(state['stats'])
+            computed_at = state['computed_at']
+            age = time.monotonic() - state['refreshed_at']
+            updates = state['updates']
+
+        stats['freshness'] = {
+            'computed_at': computed_at.isoformat(),
+            'age_seconds': round(age, 3),
+            'ttl_seconds': max_age,
+            'incremental_updates': updates,
+        }
+        return stats
+
+    @staticmethod
+    def refresh() -> Dict[str, int]:
+        """Recompute the snapshot from the database."""
+        with cache_fill():
+            stats = DashboardService.compute_stats()
+        state = current_app.extensions['dashboard_stats']
+        with state['lock']:
+            state['stats'] = stats
+            state['computed_at'] = datetime.utcnow()
+            state['refreshed_at'] = time.monotonic()
+            state['updates'] = 0
+        return stats
+
+    @staticmethod
+    def invalidate() -> None:
+        """Force a recompute on the next read."""
+        state = current_app.extensions['dashboard_stats']
+        with state['lock']:
+            state['refreshed_at'] = None
+
+
+def _collect_deltas(session, flush_context) -> None:
+    """Record counter changes of a flush until the transaction commits."""
+    deltas = session.info.setdefault(_DELTAS_KEY, Counter())
+
+    for obj in session.new:
+        _count_object(deltas, obj, 1)
+    for obj in session.deleted:
+        _count_object(deltas, obj, -1)
+    for obj in session.dirty:
+        _count_changes(deltas, obj)
+
+
+def _count_object(deltas: Counter, obj: Any, sign: int) -> None:
+    if isinstance(obj, User):
+        deltas['total_users'] += sign
+    elif isinstance(obj, Product):
+        deltas['total_products'] += sign
+        if _value(deltas, obj, 'is_active', True):
+            deltas['active_products'] += sign
+    elif isinstance(obj, Order):
+        deltas['total_orders'] += sign
+        if _value(deltas, obj, 'status', ORDER_STATUS_PENDING) == ORDER_STATUS_PENDING:
+            deltas['pending_orders'] += sign
+    elif isinstance(obj, Category):
+        deltas['total_categories'] += sign
+    elif isinstance(obj, Banner):
+        deltas['total_banners'] += sign
+
+
+def _count_changes(deltas: Counter, obj: Any) -> None:
+    if isinstance(obj, Product):
+        change = _changed(deltas, obj, 'is_active')
+        if change and bool(change[0]) != bool(change[1]):
+            deltas['active_products'] += 1 if change[1] else -1
+    elif isinstance(obj, Order):
+        change = _changed(deltas, obj, 'status')
+        if change and (change[0] == ORDER_STATUS_PENDING) != (change[1] == ORDER_STATUS_PENDING):
+            deltas['pending_orders'] += 1 if change[1] == ORDER_STATUS_PENDING else -1
+
+
+def _changed(deltas: Counter, obj: Any, attr: str) -> Optional[Tuple[Any, Any]]:
+    """(old, new) values of an attribute changed in this flush, or None."""
+    history = inspect(obj).attrs[attr].history
+    if not history.has_changes():
+        return None
+    if not history.deleted:
+        # Assigned on an expired instance: the old value is unknown
+        deltas[_STALE] = 1
+        return None
+    return history.deleted[0], history.added[0] if history.added else None
+
+
+def _value(deltas: Counter, obj: Any, attr: str, default: Any) -> Any:
+    """Attribute value without triggering a lazy load on deleted rows."""
+    value = inspect(obj).attrs[attr].loaded_value
+    if value is NO_VALUE:
+        deltas[_STALE] = 1
+        return default
+    # Column defaults (e.g. is_active=True) are applied in the INSERT itself
+    return default if value is None else value
+
+
+def _apply_deltas(session) -> None:
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if not deltas or not has_app_context():
+        return
+
+    state = current_app.extensions.get('dashboard_stats')
+    if not state:
+        return
+    with state['lock']:
+        if state['stats'] is None:
+            return
+        if deltas.pop(_STALE, None):
+            state['refreshed_at'] = None
+        for key, delta in deltas.items():
+            state['stats'][key] = max(0, state['stats'][key] + delta)
+        state['updates'] += 1
+
+
+def _discard_deltas(session) -> None:
+    session.info.pop(_DELTAS_KEY, None)
@@ -0,0 +1,293 @@
+"""
+Streaming CSV / JSONL exports of orders, products and users.
+
+Rows are read with yield_per(EXPORT_CHUNK_SIZE), which makes SQLAlchemy
+use a server-side cursor (stream_results) where the driver supports one,
+and only the exported columns are selected, so no ORM objects pile up in
+the session. Output is written in chunks of the same number of rows into
+a streamed (chunked) response; memory use stays constant regardless of
+the number of rows.
+
+Orders are exported one line per order item in CSV (order columns
+repeated) and one object per order with an items array in JSONL.
+"""
+import csv
+import io
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from flask import current_app, Response, stream_with_context
+from sqlalchemy import select
+from app.models import Product, Category, Order, OrderItem, User
+from app import db
+from app.constants import (ORDER_STATUS_CHOICES, EXPORT_ENTITIES, EXPORT_FORMAT_CSV, EXPORT_FORMAT_JSONL,
+                           EXPORT_FORMATS)
+
+ORDER_COLUMNS = [
+    'id', 'order_number', 'user_id', 'status', 'total_amount', 'shipping_name',
+    'shipping_phone', 'shipping_email', 'shipping_address', 'notes', 'created_at', 'updated_at',
+]
+ORDER_ITEM_COLUMNS = ['product_id', 'product_name', 'quantity', 'price']
+PRODUCT_COLUMNS = [
+    'id', 'name', 'slug', 'price', 'stock', 'category_id', 'category_name',
+    'is_active', 'created_at', 'updated_at',
+]
+USER_COLUMNS = ['id', 'username', 'email', 'role', 'created_at', 'updated_at']
+
+# Leading characters spreadsheet programs evaluate as a formula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+MIMETYPES = {
+    EXPORT_FORMAT_CSV: 'text/csv',
+    EXPORT_FORMAT_JSONL: 'application/x-ndjson',
+}
+
+
+@dataclass
+class ExportFilters:
+    """Export filters; each one only applies to the entities that have it."""
+    status: Optional[str] = None        # orders
+    date_from: Optional[date] = None    # created_at >= date_from
+    date_to: Optional[date] = None      # created_at < date_to + 1 day
+    category_id: Optional[int] = None   # products
+    is_active: Optional[bool] = None    # products
+    role: Optional[str] = None          # users
+
+
+class ExportService:
+    """Service for streaming data exports"""
+
+    @staticmethod
+    def parse_filters(args: Mapping[str, str]) -> Tuple[Optional[ExportFilters], Optional[str]]:
+        """
+        Parse export filters from query parameters.
+
+        Args:
+            args: Request args (status, date_from, date_to as YYYY-MM-DD,
+                category_id, is_active, role)
+
+        Returns:
+            Tuple of (filters, error message)
+        """
+        filters = ExportFilters()
+
+        status = (args.get('status') or '').strip()
+        if status:
+            if status not in ORDER_STATUS_CHOICES:
+                return None, '無效的訂單狀態'
+            filters.status = status
+
+        for name in ('date_from', 'date_to'):
+            value = (args.get(name) or '').strip()
+            if value:
+                try:
+                    setattr(filters, name, datetime.strptime(value, '%Y-%m-%d').date())
+                except ValueError:
+                    return None, '日期格式錯誤，請使用 YYYY-MM-DD'
+        if filters.date_from and filters.date_to and filters.date_from > filters.date_to:
+            return None, '開始日期不能晚於結束日期'
+
+        category_id = (args.get('category_id') or '').strip()
+        if category_id:
+            if not category_id.isdigit():
+                return None, '分類ID無效'
+            filters.category_id = int(category_id)
+
+        is_active = (args.get('is_active') or '').strip().lower()
+        if is_active:
+            filters.is_active = is_active in ('1', 'true')
+
+        role = (args.get('role') or '').strip()
+        if role:
+            filters.role = role
+
+        return filters, None
+
+    @staticmethod
+    def records(entity: str, filters: ExportFilters) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate the records of an export.
+
+        Args:
+            entity: orders, products or users
+            filters: Export filters
+        """
+        chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+        return _RECORDS[entity](filters, chunk_size)
+
+    @staticmethod
+    def stream(entity: str, fmt: str, filters: ExportFilters) -> Iterator[str]:
+        """
+        Iterate the exported document in chunks of EXPORT_CHUNK_SIZE rows.
+
+        Args:
+            entity: orders, products or users
+            fmt: csv or jsonl
+            filters: Export filters
+        """
+        chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+        records = ExportService.records(entity, filters)
+        if fmt == EXPORT_FORMAT_JSONL:
+            return _jsonl_chunks(records, chunk_size)
+        return _csv_chunks(entity, records, chunk_size)
+
+    @staticmethod
+    def response(entity: str, fmt: str, filters: ExportFilters) -> Response:
+        """
+        Streamed download response of an export.
+
+        Args:
+            entity: orders, products or users
+            fmt: csv or jsonl
+            filters: Export filters
+        """
+        if entity not in EXPORT_ENTITIES or fmt not in EXPORT_FORMATS:
+            raise ValueError(f'Unsupported export: {entity}.{fmt}')
+
+        filename = f'{entity}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}'
+        response = Response(
+            stream_with_context(ExportService.stream(entity, fmt, filters)),
+            mimetype=MIMETYPES[fmt]
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        # Let nginx pass chunks through instead of buffering the whole export
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+
+def _date_range(column, filters: ExportFilters) -> List[Any]:
+    criteria = []
+    if filters.date_from:
+        criteria.append(column >= datetime.combine(filters.date_from, datetime.min.time()))
+    if filters.date_to:
+        criteria.append(column < datetime.combine(filters.date_to + timedelta(days=1), datetime.min.time()))
+    return criteria
+
+
+def _stream_rows(statement, chunk_size: int):
+    """Execute a column select with a server-side cursor, chunk_size rows per fetch."""
+    return db.session.execute(statement.execution_options(yield_per=chunk_size))
+
+
+def _order_records(filters: ExportFilters, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    criteria = _date_range(Order.created_at, filters)
+    if filters.status:
+        criteria.append(Order.status == filters.status)
+
+    statement = select(
+        *[getattr(Order, column) for column in ORDER_COLUMNS],
+        OrderItem.product_id, Product.name.label('product_name'), OrderItem.quantity, OrderItem.price
+    ).outerjoin(OrderItem, OrderItem.order_id == Order.id)\
+        .outerjoin(Product, Product.id == OrderItem.product_id)\
+        .where(*criteria)\
+        .order_by(Order.id, OrderItem.id)
+
+    # Rows of one order are adjacent: group them into one record
+    current = None
+    for row in _stream_rows(statement, chunk_size):
+        mapping = row._mapping
+        if current is None or current['id'] != mapping['id']:
+            if current is not None:
+                yield current
+            current = {column: mapping[column] for column in ORDER_COLUMNS}
+            current['items'] = []
+        if mapping['product_id'] is not None:
+            current['items'].append({column: mapping[column] for column in ORDER_ITEM_COLUMNS})
+    if current is not None:
+        yield current
+
+
+def _product_records(filters: ExportFilters, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    criteria = _date_range(Product.created_at, filters)
+    if filters.category_id is not None:
+        criteria.append(Product.category_id == filters.category_id)
+    if filters.is_active is not None:
+        criteria.append(Product.is_active == filters.is_active)
+
+    statement = select(
+        *[getattr(Product, column) for column in PRODUCT_COLUMNS if column != 'category_name'],
+        Category.name.label('category_name')
+    ).outerjoin(Category, Category.id == Product.category_id)\
+        .where(*criteria)\
+        .order_by(Product.id)
+
+    for row in _stream_rows(statement, chunk_size):
+        mapping = row._mapping
+        yield {column: mapping[column] for column in PRODUCT_COLUMNS}
+
+
+def _user_records(filters: ExportFilters, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    criteria = _date_range(User.created_at, filters)
+    if filters.role:
+        criteria.append(User.role == filters.role)
+
+    # Never export password hashes
+    statement = select(*[getattr(User, column) for column in USER_COLUMNS])\
+        .where(*criteria)\
+        .order_by(User.id)
+
+    for row in _stream_rows(statement, chunk_size):
+        yield dict(row._mapping)
+
+
+_RECORDS: Dict[str, Callable[[ExportFilters, int], Iterator[Dict[str, Any]]]] = {
+    'orders': _order_records,
+    'products': _product_records,
+    'users': _user_records,
+}
+
+
+def _csv_header(entity: str) -> List[str]:
+    if entity == 'orders':
+        return ORDER_COLUMNS + ['item_' + column for column in ORDER_ITEM_COLUMNS]
+    return PRODUCT_COLUMNS if entity == 'products' else USER_COLUMNS
+
+
+def _csv_cell(value: Any) -> Any:
+    """Neutralize user text that a spreadsheet would run as a formula (CSV injection)."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_rows(entity: str, record: Dict[str, Any]) -> Iterator[List[Any]]:
+    if entity != 'orders':
+        yield [_csv_cell(record[column]) for column in _csv_header(entity)]
+        return
+    order = [_csv_cell(record[column]) for column in ORDER_COLUMNS]
+    if not record['items']:
+        yield order + [None] * len(ORDER_ITEM_COLUMNS)
+    for item in record['items']:
+        yield order + [_csv_cell(item[column]) for column in ORDER_ITEM_COLUMNS]
+
+
+def _csv_chunks(entity: str, records: Iterator[Dict[str, Any]], chunk_size: int) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so that spreadsheet programs detect UTF-8 (Chinese names and addresses)
+    buffer.write('\ufeff')
+    writer.writerow(_csv_header(entity))
+    rows = 0
+    for record in records:
+        for row in _csv_rows(entity, record):
+            writer.writerow(row)
+            rows += 1
+        if rows >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
+def _jsonl_chunks(records: Iterator[Dict[str, Any]], chunk_size: int) -> Iterator[str]:
+    dumps = current_app.json.dumps
+    lines = []
+    for record in records:
+        lines.append(dumps(record, sort_keys=False))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
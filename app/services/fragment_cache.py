@@ -0,0 +1,111 @@
+"""
+Render cache for page fragments (homepage sections).
+
+A fragment is rendered HTML stored per process under a name, together with
+the versions of the response cache tags it depends on (see
+app.services.response_cache). A committed write to products, categories or
+banners bumps those tags, which marks dependent fragments stale; so does
+reaching FRAGMENT_CACHE_TTL seconds.
+
+Refreshes are single-flight: one request re-renders a stale fragment while
+concurrent requests keep serving the stale HTML instead of all hitting the
+database at once. Only when there is nothing to serve yet do requests wait
+for the rendering request. If re-rendering fails, the stale HTML is kept.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence
+from flask import current_app
+from markupsafe import Markup
+from app.services.response_cache import ResponseCacheService
+from app.utils.db_routing import cache_fill
+
+
+class FragmentCache:
+    """Rendered fragments with per-name refresh locks."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+
+    def get_or_render(self, name: str, versions: List[int], render: Callable[[], str]) -> Markup:
+        """
+        Cached HTML for a fragment, rendering it if missing or stale.
+
+        Args:
+            name: Fragment name
+            versions: Current versions of the fragment's tags
+            render: Renders the fragment HTML
+        """
+        entry = self._entries.get(name)
+        if entry is not None and self._is_fresh(entry, versions):
+            return entry['html']
+
+        refresh_lock = self._refresh_lock(name)
+        if entry is not None:
+            # Stale: one request refreshes, the others serve the old HTML
+            if not refresh_lock.acquire(blocking=False):
+                return entry['html']
+        else:
+            # Nothing to serve yet: wait for the request that is rendering
+            refresh_lock.acquire()
+        try:
+            entry = self._entries.get(name)
+            if entry is not None and self._is_fresh(entry, versions):
+                return entry['html']
+            try:
+                with cache_fill():
+                    html = Markup(render())
+            except Exception as e:
+                if entry is None:
+                    raise
+                current_app.logger.error(f'Fragment {name} refresh failed, serving stale HTML: {str(e)}')
+                return entry['html']
+            self._entries[name] = {'html': html, 'versions': versions, 'rendered_at': time.monotonic()}
+            return html
+        finally:
+            refresh_lock.release()
+
+    def _is_fresh(self, entry: Dict[str, Any], versions: List[int]) -> bool:
+        return entry['versions'] == versions and time.monotonic() - entry['rendered_at'] < self.ttl
+
+    def _refresh_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            lock = self._refresh_locks.get(name)
+            if lock is None:
+                lock = self._refresh_locks[name] = threading.Lock()
+            return lock
+
+
+class FragmentCacheService:
+    """Service for cached page fragments"""
+
+    @staticmethod
+    def get_cache() -> FragmentCache:
+        """Get (and lazily create) the fragment cache for the current app."""
+        app = current_app._get_current_object()
+        cache = app.extensions.get('fragment_cache')
+        if cache is None:
+            cache = FragmentCache(app.config.get('FRAGMENT_CACHE_TTL', 300))
+            app.extensions['fragment_cache'] = cache
+        return cache
+
+    @staticmethod
+    def render(name: str, tags: Sequence[str], render: Callable[[], str]) -> Markup:
+        """
+        Get a fragment's HTML from the cache.
+
+        Args:
+            name: Fragment name, unique per page section
+            tags: Response cache tags whose writes invalidate the fragment
+            render: Renders the fragment (called at most once at a time)
+
+        Returns:
+            HTML safe to output in a template
+        """
+        if not current_app.config.get('FRAGMENT_CACHE_ENABLED', True):
+            return Markup(render())
+        versions = ResponseCacheService.get_cache().tag_versions(list(tags))
+        return FragmentCacheService.get_cache().get_or_render(name, versions, render)
@@ -0,0 +1,389 @@
+"""
+Image service for background WebP conversion.
+
+save_uploaded_file stores the raw upload (e.g. products/<uuid>.jpg) and
+returns that path straight away. The conversion job is queued when the
+request's app context tears down, i.e. after the controller has committed
+the row that references the raw path. A process pool converts the image to
+<uuid>.webp plus its responsive width variants (each written to a
+temporary file and moved into place with os.replace), then the stored path
+is swapped in the database with a conditional UPDATE and the raw file is
+removed. Old pages that still reference the raw path keep working through
+the /uploads WebP fallback.
+
+The queue is bounded by IMAGE_QUEUE_SIZE: when it is full, uploads are
+converted synchronously in the request as before. Jobs of a request that
+failed are not submitted, and a job whose swap finds no row referencing
+the upload deletes the raw and converted files. Job status is kept per
+process for the status endpoint; jobs no longer in memory are resolved
+from the files on disk.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from flask import current_app, g
+from PIL import Image
+from sqlalchemy import func, update
+from app.models import Product, Category, Banner
+from app import db
+from app.constants import IMAGE_VARIANT_WIDTHS
+from app.utils.images import RAW_EXTENSIONS, variant_path, variant_paths, variant_widths
+
+IMAGE_PROCESSING_ASYNC = 'async'
+IMAGE_PROCESSING_SYNC = 'sync'
+
+JOB_PENDING = 'pending'        # waiting for the request to finish
+JOB_QUEUED = 'queued'          # submitted to the process pool
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_DISCARDED = 'discarded'    # no row references the upload; its files were deleted
+
+WEBP_QUALITY = 85
+
+UPLOAD_FOLDERS = ('products', 'categories', 'banners')
+
+# Finished jobs remembered per process for the status endpoint
+JOB_HISTORY_SIZE = 1000
+
+
+def flatten_image(img: Image.Image) -> Image.Image:
+    """Convert an image to RGB, compositing transparency onto white."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def save_webp(img: Image.Image, path: str, quality: int = WEBP_QUALITY) -> None:
+    """Write a WebP file atomically (temp file + os.replace)."""
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        img.save(temp_path, 'WEBP', quality=quality, optimize=True)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def save_variants(img: Image.Image, path: str, quality: int = WEBP_QUALITY) -> None:
+    """
+    Write the responsive width variants of an image next to path.
+
+    Only widths below the image's own are written (no upscaled or
+    same-size copies); the full image is served for the others. Variants
+    at those widths left by earlier versions are removed.
+    """
+    widths = variant_widths(img.width)
+    for width in IMAGE_VARIANT_WIDTHS:
+        target = variant_path(path, width)
+        if width not in widths:
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        height = max(1, round(img.height * width / img.width))
+        save_webp(img.resize((width, height), Image.LANCZOS), target, quality)
+
+
+def save_webp_set(img: Image.Image, path: str, quality: int = WEBP_QUALITY) -> None:
+    """Write an image and its variants; the full image is written last."""
+    img = flatten_image(img)
+    save_variants(img, path, quality)
+    save_webp(img, path, quality)
+
+
+def convert_image(source_path: str, target_path: str, quality: int = WEBP_QUALITY) -> str:
+    """
+    Convert an image file to WebP with its variants. Runs in a worker process.
+
+    Returns:
+        target_path
+    """
+    with Image.open(source_path) as img:
+        save_webp_set(img, target_path, quality)
+    return target_path
+
+
+def create_variants(path: str, quality: int = WEBP_QUALITY) -> str:
+    """Generate missing variants for an existing WebP image. Runs in a worker process."""
+    with Image.open(path) as img:
+        save_variants(flatten_image(img), path, quality)
+    return path
+
+
+def _delete_upload(upload_folder: str, job: Dict[str, Any]) -> None:
+    """Remove a job's raw upload and converted WebP files (with variants)."""
+    paths = [job['source'], job['path']] + list(variant_paths(job['path']).values())
+    for path in paths:
+        full_path = os.path.join(upload_folder, path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+
+
+class ImagePipeline:
+    """Bounded process pool plus per-process job bookkeeping."""
+
+    def __init__(self, app, workers: int, queue_size: int):
+        self.app = app
+        self.queue_size = queue_size
+        self._workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._jobs: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+
+    def try_reserve(self) -> bool:
+        """Claim a queue slot for a new job; False when the queue is full."""
+        with self._lock:
+            if self._inflight >= self.queue_size:
+                return False
+            self._inflight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._inflight = max(0, self._inflight - 1)
+
+    def add_job(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job['id']] = job
+            while len(self._jobs) > JOB_HISTORY_SIZE:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest['status'] not in (JOB_DONE, JOB_FAILED):
+                    break
+                del self._jobs[oldest_id]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update_job(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+
+    def submit(self, job: Dict[str, Any]) -> None:
+        upload_folder = self.app.config['UPLOAD_FOLDER']
+        source = os.path.join(upload_folder, job['source'])
+        target = os.path.join(upload_folder, job['path'])
+        try:
+            future = self._get_executor().submit(convert_image, source, target)
+        except Exception as e:
+            self._finish(job, error=str(e))
+            return
+        self.update_job(job['id'], status=JOB_QUEUED)
+        future.add_done_callback(lambda f: self._finish(job, future=f))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'inflight': self._inflight, 'queue_size': self.queue_size}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self._workers)
+        return self._executor
+
+    def _finish(self, job: Dict[str, Any], future=None, error: Optional[str] = None) -> None:
+        """Swap the stored path once the WebP file is in place."""
+        try:
+            if future is not None:
+                error = str(future.exception()) if future.exception() else None
+            if error:
+                self.update_job(job['id'], status=JOB_FAILED, error=error, finished_at=time.time())
+                with self.app.app_context():
+                    current_app.logger.error(f'Image conversion failed for {job["source"]}: {error}')
+                return
+
+            with self.app.app_context():
+                try:
+                    swapped = ImageService.swap_path(job['folder'], job['source'], job['path'])
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    # Keep the raw file: rows still reference it
+                    self.update_job(job['id'], status=JOB_FAILED, error=str(e), finished_at=time.time())
+                    current_app.logger.error(f'Image path swap failed for {job["source"]}: {str(e)}')
+                    return
+                finally:
+                    db.session.remove()
+
+            if swapped == 0 and job['source'] != job['path'] and job['folder'] in UPLOAD_FOLDERS:
+                # The row was never committed or no longer uses this upload
+                _delete_upload(self.app.config['UPLOAD_FOLDER'], job)
+                self.update_job(job['id'], status=JOB_DISCARDED, swapped=0, finished_at=time.time())
+                return
+
+            if job['source'] != job['path']:
+                source = os.path.join(self.app.config['UPLOAD_FOLDER'], job['source'])
+                if os.path.exists(source):
+                    os.remove(source)
+
+            # Requests for the new files may have been cached as misses
+            with self.app.app_context():
+                from app.services.upload_service import UploadService
+                UploadService.forget([job['source'], job['path']] + list(variant_paths(job['path']).values()))
+            self.update_job(job['id'], status=JOB_DONE, swapped=swapped, finished_at=time.time())
+        finally:
+            self.release()
+
+
+class ImageService:
+    """Service for asynchronous upload image processing"""
+
+    @staticmethod
+    def init_app(app) -> None:
+        """Queue deferred conversion jobs when each app context ends."""
+        app.teardown_appcontext(ImageService._submit_pending)
+
+    @staticmethod
+    def get_pipeline() -> ImagePipeline:
+        """Get (and lazily create) the image pipeline for the current app."""
+        app = current_app._get_current_object()
+        pipeline = app.extensions.get('image_pipeline')
+        if pipeline is None:
+            pipeline = ImagePipeline(
+                app,
+                workers=app.config.get('IMAGE_WORKERS', 2),
+                queue_size=app.config.get('IMAGE_QUEUE_SIZE', 32)
+            )
+            app.extensions['image_pipeline'] = pipeline
+        return pipeline
+
+    @staticmethod
+    def is_async() -> bool:
+        return current_app.config.get('IMAGE_PROCESSING', IMAGE_PROCESSING_ASYNC) == IMAGE_PROCESSING_ASYNC
+
+    @staticmethod
+    def enqueue(folder: str, source: str, target: str) -> Optional[str]:
+        """
+        Schedule background conversion of a saved raw upload.
+
+        Args:
+            folder: Upload subfolder ('products', 'categories', 'banners', ...)
+            source: Relative path of the raw upload
+            target: Relative path of the WebP file to produce
+
+        Returns:
+            Job ID, or None if the queue is full (caller converts synchronously)
+        """
+        pipeline = ImageService.get_pipeline()
+        if not pipeline.try_reserve():
+            return None
+
+        job_id = os.path.splitext(os.path.basename(target))[0]
+        job = {
+            'id': job_id,
+            'status': JOB_PENDING,
+            'folder': folder,
+            'source': source,
+            'path': target,
+            'error': None,
+            'created_at': time.time(),
+            'finished_at': None,
+        }
+        pipeline.add_job(job)
+        # Submitted at teardown, after the request has committed its rows
+        g.setdefault('pending_image_jobs', []).append(job)
+        return job_id
+
+    @staticmethod
+    def get_status(job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a conversion job.
+
+        Jobs from other worker processes (or evicted from memory) are
+        resolved from the files on disk.
+        """
+        job = ImageService.get_pipeline().get_job(job_id)
+        if job is not None:
+            return ImageService._public_job(job)
+
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        for folder in UPLOAD_FOLDERS:
+            webp_path = f'{folder}/{job_id}.webp'
+            raw_path = next((f'{folder}/{job_id}.{ext}' for ext in RAW_EXTENSIONS
+                             if os.path.exists(os.path.join(upload_folder, folder, f'{job_id}.{ext}'))), None)
+            if raw_path:
+                return {'id': job_id, 'status': JOB_QUEUED, 'path': raw_path, 'error': None}
+            if os.path.exists(os.path.join(upload_folder, webp_path)):
+                return {'id': job_id, 'status': JOB_DONE, 'path': webp_path, 'error': None}
+        return None
+
+    @staticmethod
+    def swap_path(folder: str, source: str, target: str) -> int:
+        """
+        Replace a stored upload path with the converted one.
+
+        Only rows still referencing the raw path are touched, so a row that
+        was edited in the meantime is left alone.
+
+        Returns:
+            Number of rows updated
+        """
+        if source == target:
+            return 0
+
+        if folder == 'products':
+            # images is a JSON array of paths; match the quoted path exactly
+            result = db.session.execute(
+                update(Product)
+                .where(Product.images.contains(f'"{source}"'))
+                .values(images=func.replace(Product.images, f'"{source}"', f'"{target}"'))
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount
+
+        if folder == 'categories':
+            result = db.session.execute(
+                update(Category).where(Category.image == source).values(image=target)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                from app.services.category_service import CategoryService
+                CategoryService.invalidate()
+            return result.rowcount
+
+        if folder == 'banners':
+            result = db.session.execute(
+                update(Banner).where(Banner.image == source).values(image=target)
+                .execution_options(synchronize_session=False)
+            )
+            return result.rowcount
+
+        return 0
+
+    @staticmethod
+    def _submit_pending(exception=None) -> None:
+        jobs: List[Dict[str, Any]] = g.pop('pending_image_jobs', None)
+        if not jobs:
+            return
+        pipeline = ImageService.get_pipeline()
+        for job in jobs:
+            if exception is None:
+                pipeline.submit(job)
+                continue
+            # The request failed and rolled back: nothing references the raw upload
+            _delete_upload(current_app.config['UPLOAD_FOLDER'], job)
+            pipeline.update_job(job['id'], status=JOB_DISCARDED, finished_at=time.time())
+            pipeline.release()
+
+    @staticmethod
+    def _public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'path': job['path'] if job['status'] == JOB_DONE else job['source'],
+            'error': job['error'],
+        }
+
@@ -3,8 +3,9 @@ Order service for handling order operations
 """
 from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
-from app.models import Order, OrderItem, Product
+from app.models import Order, OrderItem
 from app import db
+from app.services.stock_service import StockService, InsufficientStockError
 from app.constants import ORDER_STATUS_PENDING
 
 
@@ -41,6 +42,7 @@ class OrderService:
             product = item['product']
             quantity = item['quantity']
             
+            # Fast fail before opening the write transaction
             if product.stock < quantity:
                 return None, f'Insufficient stock for {product.name}'
             
@@ -54,6 +56,10 @@ class OrderService:
                 'price': price
             })
         
+        reservation = [
+            (item_data['product'].id, item_data['quantity']) for item_data in order_items_data
+        ]
+        
         # Create order
         order = Order(
             order_number=Order.generate_order_number(),
@@ -66,10 +72,14 @@ class OrderService:
         )
         
         try:
+            # Atomically reserve stock first; the check above used a possibly
+            # stale snapshot, this is the authoritative one
+            StockService.reserve(reservation)
+            
             db.session.add(order)
             db.session.flush()
             
-            # Create order items and update stock
+            # Create order items
             for item_data in order_items_data:
                 order_item = OrderItem(
                     order_id=order.id,
@@ -78,13 +88,17 @@ class OrderService:
                     price=item_data['price']
                 )
                 db.session.add(order_item)
-                
-                # Update product stock
-                item_data['product'].stock -= item_data['quantity']
             
             db.session.commit()
             return order, None
             
+        except InsufficientStockError:
+            db.session.rollback()
+            insufficient = StockService.find_insufficient(reservation)
+            if insufficient:
+                return None, f'Insufficient stock for {insufficient[0].name}'
+            return None, 'Insufficient stock'
+            
         except Exception as e:
             db.session.rollback()
             return None, f"Error creating order: {str(e)}"
@@ -0,0 +1,620 @@
+"""
+Bulk product import from CSV or JSON Lines.
+
+Rows are validated one by one and written in batches of IMPORT_BATCH_SIZE:
+
+- categories are resolved by slug from one lookup of all category slugs
+- rows with a slug that already exists update that product (upsert), as
+  does a row repeating the slug of an earlier row in the file;
+  rows without a slug are inserted under a unique slug generated from
+  the name (name, name-2, name-3, ...), checked with one query per batch
+- inserts and updates are one executemany statement each, committed per
+  batch, so a failing batch doesn't undo the batches before it
+- images (http(s) URLs, or local paths for the CLI) are downloaded and
+  converted to WebP with their variants in a process pool while the
+  batch is being prepared; URLs must resolve to public addresses (also
+  after redirects), and the images of a batch that fails to commit are
+  deleted again
+
+Invalid rows and failed images are reported with their line numbers; the
+other rows are still imported.
+
+Uploads from the API and the admin panel run as background jobs
+(start_job): the file is saved to IMPORT_FOLDER and imported by one
+thread per process, one job at a time, sharing the app's image process
+pool. Job status and the report are kept as JSON files next to the
+upload, so every worker process can answer status requests.
+"""
+import csv
+import io
+import ipaddress
+import json
+import os
+import re
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from flask import current_app
+from PIL import Image
+from sqlalchemy import insert, or_, select, update
+from app.models import Product, Category
+from app import db
+from app.constants import IMPORT_FORMAT_CSV, IMPORT_FORMAT_JSONL, IMPORT_MAX_ERRORS
+from app.services.image_service import save_webp_set
+from app.services.search_service import SearchService
+from app.services.dashboard_service import DashboardService
+from app.services.related_products import RelatedProductsService
+from app.utils.helpers import delete_file, slugify
+from app.utils.images import parse_images
+
+SLUG_MAX_LENGTH = 200
+# Room for a -<n> suffix within the column length
+SLUG_BASE_LENGTH = 190
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off'}
+
+JOB_QUEUED = 'queued'      # saved, waiting for the import thread
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+def check_public_url(url: str) -> None:
+    """
+    Refuse URLs that would make the server request an internal address (SSRF).
+
+    Raises:
+        ValueError: Not http(s), or the host resolves to a private,
+            loopback, link-local or otherwise non-public address
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError('only http(s) URLs are allowed')
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, None, proto=socket.IPPROTO_TCP)}
+    except (OSError, UnicodeError):
+        raise ValueError(f'cannot resolve host {parts.hostname}') from None
+    for text in addresses:
+        address = ipaddress.ip_address(text.split('%')[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f'host {parts.hostname} resolves to a non-public address')
+
+
+class _PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Check redirect targets like the original URL."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_public_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def fetch_image(source: str, target_path: str, timeout: float, max_bytes: int) -> str:
+    """
+    Download (or open) an image and write it as WebP with its variants.
+    Runs in a worker process.
+
+    Returns:
+        target_path
+    """
+    if source.startswith(('http://', 'https://')):
+        check_public_url(source)
+        request = urllib.request.Request(source, headers={'User-Agent': 'shopping-import/1.0'})
+        opener = urllib.request.build_opener(_PublicRedirectHandler)
+        try:
+            with opener.open(request, timeout=timeout) as response:
+                data = response.read(max_bytes + 1)
+        except OSError as e:
+            # HTTPError holds the response and can't be sent back from the worker
+            raise ValueError(str(e)) from None
+        if len(data) > max_bytes:
+            raise ValueError('image is larger than MAX_CONTENT_LENGTH')
+        img = Image.open(io.BytesIO(data))
+    else:
+        img = Image.open(source)
+    with img:
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        save_webp_set(img, target_path)
+    return target_path
+
+
+@dataclass
+class ImportReport:
+    """Progress and result of an import run."""
+    total: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    images: int = 0
+    image_failures: int = 0
+    batches: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+    def add_error(self, line: int, message: str) -> None:
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line, 'message': message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'images': self.images,
+            'image_failures': self.image_failures,
+            'batches': self.batches,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors,
+        }
+
+
+class SlugAllocator:
+    """Unique slugs for new products, one lookup query per batch."""
+
+    def __init__(self):
+        self._next: Dict[str, int] = {}  # base -> next suffix (1 = the base itself)
+
+    def allocate(self, names: List[str]) -> List[str]:
+        bases = [(slugify(name) or 'product')[:SLUG_BASE_LENGTH].strip('-') or 'product' for name in names]
+        self._load([base for base in set(bases) if base not in self._next])
+
+        slugs = []
+        for base in bases:
+            number = self._next[base]
+            slugs.append(base if number == 1 else f'{base}-{number}')
+            self._next[base] = number + 1
+        return slugs
+
+    def _load(self, bases: List[str]) -> None:
+        if not bases:
+            return
+        conditions = [Product.slug.in_(bases)]
+        conditions.extend(Product.slug.like(_escape_like(base) + '-%', escape='\\') for base in bases)
+        taken = db.session.execute(select(Product.slug).where(or_(*conditions))).scalars()
+
+        highest = {base: 0 for base in bases}
+        for slug in taken:
+            if slug in highest:
+                highest[slug] = max(highest[slug], 1)
+                continue
+            base, _, suffix = slug.rpartition('-')
+            if base in highest and suffix.isdigit():
+                highest[base] = max(highest[base], int(suffix))
+        for base, number in highest.items():
+            self._next[base] = number + 1
+
+
+class ImportRunner:
+    """Background import thread and shared image process pool of an app."""
+
+    def __init__(self, app, workers: int):
+        self.app = app
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, job_id: str, path: str, fmt: str, batch_size: Optional[int]) -> None:
+        with self._lock:
+            if self._threads is None:
+                # One import at a time per process; later uploads queue
+                self._threads = ThreadPoolExecutor(max_workers=1, thread_name_prefix='product-import')
+        self._threads.submit(self._run, job_id, path, fmt, batch_size)
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self._workers)
+            return self._pool
+
+    def _run(self, job_id: str, path: str, fmt: str, batch_size: Optional[int]) -> None:
+        with self.app.app_context():
+            job = _read_job(job_id) or {'id': job_id}
+
+            def progress(report: ImportReport) -> None:
+                _write_job(dict(job, status=JOB_RUNNING, report=report.to_dict()))
+
+            _write_job(dict(job, status=JOB_RUNNING, started_at=time.time()))
+            job = _read_job(job_id)
+            try:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    report = ProductImportService.import_file(
+                        stream, fmt, batch_size=batch_size, pool=self.get_pool(), progress=progress
+                    )
+                _write_job(dict(job, status=JOB_DONE, report=report.to_dict(), finished_at=time.time()))
+            except Exception as e:
+                current_app.logger.error(f'Product import {job_id} failed: {str(e)}')
+                _write_job(dict(job, status=JOB_FAILED, error=str(e), finished_at=time.time()))
+            finally:
+                db.session.remove()
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class ProductImportService:
+    """Service for bulk product imports"""
+
+    @staticmethod
+    def format_for(filename: str) -> Optional[str]:
+        """Import format from a file name's extension (None if unsupported)."""
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension == '.csv':
+            return IMPORT_FORMAT_CSV
+        if extension in ('.jsonl', '.ndjson'):
+            return IMPORT_FORMAT_JSONL
+        return None
+
+    @staticmethod
+    def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Any]]:
+        """
+        Iterate (line number, row) pairs of a CSV or JSONL document.
+
+        CSV needs a header row; the images column holds paths separated by |.
+        A JSONL line that isn't a JSON object is returned as an error string.
+        """
+        if fmt == IMPORT_FORMAT_CSV:
+            for line, row in enumerate(csv.DictReader(stream), 2):
+                yield line, row
+            return
+
+        for line, text in enumerate(stream, 1):
+            text = text.strip()
+            if not text:
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                yield line, 'JSON 格式錯誤'
+                continue
+            yield line, row if isinstance(row, dict) else '每一行必須是 JSON 物件'
+
+    @staticmethod
+    def import_rows(rows: Iterable[Tuple[int, Any]], batch_size: Optional[int] = None,
+                    workers: Optional[int] = None, allow_local_images: bool = False,
+                    progress: Optional[Callable[[ImportReport], None]] = None,
+                    pool: Optional[ProcessPoolExecutor] = None) -> ImportReport:
+        """
+        Validate and upsert product rows in batches.
+
+        Args:
+            rows: (line number, row dict) pairs, e.g. from read_rows
+            batch_size: Rows per batch (default IMPORT_BATCH_SIZE)
+            workers: Image worker processes (default IMPORT_IMAGE_WORKERS)
+            allow_local_images: Accept file paths as images (CLI only)
+            progress: Called with the report after every batch
+            pool: Image process pool to use instead of starting one
+
+        Returns:
+            ImportReport
+        """
+        config = current_app.config
+        batch_size = max(1, batch_size or config.get('IMPORT_BATCH_SIZE', 500))
+        workers = max(1, workers or config.get('IMPORT_IMAGE_WORKERS', 4))
+
+        report = ImportReport()
+        categories = dict(db.session.execute(select(Category.slug, Category.id)).all())
+        slugs = SlugAllocator()
+        pools: List[ProcessPoolExecutor] = []
+
+        def get_pool() -> ProcessPoolExecutor:
+            if pool is not None:
+                return pool
+            # Started on the first batch with images
+            if not pools:
+                pools.append(ProcessPoolExecutor(max_workers=workers))
+            return pools[0]
+
+        try:
+            batch = []
+            for line, row in rows:
+                report.total += 1
+                values, error = _validate(row, categories, allow_local_images)
+                if error:
+                    report.failed += 1
+                    report.add_error(line, error)
+                    continue
+                batch.append((line, values))
+                if len(batch) >= batch_size:
+                    _write_batch(batch, report, slugs, get_pool)
+                    batch = []
+                    if progress:
+                        progress(report)
+            if batch:
+                _write_batch(batch, report, slugs, get_pool)
+                if progress:
+                    progress(report)
+        finally:
+            for own_pool in pools:
+                own_pool.shutdown()
+            report.elapsed = time.perf_counter() - report.started_at
+
+        if report.inserted or report.updated:
+            # Bulk statements bypass the per-object listeners of these caches
+            DashboardService.invalidate()
+            RelatedProductsService.invalidate()
+            SearchService.invalidate()
+        return report
+
+    @staticmethod
+    def import_file(stream: TextIO, fmt: str, **kwargs) -> ImportReport:
+        """Import a CSV or JSONL document (see import_rows for the options)."""
+        return ProductImportService.import_rows(ProductImportService.read_rows(stream, fmt), **kwargs)
+
+    @staticmethod
+    def start_job(file, fmt: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Save an uploaded file and import it in the background.
+
+        Args:
+            file: Uploaded file (werkzeug FileStorage)
+            fmt: Import format
+            batch_size: Rows per batch (default IMPORT_BATCH_SIZE)
+
+        Returns:
+            The queued job (see get_job)
+        """
+        job_id = uuid.uuid4().hex
+        path = os.path.join(_import_folder(), f'{job_id}.{fmt}')
+        file.save(path)
+        job = {'id': job_id, 'status': JOB_QUEUED, 'format': fmt, 'report': None, 'error': None,
+               'created_at': time.time(), 'started_at': None, 'finished_at': None}
+        _write_job(job)
+        ProductImportService.get_runner().submit(job_id, path, fmt, batch_size)
+        return job
+
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Status of a background import: queued, running (report so far),
+        done (final report) or failed (error). None if unknown.
+        """
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''):
+            return None
+        return _read_job(job_id)
+
+    @staticmethod
+    def get_runner() -> ImportRunner:
+        """Get (and lazily create) the background import runner of the current app."""
+        app = current_app._get_current_object()
+        runner = app.extensions.get('product_import')
+        if runner is None:
+            runner = ImportRunner(app, max(1, app.config.get('IMPORT_IMAGE_WORKERS', 4)))
+            app.extensions['product_import'] = runner
+        return runner
+
+
+def _import_folder() -> str:
+    folder = current_app.config.get('IMPORT_FOLDER') or os.path.join(current_app.instance_path, 'imports')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _read_job(job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(_import_folder(), f'{job_id}.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_job(job: Dict[str, Any]) -> None:
+    """Write a job's status atomically (temp file + os.replace)."""
+    path = os.path.join(_import_folder(), f'{job["id"]}.json')
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _escape_like(value: str) -> str:
+    return re.sub(r'([\\%_])', r'\\\1', value)
+
+
+def _text(row: Dict[str, Any], key: str) -> str:
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _validate(row: Any, categories: Dict[str, int],
+              allow_local_images: bool) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Normalized column values of a row, or an error message."""
+    if isinstance(row, str):
+        return None, row
+
+    name = _text(row, 'name')
+    if not name:
+        return None, '產品名稱不能為空'
+    if len(name) > 200:
+        return None, '產品名稱不能超過200個字元'
+
+    try:
+        price = Decimal(_text(row, 'price'))
+    except InvalidOperation:
+        return None, '價格格式錯誤'
+    if not price.is_finite() or price < 0:
+        return None, '價格必須大於等於0'
+
+    stock_text = _text(row, 'stock') or '0'
+    if not re.fullmatch(r'\d+', stock_text):
+        return None, '庫存必須大於等於0'
+
+    category_slug = _text(row, 'category') or _text(row, 'category_slug')
+    if not category_slug:
+        return None, '分類不能為空'
+    category_id = categories.get(category_slug)
+    if category_id is None:
+        return None, f'找不到分類: {category_slug}'
+
+    is_active = row.get('is_active', True)
+    if not isinstance(is_active, bool):
+        text = str(is_active).strip().lower()
+        if text in TRUE_VALUES or text == '':
+            is_active = True
+        elif text in FALSE_VALUES:
+            is_active = False
+        else:
+            return None, '啟用狀態格式錯誤'
+
+    images = row.get('images') or []
+    if isinstance(images, str):
+        images = [path.strip() for path in images.split('|') if path.strip()]
+    if not isinstance(images, list) or not all(isinstance(path, str) for path in images):
+        return None, '圖片格式錯誤'
+    for source in images:
+        if not source.startswith(('http://', 'https://')) \
+                and not (allow_local_images and os.path.isfile(source)):
+            return None, f'無法讀取圖片: {source}'
+
+    slug = _text(row, 'slug')
+    if slug:
+        slug = slugify(slug)[:SLUG_MAX_LENGTH]
+        if not slug:
+            return None, '網址代稱格式錯誤'
+
+    return {
+        'slug': slug or None,
+        'name': name,
+        'description': _text(row, 'description') or None,
+        'price': price,
+        'stock': int(stock_text),
+        'category_id': category_id,
+        'is_active': is_active,
+        'images': images,
+    }, None
+
+
+def _convert_images(batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport,
+                    pool: ProcessPoolExecutor) -> None:
+    """Replace each row's image sources with stored WebP paths."""
+    config = current_app.config
+    upload_folder = os.path.join(config['UPLOAD_FOLDER'], 'products')
+    timeout = config.get('IMPORT_IMAGE_TIMEOUT', 15)
+    max_bytes = config.get('MAX_CONTENT_LENGTH') or 16 * 1024 * 1024
+
+    futures = []
+    for line, values in batch:
+        for source in values['images']:
+            name = f'{uuid.uuid4().hex}.webp'
+            future = pool.submit(fetch_image, source, os.path.join(upload_folder, name), timeout, max_bytes)
+            futures.append((line, values, source, f'products/{name}', future))
+        values['images'] = []
+
+    for line, values, source, path, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            report.image_failures += 1
+            report.add_error(line, f'圖片處理失敗: {source} ({str(e)})')
+            continue
+        values['images'].append(path)
+        report.images += 1
+
+
+def _write_batch(batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport,
+                 slugs: SlugAllocator, get_pool: Callable[[], ProcessPoolExecutor]) -> None:
+    """Upsert one batch: one lookup, one INSERT and one UPDATE statement."""
+    explicit = {values['slug'] for _, values in batch if values['slug']}
+    existing: Dict[str, Tuple[int, Optional[str]]] = {
+        slug: (product_id, images) for slug, product_id, images in db.session.execute(
+            select(Product.slug, Product.id, Product.images).where(Product.slug.in_(explicit))
+        ).all()
+    } if explicit else {}
+
+    new_rows = [values for _, values in batch if not values['slug']]
+    for values, slug in zip(new_rows, slugs.allocate([values['name'] for values in new_rows])):
+        while slug in explicit:
+            # Taken by a new product with an explicit slug in this batch
+            slug = slugs.allocate([values['name']])[0]
+        values['slug'] = slug
+
+    if any(values['images'] for _, values in batch):
+        _convert_images(batch, report, get_pool())
+
+    now = datetime.utcnow()
+    inserts: Dict[str, Dict[str, Any]] = {}
+    updates: Dict[int, Dict[str, Any]] = {}
+    # Rows that update a product written by an earlier row of the batch
+    merged = 0
+    replaced_images: List[str] = []
+    for _, values in batch:
+        images = json.dumps(values['images']) if values['images'] else None
+        row = {key: values[key] for key in ('slug', 'name', 'description', 'price', 'stock',
+                                            'category_id', 'is_active')}
+        product_id, stored_images = existing.get(values['slug'], (None, None))
+        if product_id is None:
+            row.update(images=images, created_at=now, updated_at=now)
+            earlier = inserts.get(row['slug'])
+            if earlier is not None:
+                # Same new slug twice: the later row updates the product of the earlier one
+                merged += 1
+                if images is None:
+                    row['images'] = earlier['images']
+                elif earlier['images']:
+                    replaced_images.extend(json.loads(earlier['images']))
+            inserts[row['slug']] = row
+            continue
+        row.update(id=product_id, updated_at=now)
+        if images:
+            row['images'] = images
+        if product_id in updates:
+            merged += 1
+            if images and 'images' in updates[product_id]:
+                replaced_images.extend(json.loads(updates[product_id]['images']))
+            elif 'images' in updates[product_id]:
+                row['images'] = updates[product_id]['images']
+            elif images:
+                replaced_images.extend(parse_images(stored_images).paths)
+        elif images:
+            # The product's current images are replaced
+            replaced_images.extend(parse_images(stored_images).paths)
+        # Keep the last row per product; executemany needs the same keys
+        updates[product_id] = row
+
+    inserts = list(inserts.values())
+    try:
+        if inserts:
+            db.session.execute(insert(Product), inserts)
+        for rows in _group_by_keys(updates.values()).values():
+            db.session.execute(update(Product), rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        # No row references this batch's images
+        for _, values in batch:
+            for path in values['images']:
+                delete_file(path)
+        report.failed += len(batch)
+        report.add_error(batch[0][0], f'批次寫入失敗: {str(e)}')
+        return
+    finally:
+        report.batches += 1
+        report.elapsed = time.perf_counter() - report.started_at
+
+    report.inserted += len(inserts)
+    report.updated += len(updates) + merged
+    for path in replaced_images:
+        delete_file(path)
+
+
+def _group_by_keys(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups
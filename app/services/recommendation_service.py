@@ -0,0 +1,230 @@
+"""
+"Customers also bought" recommendations from order history.
+
+A batch job (build_recommendations.py) streams order lines of
+non-cancelled orders in keyset chunks ordered by (order_id, id), so at
+most one chunk plus the order currently being read is held in memory.
+Every order adds 1 to the co-occurrence count of each pair of distinct
+products in it. The counts live in a sparse, dictionary-of-keys matrix
+(only non-zero cells are stored), from which the top K neighbours per
+product are written to product_recommendations in one transaction.
+
+Reads are one indexed query on that table joined to products, so only
+active products are returned.
+"""
+import heapq
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import and_, delete, desc, func, insert, or_, select
+from app.models import Product, Order, OrderItem, ProductRecommendation
+from app import db
+from app.services.response_cache import ResponseCacheService, TAG_RECOMMENDATIONS
+from app.utils.serializers import PROJECTION_CARD, product_load_options, serialize_products
+from app.constants import (ORDER_STATUS_CANCELLED, RECOMMENDATION_TOP_K, RECOMMENDATION_CHUNK_SIZE,
+                           RECOMMENDATION_MAX_ORDER_SIZE)
+
+
+class CoOccurrenceMatrix:
+    """Symmetric sparse product x product matrix of co-purchase counts."""
+
+    def __init__(self):
+        self._rows: Dict[int, Counter] = defaultdict(Counter)
+        self.orders = 0
+        self.skipped_orders = 0
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored (non-zero) cells."""
+        return sum(len(row) for row in self._rows.values())
+
+    def add_order(self, product_ids: Set[int], max_size: int = RECOMMENDATION_MAX_ORDER_SIZE) -> None:
+        """Count every pair of distinct products in one order."""
+        if len(product_ids) < 2:
+            return
+        if len(product_ids) > max_size:
+            # Pair count grows quadratically and bulk orders say little about taste
+            self.skipped_orders += 1
+            return
+        self.orders += 1
+        product_ids = sorted(product_ids)
+        for i, product_a in enumerate(product_ids):
+            row_a = self._rows[product_a]
+            for product_b in product_ids[i + 1:]:
+                row_a[product_b] += 1
+                self._rows[product_b][product_a] += 1
+
+    def top_k(self, k: int) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+        """(product ID, [(neighbour ID, count), ...]) best first, ties by newer ID."""
+        for product_id in sorted(self._rows):
+            row = self._rows[product_id]
+            yield product_id, heapq.nlargest(k, row.items(), key=lambda item: (item[1], item[0]))
+
+
+class RecommendationService:
+    """Service for co-purchase recommendations"""
+
+    @staticmethod
+    def iter_orders(chunk_size: int = RECOMMENDATION_CHUNK_SIZE,
+                    since: Optional[datetime] = None) -> Iterator[Set[int]]:
+        """
+        Stream the distinct product IDs of each non-cancelled order.
+
+        Args:
+            chunk_size: Order lines fetched per query
+            since: Only orders created after this time
+        """
+        last_order_id, last_item_id = 0, 0
+        current_order_id, current = None, set()
+        while True:
+            query = select(OrderItem.id, OrderItem.order_id, OrderItem.product_id)\
+                .join(Order, Order.id == OrderItem.order_id)\
+                .where(Order.status != ORDER_STATUS_CANCELLED)
+            if since is not None:
+                query = query.where(Order.created_at > since)
+            rows = db.session.execute(
+                query
+                .where(or_(OrderItem.order_id > last_order_id,
+                           and_(OrderItem.order_id == last_order_id, OrderItem.id > last_item_id)))
+                .order_by(OrderItem.order_id, OrderItem.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            for item_id, order_id, product_id in rows:
+                if order_id != current_order_id:
+                    if current:
+                        yield current
+                    current_order_id, current = order_id, set()
+                current.add(product_id)
+            last_item_id, last_order_id = rows[-1].id, rows[-1].order_id
+            if len(rows) < chunk_size:
+                break
+        if current:
+            yield current
+
+    @staticmethod
+    def build_matrix(orders: Iterable[Set[int]],
+                     max_order_size: int = RECOMMENDATION_MAX_ORDER_SIZE) -> CoOccurrenceMatrix:
+        """Accumulate the co-occurrence matrix from per-order product sets."""
+        matrix = CoOccurrenceMatrix()
+        for product_ids in orders:
+            matrix.add_order(product_ids, max_order_size)
+        return matrix
+
+    @staticmethod
+    def save(matrix: CoOccurrenceMatrix, top_k: int = RECOMMENDATION_TOP_K,
+             batch_size: int = RECOMMENDATION_CHUNK_SIZE) -> int:
+        """
+        Replace product_recommendations with the matrix's top K neighbours.
+
+        Returns:
+            Number of rows written
+        """
+        now = datetime.utcnow()
+        table = ProductRecommendation.__table__
+        written = 0
+        try:
+            db.session.execute(delete(table))
+            batch = []
+            for product_id, neighbours in matrix.top_k(top_k):
+                for rank, (recommended_id, score) in enumerate(neighbours, 1):
+                    batch.append({'product_id': product_id, 'rank': rank, 'recommended_id': recommended_id,
+                                  'score': score, 'updated_at': now})
+                if len(batch) >= batch_size:
+                    db.session.execute(insert(table), batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                db.session.execute(insert(table), batch)
+                written += len(batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        ResponseCacheService.invalidate([TAG_RECOMMENDATIONS])
+        return written
+
+    @staticmethod
+    def rebuild(chunk_size: int = RECOMMENDATION_CHUNK_SIZE, top_k: int = RECOMMENDATION_TOP_K,
+                max_order_size: int = RECOMMENDATION_MAX_ORDER_SIZE) -> Dict[str, Any]:
+        """
+        Recompute all recommendations from order history.
+
+        Args:
+            chunk_size: Order lines fetched per query
+            top_k: Neighbours stored per product
+            max_order_size: Orders with more distinct products are skipped
+
+        Returns:
+            Build statistics
+        """
+        started = time.perf_counter()
+        matrix = RecommendationService.build_matrix(
+            RecommendationService.iter_orders(chunk_size), max_order_size
+        )
+        built = time.perf_counter()
+        rows = RecommendationService.save(matrix, top_k, chunk_size)
+        return {
+            'orders': matrix.orders,
+            'skipped_orders': matrix.skipped_orders,
+            'nonzero_pairs': matrix.nnz,
+            'rows_written': rows,
+            'build_seconds': round(built - started, 3),
+            'save_seconds': round(time.perf_counter() - built, 3),
+        }
+
+    @staticmethod
+    def last_run() -> Optional[datetime]:
+        """Time the stored recommendations were written, None if never."""
+        return db.session.execute(select(func.max(ProductRecommendation.updated_at))).scalar()
+
+    @staticmethod
+    def get_for_product(product_id: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Active products most often bought together with a product.
+
+        Returns:
+            Card projection dicts, best first
+        """
+        products = db.session.query(Product)\
+            .options(*product_load_options(PROJECTION_CARD))\
+            .join(ProductRecommendation, ProductRecommendation.recommended_id == Product.id)\
+            .filter(ProductRecommendation.product_id == product_id, Product.is_active == True)\
+            .order_by(ProductRecommendation.rank)\
+            .limit(limit)\
+            .all()
+        return serialize_products(products, PROJECTION_CARD)
+
+    @staticmethod
+    def get_for_products(product_ids: List[int], limit: int) -> List[Dict[str, Any]]:
+        """
+        Active products most often bought together with any of several
+        products (e.g. a cart), excluding those products.
+
+        Scores of the same neighbour are summed across the given products.
+        """
+        if not product_ids:
+            return []
+        score = func.sum(ProductRecommendation.score)
+        ranked = db.session.execute(
+            select(ProductRecommendation.recommended_id)
+            .join(Product, Product.id == ProductRecommendation.recommended_id)
+            .where(ProductRecommendation.product_id.in_(product_ids),
+                   ProductRecommendation.recommended_id.notin_(product_ids),
+                   Product.is_active == True)
+            .group_by(ProductRecommendation.recommended_id)
+            .order_by(desc(score), desc(ProductRecommendation.recommended_id))
+            .limit(limit)
+        ).scalars().all()
+        if not ranked:
+            return []
+
+        products = db.session.query(Product)\
+            .options(*product_load_options(PROJECTION_CARD))\
+            .filter(Product.id.in_(ranked))\
+            .all()
+        by_id = {product.id: product for product in products}
+        return serialize_products([by_id[product_id] for product_id in ranked if product_id in by_id],
+                                  PROJECTION_CARD)
@@ -0,0 +1,320 @@
+"""
+Related products from a precomputed in-memory index.
+
+The index holds, per process, the active products of every category and
+the co-purchase neighbours of each product. Co-purchase counts start from
+the recommendations table, which build_recommendations.py computes outside
+the request path (chunked, cancelled orders excluded; see
+RecommendationService), so the related products and "customers also
+bought" lists agree. Orders placed since that batch run are read on top of
+it, so the index never falls back behind orders it has already seen.
+
+Between rebuilds the index is kept current by ORM write listeners:
+committed orders add their product pairs, and product inserts/deletes or
+changes of category_id / is_active move products between categories.
+
+A rebuild happens every RELATED_PRODUCTS_TTL seconds, which also picks up
+orders placed in other worker processes and bulk UPDATE statements. It is
+single-flight: one request rebuilds while concurrent requests keep using
+the old index; only when there is none yet do they wait for it. Run
+build_recommendations.py regularly to keep the orders read per rebuild few.
+
+Related products are the most often co-purchased active products,
+filled up with the newest active products of the same category. The
+serialized cards (an LRU of RELATED_PRODUCTS_CARDS_SIZE entries) are kept
+with the response cache versions of the products they show, so a product
+page makes no queries until one of those products (or its stock) changes.
+"""
+import bisect
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import NO_VALUE
+from app.models import Product, OrderItem, ProductRecommendation
+from app import db
+from app.utils.db_routing import cache_fill
+from app.services.recommendation_service import RecommendationService
+from app.services.response_cache import ResponseCacheService, TAG_PRODUCTS_BULK, product_tag
+from app.utils.serializers import PROJECTION_CARD, product_load_options, serialize_products
+from app.constants import RECOMMENDATION_MAX_ORDER_SIZE
+
+_CHANGES_KEY = 'related_products_changes'
+_listeners_registered = False
+
+
+class RelatedIndex:
+    """Category membership and co-purchase counts of active products."""
+
+    def __init__(self, products: Iterable[Tuple[int, Optional[int]]],
+                 neighbours: Iterable[Tuple[int, int, int]]):
+        self.built_at = time.monotonic()
+        self._category: Dict[int, Optional[int]] = {}
+        self._members: Dict[Optional[int], List[int]] = defaultdict(list)
+        self._co_purchases: Dict[int, Counter] = defaultdict(Counter)
+
+        for product_id, category_id in products:
+            self._category[product_id] = category_id
+            self._members[category_id].append(product_id)
+        for members in self._members.values():
+            members.sort()
+        # (product, neighbour, orders) rows are stored per direction and only
+        # for each product's top K, so mirror them without double counting
+        for product_a, product_b, orders in neighbours:
+            row_a, row_b = self._co_purchases[product_a], self._co_purchases[product_b]
+            row_a[product_b] = max(row_a[product_b], orders)
+            row_b[product_a] = max(row_b[product_a], orders)
+
+    def __len__(self) -> int:
+        return len(self._category)
+
+    def related_ids(self, product_id: int, category_id: Optional[int] = None,
+                    limit: int = 4) -> List[int]:
+        """
+        IDs of related active products, best first.
+
+        Args:
+            product_id: Product ID
+            category_id: Category to fall back to if the product isn't indexed
+            limit: Maximum number of products
+        """
+        category_id = self._category.get(product_id, category_id)
+        result: List[int] = []
+        seen = {product_id}
+
+        co_purchases = self._co_purchases.get(product_id)
+        if co_purchases:
+            ranked = sorted(co_purchases.items(), key=lambda item: (-item[1], -item[0]))
+            for other_id, _ in ranked:
+                if len(result) >= limit:
+                    return result
+                if other_id in self._category and other_id not in seen:
+                    seen.add(other_id)
+                    result.append(other_id)
+
+        # Member lists are ascending by ID, so reversed gives newest first
+        for other_id in reversed(self._members.get(category_id, [])):
+            if len(result) >= limit:
+                break
+            if other_id not in seen:
+                seen.add(other_id)
+                result.append(other_id)
+        return result
+
+    def add_order(self, product_ids: Iterable[int]) -> None:
+        """Count every pair of distinct products bought together."""
+        product_ids = sorted(set(product_ids))
+        if len(product_ids) > RECOMMENDATION_MAX_ORDER_SIZE:
+            # Skipped by the batch job as well
+            return
+        for i, product_a in enumerate(product_ids):
+            for product_b in product_ids[i + 1:]:
+                self._co_purchases[product_a][product_b] += 1
+                self._co_purchases[product_b][product_a] += 1
+
+    def set_product(self, product_id: int, category_id: Optional[int], active: bool) -> None:
+        """Move a product to its current category (or out of the index)."""
+        if product_id in self._category:
+            members = self._members[self._category.pop(product_id)]
+            index = bisect.bisect_left(members, product_id)
+            if index < len(members) and members[index] == product_id:
+                members.pop(index)
+        if active:
+            self._category[product_id] = category_id
+            bisect.insort(self._members[category_id], product_id)
+
+
+class RelatedProductsService:
+    """Service for related product recommendations"""
+
+    @staticmethod
+    def init_app(app) -> None:
+        """Set up the per-app index state and the write listeners."""
+        global _listeners_registered
+        app.extensions['related_products'] = {
+            'lock': threading.Lock(),
+            'build_lock': threading.Lock(),
+            'index': None,
+            'cards': OrderedDict(),
+        }
+        if not _listeners_registered:
+            event.listen(Session, 'after_flush', _collect_changes)
+            event.listen(Session, 'after_commit', _apply_changes)
+            event.listen(Session, 'after_rollback', _discard_changes)
+            _listeners_registered = True
+
+    @staticmethod
+    def build_index() -> RelatedIndex:
+        """
+        Build the index from the database: active products, the stored
+        recommendations and the orders placed since they were computed.
+        """
+        products = db.session.execute(
+            select(Product.id, Product.category_id).where(Product.is_active.is_(True))
+        ).all()
+        neighbours = db.session.execute(
+            select(ProductRecommendation.product_id, ProductRecommendation.recommended_id,
+                   ProductRecommendation.score)
+        ).all()
+        index = RelatedIndex(products, neighbours)
+        for product_ids in RecommendationService.iter_orders(since=RecommendationService.last_run()):
+            index.add_order(product_ids)
+        return index
+
+    @staticmethod
+    def get_index() -> RelatedIndex:
+        """
+        Get the index, rebuilding it if it is missing, was marked stale
+        or is older than RELATED_PRODUCTS_TTL seconds.
+
+        One request rebuilds at a time; the others keep the old index,
+        or wait for the rebuild if there is none yet.
+        """
+        state = current_app.extensions['related_products']
+        ttl = current_app.config.get('RELATED_PRODUCTS_TTL', 3600)
+        index = state['index']
+        if index is not None and time.monotonic() - index.built_at < ttl:
+            return index
+
+        build_lock = state['build_lock']
+        if index is not None:
+            if not build_lock.acquire(blocking=False):
+                return index
+        else:
+            build_lock.acquire()
+        try:
+            current = state['index']
+            if current is not None and current is not index:
+                # Rebuilt by the request we waited for
+                return current
+            try:
+                with cache_fill():
+                    index = RelatedProductsService.build_index()
+            except Exception as e:
+                if index is None:
+                    raise
+                current_app.logger.error(f'Related products index rebuild failed, keeping the old one: {str(e)}')
+                return index
+            with state['lock']:
+                state['index'] = index
+                state['cards'] = OrderedDict()
+            return index
+        finally:
+            build_lock.release()
+
+    @staticmethod
+    def get_related(product_id: int, category_id: Optional[int] = None,
+                    limit: int = 4) -> List[Dict[str, Any]]:
+        """
+        Get related products as card dicts.
+
+        Args:
+            product_id: Product ID
+            category_id: Product's category (used if the product isn't indexed)
+            limit: Maximum number of products
+
+        Returns:
+            Card projection dicts, best match first
+        """
+        state = current_app.extensions['related_products']
+        index = RelatedProductsService.get_index()
+        with state['lock']:
+            related_ids = index.related_ids(product_id, category_id, limit)
+        if not related_ids:
+            return []
+
+        key = (product_id, limit)
+        versions = ResponseCacheService.get_cache().tag_versions(
+            [TAG_PRODUCTS_BULK] + [product_tag(related_id) for related_id in related_ids]
+        )
+        cards = state['cards']
+        with state['lock']:
+            cached = cards.get(key)
+            if cached is not None:
+                cards.move_to_end(key)
+        if cached is not None and cached['ids'] == related_ids and cached['versions'] == versions:
+            return cached['data']
+
+        with cache_fill():
+            products = db.session.query(Product)\
+                .options(*product_load_options(PROJECTION_CARD))\
+                .filter(Product.id.in_(related_ids))\
+                .all()
+        by_id = {product.id: product for product in products}
+        data = serialize_products(
+            [by_id[related_id] for related_id in related_ids if related_id in by_id],
+            PROJECTION_CARD
+        )
+        size = current_app.config.get('RELATED_PRODUCTS_CARDS_SIZE', 1000)
+        with state['lock']:
+            cards[key] = {'ids': related_ids, 'versions': versions, 'data': data}
+            cards.move_to_end(key)
+            while len(cards) > size:
+                cards.popitem(last=False)
+        return data
+
+    @staticmethod
+    def invalidate() -> None:
+        """Force a rebuild on the next read."""
+        state = current_app.extensions['related_products']
+        with state['lock']:
+            state['index'] = None
+
+
+def _collect_changes(session, flush_context) -> None:
+    """Record ordered products and product moves until the transaction commits."""
+    changes = session.info.setdefault(_CHANGES_KEY, {'orders': defaultdict(set), 'products': {}, 'stale': False})
+
+    for obj in session.new:
+        if isinstance(obj, OrderItem):
+            changes['orders'][obj.order_id].add(obj.product_id)
+        elif isinstance(obj, Product):
+            active = _value(changes, obj, 'is_active', True)
+            changes['products'][obj.id] = (_value(changes, obj, 'category_id', None), bool(active))
+    for obj in session.deleted:
+        if isinstance(obj, Product):
+            changes['products'][obj.id] = (None, False)
+    for obj in session.dirty:
+        if isinstance(obj, Product):
+            state = inspect(obj)
+            if not any(state.attrs[attr].history.has_changes() for attr in ('category_id', 'is_active')):
+                continue
+            active = _value(changes, obj, 'is_active', True)
+            changes['products'][obj.id] = (_value(changes, obj, 'category_id', None), bool(active))
+
+
+def _value(changes: Dict[str, Any], obj: Any, attr: str, default: Any) -> Any:
+    """Attribute value without triggering a lazy load inside the flush."""
+    value = inspect(obj).attrs[attr].loaded_value
+    if value is NO_VALUE:
+        changes['stale'] = True
+        return default
+    return default if value is None else value
+
+
+def _apply_changes(session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes or not has_app_context():
+        return
+
+    state = current_app.extensions.get('related_products')
+    if not state:
+        return
+    with state['lock']:
+        index = state['index']
+        if index is None:
+            return
+        if changes['stale']:
+            state['index'] = None
+            return
+        for product_id, (category_id, active) in changes['products'].items():
+            index.set_product(product_id, category_id, active)
+        for product_ids in changes['orders'].values():
+            index.add_order(product_ids)
+
+
+def _discard_changes(session) -> None:
+    session.info.pop(_CHANGES_KEY, None)
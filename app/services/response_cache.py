@@ -0,0 +1,354 @@
+"""
+Response cache for public catalog API endpoints.
+
+Anonymous GET responses of the decorated endpoints are stored under the
+request path plus its normalized (sorted) query string. Each entry records
+the versions of the tags it depends on ('products', 'product:<id>',
+'categories', 'banners', ...). Committed ORM writes bump the tags of the
+rows they touch, so the next read recomputes instead of serving the old
+body; nothing has to be deleted.
+
+Storage is an in-process LRU (RESPONSE_CACHE_SIZE entries). With
+RESPONSE_CACHE_REDIS_URL set, entries are also kept in Redis (or any
+server speaking its protocol) and tag versions live there too, so a write
+in one worker process invalidates every process. Without it, other
+processes see a write after at most RESPONSE_CACHE_TTL seconds.
+
+Cached and freshly computed responses carry a strong ETag and
+Cache-Control: public, max-age=RESPONSE_CACHE_MAX_AGE; logged-in requests
+bypass the cache and are left untouched.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+from urllib.parse import urlencode
+from flask import current_app, has_app_context, make_response, request, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import Product, Category, Banner
+from app.utils.db_routing import cache_fill
+
+TAG_PRODUCTS = 'products'            # product lists (any product row changed)
+TAG_PRODUCTS_BULK = 'products:bulk'  # bulk UPDATE/DELETE on products (rows unknown)
+TAG_CATEGORIES = 'categories'
+TAG_BANNERS = 'banners'
+TAG_RECOMMENDATIONS = 'recommendations'  # product_recommendations rebuilt
+
+_TAGS_KEY = 'response_cache_tags'
+# Execution option of bulk product statements that know the IDs they touch
+AFFECTED_PRODUCTS_OPTION = 'response_cache_product_ids'
+_listeners_registered = False
+
+
+def product_tag(product_id: int) -> str:
+    """Tag of a single product's responses."""
+    return f'product:{product_id}'
+
+
+class MemoryResponseStore:
+    """Bounded LRU of entries plus per-process tag versions."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def tag_versions(self, tags: Sequence[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class RedisResponseStore:
+    """
+    Entries and tag versions in Redis.
+
+    Works with any client exposing redis-py's get/set/mget/incr, so a
+    local stand-in (e.g. fakeredis) can be passed in place of a server.
+    """
+
+    def __init__(self, client, prefix: str = 'shopping:resp:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        header, _, body = raw.partition(b'\n')
+        entry = json.loads(header)
+        entry['body'] = body
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any], ttl: int) -> None:
+        header = {k: v for k, v in entry.items() if k != 'body'}
+        raw = json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n' + entry['body']
+        self.client.set(self.prefix + key, raw, ex=max(1, int(ttl)))
+
+    def tag_versions(self, tags: Sequence[str]) -> List[int]:
+        if not tags:
+            return []
+        values = self.client.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self.client.incr(self.prefix + 'tag:' + tag)
+
+
+class ResponseCache:
+    """In-process LRU in front of an optional shared store."""
+
+    def __init__(self, local: MemoryResponseStore, shared: Optional[RedisResponseStore] = None,
+                 ttl: int = 60, rebump_after: float = 0):
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        # With a read replica: other processes may refill from rows the
+        # replica doesn't have yet, so shared tags are bumped again later
+        self.rebump_after = rebump_after
+
+    def tag_versions(self, tags: Sequence[str]) -> List[int]:
+        """Current versions of tags (shared versions when a shared store is set)."""
+        store = self.shared or self.local
+        try:
+            return store.tag_versions(tags)
+        except Exception as e:
+            if store is self.local:
+                raise
+            current_app.logger.warning(f'Response cache store unavailable: {str(e)}')
+            return self.local.tag_versions(tags)
+
+    def bump(self, tags: Iterable[str]) -> None:
+        """Invalidate every entry that depends on any of the tags."""
+        tags = sorted(set(tags))
+        self.local.bump(tags)
+        if self.shared is not None:
+            try:
+                self.shared.bump(tags)
+            except Exception as e:
+                current_app.logger.warning(f'Response cache invalidation failed: {str(e)}')
+            if self.rebump_after > 0:
+                timer = threading.Timer(self.rebump_after, self._rebump, (tags, current_app.logger))
+                timer.daemon = True
+                timer.start()
+
+    def _rebump(self, tags: List[str], logger) -> None:
+        try:
+            self.shared.bump(tags)
+        except Exception as e:
+            logger.warning(f'Response cache invalidation failed: {str(e)}')
+
+    def get(self, key: str, versions: List[int]) -> Optional[Dict[str, Any]]:
+        """Entry for key if it was stored with the given tag versions."""
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                current_app.logger.warning(f'Response cache read failed: {str(e)}')
+                entry = None
+            if entry is not None and entry['versions'] == versions:
+                self.local.set(key, entry, self.ttl)
+        if entry is None or entry['versions'] != versions:
+            return None
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        entry['expires'] = time.time() + self.ttl
+        self.local.set(key, entry, self.ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry, self.ttl)
+            except Exception as e:
+                current_app.logger.warning(f'Response cache write failed: {str(e)}')
+
+
+class ResponseCacheService:
+    """Service for caching public API responses"""
+
+    @staticmethod
+    def init_app(app) -> None:
+        """Register the write listeners that invalidate cached responses."""
+        global _listeners_registered
+        if not _listeners_registered:
+            event.listen(Session, 'after_flush', _collect_tags)
+            event.listen(Session, 'do_orm_execute', _collect_bulk_tags)
+            event.listen(Session, 'after_commit', _bump_tags)
+            event.listen(Session, 'after_rollback', _discard_tags)
+            _listeners_registered = True
+
+    @staticmethod
+    def get_cache() -> ResponseCache:
+        """Get (and lazily create) the response cache for the current app."""
+        app = current_app._get_current_object()
+        cache = app.extensions.get('response_cache')
+        if cache is None:
+            shared = None
+            redis_url = app.config.get('RESPONSE_CACHE_REDIS_URL')
+            if redis_url:
+                try:
+                    import redis
+                    shared = RedisResponseStore(redis.Redis.from_url(redis_url))
+                except ImportError:
+                    app.logger.warning('RESPONSE_CACHE_REDIS_URL is set but redis is not installed; '
+                                       'using the in-process cache only')
+            cache = ResponseCache(
+                MemoryResponseStore(app.config.get('RESPONSE_CACHE_SIZE', 1000)),
+                shared=shared,
+                ttl=app.config.get('RESPONSE_CACHE_TTL', 60),
+                rebump_after=app.config.get('REPLICA_STICKY_SECONDS', 5) if app.config.get('DB_REPLICA_URI') else 0
+            )
+            app.extensions['response_cache'] = cache
+        return cache
+
+    @staticmethod
+    def invalidate(tags: Iterable[str]) -> None:
+        """Invalidate tags directly (for writes that don't go through the ORM session)."""
+        ResponseCacheService.get_cache().bump(tags)
+
+    @staticmethod
+    def cached(tags: Union[Sequence[str], Callable[..., Sequence[str]]]):
+        """
+        Decorator caching an endpoint's anonymous GET responses.
+
+        Args:
+            tags: Tags the response depends on, or a callable receiving the
+                view arguments and returning them
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not ResponseCacheService._is_cacheable():
+                    return view(*args, **kwargs)
+
+                cache = ResponseCacheService.get_cache()
+                entry_tags = list(tags(**kwargs) if callable(tags) else tags)
+                key = ResponseCacheService._make_key()
+                # Versions are read before computing: a write that commits
+                # meanwhile leaves the new entry outdated, not wrong
+                versions = cache.tag_versions(entry_tags)
+
+                entry = cache.get(key, versions)
+                if entry is not None:
+                    response = current_app.response_class(
+                        entry['body'], status=entry['status'], mimetype=entry['mimetype']
+                    )
+                    response.headers['X-Cache'] = 'HIT'
+                else:
+                    with cache_fill():
+                        response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    entry = {
+                        'body': body,
+                        'status': response.status_code,
+                        'mimetype': response.mimetype,
+                        'etag': hashlib.sha1(body).hexdigest(),
+                        'versions': versions,
+                    }
+                    cache.set(key, entry)
+                    response.headers['X-Cache'] = 'MISS'
+
+                response.set_etag(entry['etag'])
+                response.cache_control.public = True
+                response.cache_control.max_age = current_app.config.get('RESPONSE_CACHE_MAX_AGE', 60)
+                response.vary.add('Cookie')
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _is_cacheable() -> bool:
+        return (current_app.config.get('RESPONSE_CACHE_ENABLED', True)
+                and request.method == 'GET'
+                and 'user_id' not in session)
+
+    @staticmethod
+    def _make_key() -> str:
+        """Path plus query string with parameters (and repeated values) sorted."""
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return hashlib.sha1(f'{request.path}?{query}'.encode('utf-8')).hexdigest()
+
+
+def _tags_for(obj: Any) -> List[str]:
+    if isinstance(obj, Product):
+        return [TAG_PRODUCTS, product_tag(obj.id)] if obj.id is not None else [TAG_PRODUCTS]
+    if isinstance(obj, Category):
+        return [TAG_CATEGORIES]
+    if isinstance(obj, Banner):
+        return [TAG_BANNERS]
+    return []
+
+
+def _collect_tags(session, flush_context) -> None:
+    """Record the tags touched by a flush until the transaction commits."""
+    tags = session.info.setdefault(_TAGS_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags.update(_tags_for(obj))
+
+
+def _collect_bulk_tags(orm_execute_state) -> None:
+    """
+    Bulk INSERT/UPDATE/DELETE statements don't go through the flush.
+
+    A bulk product statement invalidates every product unless it lists the
+    rows it touches in the AFFECTED_PRODUCTS_OPTION execution option.
+    """
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    model = mapper.class_
+    tags = orm_execute_state.session.info.setdefault(_TAGS_KEY, set())
+    if issubclass(model, Product):
+        product_ids = orm_execute_state.execution_options.get(AFFECTED_PRODUCTS_OPTION)
+        if product_ids is None:
+            tags.update((TAG_PRODUCTS, TAG_PRODUCTS_BULK))
+        else:
+            tags.add(TAG_PRODUCTS)
+            tags.update(product_tag(product_id) for product_id in product_ids)
+    elif issubclass(model, Category):
+        tags.add(TAG_CATEGORIES)
+    elif issubclass(model, Banner):
+        tags.add(TAG_BANNERS)
+
+
+def _bump_tags(session) -> None:
+    tags = session.info.pop(_TAGS_KEY, None)
+    if not tags or not has_app_context():
+        return
+    ResponseCacheService.get_cache().bump(tags)
+
+
+def _discard_tags(session) -> None:
+    session.info.pop(_TAGS_KEY, None)
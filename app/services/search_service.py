@@ -0,0 +1,359 @@
+"""
+Product search service with pluggable full-text backends.
+
+- MySQLFulltextBackend: MATCH ... AGAINST on the FULLTEXT (ngram parser)
+  index over products(name, description). MySQL maintains the index itself.
+- InvertedIndexBackend: in-process inverted index for SQLite and tests.
+  Built lazily on first search and updated incrementally on product writes
+  in this process. Like the category tree, bulk writes bump a version
+  stamp that makes the next search rebuild it, and SEARCH_INDEX_TTL bounds
+  how long other worker processes search an index missing their writes.
+  Up to SEARCH_MAX_RESULTS matches are filtered by ID and ranked; with
+  more, the query falls back to substring matching of the search tokens
+  (the best SEARCH_MAX_RESULTS still rank first), so totals and later
+  pages stay complete.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import case, false, literal, or_
+from sqlalchemy.dialects.mysql import match
+from app.models import Product
+from app import db
+from app.utils.db_routing import cache_fill
+
+SEARCH_BACKEND_AUTO = 'auto'
+SEARCH_BACKEND_MYSQL = 'mysql'
+SEARCH_BACKEND_MEMORY = 'memory'
+
+# Same as MySQL's default ngram_token_size
+NGRAM_TOKEN_SIZE = 2
+
+_WORD_RE = re.compile(r'[0-9a-z]+')
+_CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into search tokens.
+
+    Latin words and digits are kept whole; CJK runs are split into
+    overlapping bigrams, mirroring MySQL's ngram parser so both backends
+    match the same way for names like "筆記電腦".
+    """
+    if not text:
+        return []
+
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        if len(run) < NGRAM_TOKEN_SIZE:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + NGRAM_TOKEN_SIZE]
+                          for i in range(len(run) - NGRAM_TOKEN_SIZE + 1))
+    return tokens
+
+
+class SearchBackend:
+    """Base class for product search backends."""
+
+    name = None
+
+    def apply(self, query, term: str, category_id: Optional[int] = None) -> Tuple[Any, Any]:
+        """
+        Restrict a product query to rows matching the search term.
+
+        Args:
+            query: Product query to filter
+            term: Search term
+            category_id: Category the query is already filtered by (optional hint)
+
+        Returns:
+            Tuple of (filtered query, relevance expression for ORDER BY)
+        """
+        raise NotImplementedError
+
+    def index_product(self, product: Product) -> None:
+        """Add or refresh a product in the index."""
+
+    def remove_product(self, product_id: int) -> None:
+        """Remove a product from the index."""
+
+    def rebuild(self) -> None:
+        """Rebuild the whole index."""
+
+    def invalidate(self) -> None:
+        """Mark the index stale after bulk writes; the next search rebuilds it."""
+
+    @staticmethod
+    def _apply_like(query, term: str) -> Tuple[Any, Any]:
+        """Substring fallback for terms too short to tokenize."""
+        query = query.filter(or_(
+            Product.name.contains(term, autoescape=True),
+            Product.description.contains(term, autoescape=True)
+        ))
+        return query, literal(0)
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """Search through MySQL's FULLTEXT index (ngram parser)."""
+
+    name = SEARCH_BACKEND_MYSQL
+
+    def apply(self, query, term: str, category_id: Optional[int] = None) -> Tuple[Any, Any]:
+        if len(term) < NGRAM_TOKEN_SIZE:
+            return self._apply_like(query, term)
+
+        relevance = match(Product.name, Product.description, against=term)\
+            .in_natural_language_mode()
+        return query.filter(relevance > 0), relevance
+
+
+class InvertedIndexBackend(SearchBackend):
+    """In-process inverted index with TF-IDF ranking."""
+
+    name = SEARCH_BACKEND_MEMORY
+
+    # Matches in the name count more than matches in the description
+    NAME_WEIGHT = 3.0
+    DESCRIPTION_WEIGHT = 1.0
+
+    def __init__(self, max_results: int = 1000, ttl: float = 300):
+        self.max_results = max_results
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._documents: Dict[int, Tuple[int, List[str]]] = {}  # id -> (category_id, tokens)
+        self._built = False
+        self._built_at = 0.0
+        self._version = 0
+        self._built_version = 0
+        # Product writes seen while a rebuild reads the table, replayed onto the new index
+        self._pending: Optional[List[Tuple[int, Optional[Tuple[Any, ...]]]]] = None
+
+    def apply(self, query, term: str, category_id: Optional[int] = None) -> Tuple[Any, Any]:
+        terms = tokenize(term)
+        if not terms:
+            return self._apply_like(query, term)
+
+        scores = self._scores(terms, category_id)
+        if not scores:
+            return query.filter(false()), literal(0)
+
+        if len(scores) > self.max_results:
+            # Too many IDs for an IN list: match the tokens as substrings and
+            # rank the best max_results first, so every match is still listed
+            top = dict(heapq.nlargest(self.max_results, scores.items(), key=itemgetter(1)))
+            query = query.filter(or_(*[
+                or_(Product.name.contains(token, autoescape=True),
+                    Product.description.contains(token, autoescape=True))
+                for token in set(terms)
+            ]))
+            return query, case(top, value=Product.id, else_=0.0)
+
+        relevance = case(scores, value=Product.id, else_=0.0)
+        return query.filter(Product.id.in_(list(scores))), relevance
+
+    def search(self, term: str, category_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Rank products against a search term.
+
+        Returns:
+            List of (product_id, score), best match first (at most max_results)
+        """
+        scores = self._scores(tokenize(term), category_id)
+        return heapq.nlargest(self.max_results, scores.items(), key=itemgetter(1))
+
+    def _scores(self, terms: List[str], category_id: Optional[int]) -> Dict[int, float]:
+        """TF-IDF score of every product matching any of the tokens."""
+        self._ensure_built()
+
+        with self._lock:
+            total_docs = len(self._documents) or 1
+            scores: Dict[int, float] = defaultdict(float)
+            for token in set(terms):
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + total_docs / len(postings))
+                for product_id, weight in postings.items():
+                    if category_id and self._documents[product_id][0] != category_id:
+                        continue
+                    scores[product_id] += weight * idf
+        return scores
+
+    def index_product(self, product: Product) -> None:
+        document = (product.name, product.description, product.category_id)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((product.id, document))
+            if not self._built:
+                # The lazy build will pick it up
+                return
+            self._remove(product.id)
+            self._add(product.id, *document)
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((product_id, None))
+            if not self._built:
+                return
+            self._remove(product_id)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+
+    def rebuild(self) -> None:
+        with self._lock:
+            # Capture the version before querying: a bulk write that lands
+            # while we build leaves the new index stale, and it is rebuilt again
+            version = self._version
+            self._pending = []
+        try:
+            with cache_fill():
+                rows = db.session.query(
+                    Product.id, Product.name, Product.description, Product.category_id
+                ).all()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._documents = {}
+            for product_id, name, description, category_id in rows:
+                self._add(product_id, name, description, category_id)
+            for product_id, document in self._pending:
+                self._remove(product_id)
+                if document is not None:
+                    self._add(product_id, *document)
+            self._pending = None
+            self._built = True
+            self._built_at = time.monotonic()
+            self._built_version = version
+
+    def _is_fresh(self) -> bool:
+        return self._built and self._built_version == self._version \
+            and time.monotonic() - self._built_at < self.ttl
+
+    def _ensure_built(self) -> None:
+        if self._is_fresh():
+            return
+        if self._built:
+            # Stale: one request rebuilds, the others search the old index
+            if not self._build_lock.acquire(blocking=False):
+                return
+        else:
+            # Nothing to search yet: wait for the request that is building
+            self._build_lock.acquire()
+        try:
+            if not self._is_fresh():
+                self.rebuild()
+        except Exception as e:
+            if not self._built:
+                raise
+            current_app.logger.error(f'Search index rebuild failed, searching the old index: {str(e)}')
+        finally:
+            self._build_lock.release()
+
+    def _add(self, product_id: int, name: Optional[str],
+             description: Optional[str], category_id: int) -> None:
+        weights: Dict[str, float] = defaultdict(float)
+        for token in tokenize(name):
+            weights[token] += self.NAME_WEIGHT
+        for token in tokenize(description):
+            weights[token] += self.DESCRIPTION_WEIGHT
+
+        for token, weight in weights.items():
+            # Dampen repeated terms so long descriptions don't dominate
+            self._postings[token][product_id] = 1 + math.log(weight)
+        self._documents[product_id] = (category_id, list(weights))
+
+    def _remove(self, product_id: int) -> None:
+        document = self._documents.pop(product_id, None)
+        if not document:
+            return
+        for token in document[1]:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[token]
+
+
+class SearchService:
+    """Service for product full-text search"""
+
+    @staticmethod
+    def get_backend() -> SearchBackend:
+        """Get (and lazily create) the search backend for the current app."""
+        app = current_app._get_current_object()
+        backend = app.extensions.get('product_search')
+        if backend is None:
+            backend = SearchService._create_backend(app)
+            app.extensions['product_search'] = backend
+        return backend
+
+    @staticmethod
+    def apply(query, term: str, category_id: Optional[int] = None) -> Tuple[Any, Any]:
+        """
+        Filter a product query by search term.
+
+        Returns:
+            Tuple of (filtered query, relevance expression)
+        """
+        return SearchService.get_backend().apply(query, term, category_id=category_id)
+
+    @staticmethod
+    def index_product(product: Product) -> None:
+        """Refresh a product in the search index after it was saved."""
+        try:
+            SearchService.get_backend().index_product(product)
+        except Exception as e:
+            current_app.logger.error(f'Search index update failed: {str(e)}')
+
+    @staticmethod
+    def remove_product(product_id: int) -> None:
+        """Remove a deleted product from the search index."""
+        try:
+            SearchService.get_backend().remove_product(product_id)
+        except Exception as e:
+            current_app.logger.error(f'Search index removal failed: {str(e)}')
+
+    @staticmethod
+    def rebuild() -> None:
+        """Rebuild the search index now."""
+        try:
+            SearchService.get_backend().rebuild()
+        except Exception as e:
+            current_app.logger.error(f'Search index rebuild failed: {str(e)}')
+
+    @staticmethod
+    def invalidate() -> None:
+        """Mark the search index stale after bulk writes that bypass index_product."""
+        SearchService.get_backend().invalidate()
+
+    @staticmethod
+    def _create_backend(app) -> SearchBackend:
+        backend_name = app.config.get('SEARCH_BACKEND', SEARCH_BACKEND_AUTO)
+        if backend_name == SEARCH_BACKEND_AUTO:
+            dialect = db.engine.dialect.name
+            backend_name = SEARCH_BACKEND_MYSQL if dialect == 'mysql' else SEARCH_BACKEND_MEMORY
+
+        if backend_name == SEARCH_BACKEND_MYSQL:
+            return MySQLFulltextBackend()
+        return InvertedIndexBackend(
+            max_results=app.config.get('SEARCH_MAX_RESULTS', 1000),
+            ttl=app.config.get('SEARCH_INDEX_TTL', 300)
+        )
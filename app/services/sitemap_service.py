@@ -0,0 +1,203 @@
+"""
+Sitemap service for streaming, sharded sitemaps.
+
+/sitemap.xml is a sitemap index pointing at:
+
+- /sitemap-pages.xml: homepage, product list and category pages
+- /sitemap-products-<n>.xml: active products with IDs in the n-th block of
+  SITEMAP_URLS_PER_SHARD IDs, so a shard never exceeds the protocol limit
+  of 50,000 URLs and a product always stays in the same shard
+
+Shards are streamed from keyset-paginated chunks, so memory use does not
+grow with the catalogue. Every document carries lastmod values from
+updated_at and an ETag/Last-Modified pair for conditional GETs.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional
+from xml.sax.saxutils import escape
+from flask import current_app, url_for
+from sqlalchemy import func
+from app.models import Product, Category
+from app import db
+
+# Protocol limit per sitemap file (https://www.sitemaps.org/protocol.html)
+SITEMAP_MAX_URLS = 50000
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+INDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_CLOSE = '</sitemapindex>\n'
+
+
+@dataclass
+class SitemapDocument:
+    """A sitemap file: validators for conditional GETs and a lazy body."""
+    body: Iterator[str]
+    etag: str
+    last_modified: Optional[datetime]
+
+
+@dataclass
+class ProductShard:
+    number: int
+    count: int
+    last_modified: Optional[datetime]
+
+
+class SitemapService:
+    """Service for generating sitemap.xml documents"""
+
+    @staticmethod
+    def shard_size() -> int:
+        size = current_app.config.get('SITEMAP_URLS_PER_SHARD', SITEMAP_MAX_URLS)
+        return max(1, min(size, SITEMAP_MAX_URLS))
+
+    @staticmethod
+    def product_shards() -> List[ProductShard]:
+        """Non-empty product shards with URL count and latest update, in one query."""
+        size = SitemapService.shard_size()
+        shard = ((Product.id - 1) // size).label('shard')
+        rows = db.session.query(shard, func.count(Product.id), func.max(Product.updated_at))\
+            .filter(Product.is_active == True)\
+            .group_by(shard)\
+            .order_by(shard)\
+            .all()
+        return [ProductShard(int(number) + 1, count, last_modified)
+                for number, count, last_modified in rows]
+
+    @staticmethod
+    def index() -> SitemapDocument:
+        """Sitemap index listing the pages sitemap and every product shard."""
+        shards = SitemapService.product_shards()
+        pages_count, categories_modified = SitemapService._category_stats()
+        # The pages sitemap's homepage and list entries follow the newest product
+        pages_modified = _latest([categories_modified] + [s.last_modified for s in shards])
+
+        entries = [(url_for('sitemap_pages', _external=True), pages_modified)]
+        entries.extend(
+            (url_for('sitemap_products', shard=shard.number, _external=True), shard.last_modified)
+            for shard in shards
+        )
+        last_modified = _latest([modified for _, modified in entries])
+
+        def generate():
+            yield XML_HEADER
+            yield INDEX_OPEN
+            for loc, modified in entries:
+                yield '  <sitemap>\n'
+                yield f'    <loc>{escape(loc)}</loc>\n'
+                if modified:
+                    yield f'    <lastmod>{_w3c_datetime(modified)}</lastmod>\n'
+                yield '  </sitemap>\n'
+            yield INDEX_CLOSE
+
+        etag = _etag('index', pages_count, pages_modified,
+                     *[(s.number, s.count, s.last_modified) for s in shards])
+        return SitemapDocument(generate(), etag, last_modified)
+
+    @staticmethod
+    def pages() -> SitemapDocument:
+        """Sitemap of the homepage, product list and active category pages."""
+        count, categories_modified = SitemapService._category_stats()
+        products_modified = db.session.query(func.max(Product.updated_at))\
+            .filter(Product.is_active == True).scalar()
+        last_modified = _latest([categories_modified, products_modified])
+
+        def generate():
+            yield XML_HEADER
+            yield URLSET_OPEN
+            yield _url(url_for('frontend.index', _external=True), last_modified, 'daily', '1.0')
+            yield _url(url_for('frontend.product_list', _external=True), last_modified, 'daily', '0.8')
+
+            rows = db.session.query(Category.id, Category.updated_at)\
+                .filter(Category.is_active == True)\
+                .order_by(Category.sort_order, Category.id)
+            for category_id, updated_at in rows:
+                loc = url_for('frontend.product_list', category_id=category_id, _external=True)
+                yield _url(loc, updated_at, 'weekly', '0.7')
+            yield URLSET_CLOSE
+
+        return SitemapDocument(generate(), _etag('pages', count, last_modified), last_modified)
+
+    @staticmethod
+    def products(shard: int) -> Optional[SitemapDocument]:
+        """
+        Sitemap of one product shard.
+
+        Args:
+            shard: 1-based shard number
+
+        Returns:
+            SitemapDocument, or None if the shard has no active products
+        """
+        if shard < 1:
+            return None
+
+        size = SitemapService.shard_size()
+        first_id = (shard - 1) * size + 1
+        last_id = shard * size
+        in_shard = (Product.is_active == True, Product.id.between(first_id, last_id))
+
+        count, last_modified = db.session.query(func.count(Product.id), func.max(Product.updated_at))\
+            .filter(*in_shard).one()
+        if not count:
+            return None
+
+        chunk_size = current_app.config.get('SITEMAP_CHUNK_SIZE', 1000)
+
+        def generate():
+            yield XML_HEADER
+            yield URLSET_OPEN
+            after_id = first_id - 1
+            while True:
+                # Keyset chunks keep each query short and memory flat
+                rows = db.session.query(Product.id, Product.slug, Product.updated_at)\
+                    .filter(*in_shard, Product.id > after_id)\
+                    .order_by(Product.id)\
+                    .limit(chunk_size)\
+                    .all()
+                for product_id, slug, updated_at in rows:
+                    if slug:
+                        loc = url_for('frontend.product_detail', id=product_id, slug=slug, _external=True)
+                    else:
+                        loc = url_for('frontend.product_detail', id=product_id, _external=True)
+                    yield _url(loc, updated_at, 'weekly', '0.6')
+                if len(rows) < chunk_size:
+                    break
+                after_id = rows[-1][0]
+            yield URLSET_CLOSE
+
+        etag = _etag('products', shard, size, count, last_modified)
+        return SitemapDocument(generate(), etag, last_modified)
+
+    @staticmethod
+    def _category_stats():
+        return db.session.query(func.count(Category.id), func.max(Category.updated_at))\
+            .filter(Category.is_active == True).one()
+
+
+def _url(loc: str, lastmod: Optional[datetime], changefreq: str, priority: str) -> str:
+    lines = ['  <url>\n', f'    <loc>{escape(loc)}</loc>\n']
+    if lastmod:
+        lines.append(f'    <lastmod>{_w3c_datetime(lastmod)}</lastmod>\n')
+    lines.append(f'    <changefreq>{changefreq}</changefreq>\n')
+    lines.append(f'    <priority>{priority}</priority>\n')
+    lines.append('  </url>\n')
+    return ''.join(lines)
+
+
+def _w3c_datetime(value: datetime) -> str:
+    # updated_at is stored as naive UTC (datetime.utcnow)
+    return value.replace(microsecond=0).isoformat() + '+00:00'
+
+
+def _latest(values: List[Optional[datetime]]) -> Optional[datetime]:
+    values = [value for value in values if value]
+    return max(values) if values else None
+
+
+def _etag(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
@@ -0,0 +1,124 @@
+"""
+Stock service for atomic, contention-safe stock reservation.
+
+Two strategies are available (Config.STOCK_RESERVATION_STRATEGY):
+
+- conditional: a single batched
+      UPDATE products SET stock = stock - CASE id ... END
+      WHERE id IN (...) AND stock >= CASE id ... END
+  The row count tells whether every line could be reserved. Rows are
+  locked only for the duration of the UPDATE, which keeps flash-sale
+  throughput high.
+- lock: SELECT ... FOR UPDATE on all products in primary key order (a
+  consistent lock order, so concurrent checkouts can't deadlock), check
+  stock in Python, then run the same guarded UPDATE.
+
+Both run inside the caller's transaction; the caller commits or rolls back.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import case, update
+from app.models import Product
+from app import db
+from app.constants import STOCK_STRATEGY_CONDITIONAL, STOCK_STRATEGY_LOCK
+from app.services.response_cache import AFFECTED_PRODUCTS_OPTION
+
+
+class InsufficientStockError(Exception):
+    """Raised when one or more products can't cover the requested quantity"""
+
+    def __init__(self, product_ids: Optional[List[int]] = None):
+        self.product_ids = product_ids or []
+        super().__init__('Insufficient stock')
+
+
+class StockService:
+    """Service for reserving product stock at checkout"""
+
+    @staticmethod
+    def reserve(items: Iterable[Tuple[int, int]], strategy: Optional[str] = None) -> None:
+        """
+        Decrement stock for (product_id, quantity) pairs, all or nothing.
+
+        Must be called inside a transaction that the caller commits or
+        rolls back; on failure nothing is committed by this method but the
+        caller must roll back.
+
+        Args:
+            items: (product_id, quantity) pairs; duplicate products are merged
+            strategy: 'conditional' or 'lock' (default from config)
+
+        Raises:
+            InsufficientStockError: If any product lacks stock
+            ValueError: If a quantity is not positive
+        """
+        quantities = StockService._merge(items)
+        if not quantities:
+            return
+
+        if strategy is None:
+            strategy = current_app.config.get('STOCK_RESERVATION_STRATEGY', STOCK_STRATEGY_CONDITIONAL)
+
+        if strategy == STOCK_STRATEGY_LOCK:
+            StockService._lock_and_check(quantities)
+
+        StockService._apply(quantities)
+
+    @staticmethod
+    def find_insufficient(items: Iterable[Tuple[int, int]]) -> List[Product]:
+        """Products that currently can't cover the requested quantity."""
+        quantities = StockService._merge(items)
+        if not quantities:
+            return []
+        products = Product.query.filter(Product.id.in_(list(quantities))).all()
+        return [product for product in products if product.stock < quantities[product.id]]
+
+    @staticmethod
+    def _merge(items: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+        quantities: Dict[int, int] = {}
+        for product_id, quantity in items:
+            if quantity <= 0:
+                raise ValueError('Quantity must be greater than 0')
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        return quantities
+
+    @staticmethod
+    def _lock_and_check(quantities: Dict[int, int]) -> None:
+        """Lock product rows in primary key order and verify stock."""
+        rows = db.session.query(Product.id, Product.stock)\
+            .filter(Product.id.in_(list(quantities)))\
+            .order_by(Product.id)\
+            .with_for_update()\
+            .all()
+
+        stock = dict(rows)
+        insufficient = [
+            product_id for product_id, quantity in sorted(quantities.items())
+            if stock.get(product_id, 0) < quantity
+        ]
+        if insufficient:
+            raise InsufficientStockError(insufficient)
+
+    @staticmethod
+    def _apply(quantities: Dict[int, int]) -> None:
+        """Guarded batch decrement; every row must match or nothing counts."""
+        product_ids = sorted(quantities)
+        delta = case(quantities, value=Product.id)
+        result = db.session.execute(
+            update(Product)
+            .where(Product.id.in_(product_ids), Product.stock >= delta)
+            .values(stock=Product.stock - delta)
+            .execution_options(synchronize_session=False, **{AFFECTED_PRODUCTS_OPTION: product_ids})
+        )
+        StockService._expire_stock(product_ids)
+
+        if result.rowcount != len(product_ids):
+            raise InsufficientStockError()
+
+    @staticmethod
+    def _expire_stock(product_ids: List[int]) -> None:
+        """Make loaded Product objects re-read stock after a bulk UPDATE."""
+        for product_id in product_ids:
+            product = db.session.identity_map.get(db.session.identity_key(Product, product_id))
+            if product is not None:
+                db.session.expire(product, ['stock'])
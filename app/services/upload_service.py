@@ -0,0 +1,236 @@
+"""
+Upload service for serving files from the uploads folder.
+
+Upload names are uuid4-based and never reused, so a file served under its
+own name gets a content-addressed strong ETag (SHA-1 of the bytes,
+memoized per path/mtime/size) and `Cache-Control: public, max-age=...,
+immutable`. Fallback responses (the WebP file for a raw upload path, the
+full image for a missing variant, the placeholder) can change once a
+conversion finishes, so they get a short max-age instead.
+
+Names that don't exist are remembered with their fallback for
+UPLOADS_NEGATIVE_CACHE_TTL seconds, so repeated misses skip the
+filesystem. With UPLOADS_SERVE_MODE=x-accel (nginx) or x-sendfile
+(Apache/lighttpd) the app only resolves the file and sets the headers; the
+web server sends the bytes.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import stat as stat_module
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from flask import Response, abort, current_app, request, send_file
+from werkzeug.security import safe_join
+from app.utils.images import RAW_EXTENSIONS, variant_base
+
+UPLOADS_SERVE_APP = 'app'
+UPLOADS_SERVE_X_ACCEL = 'x-accel'
+UPLOADS_SERVE_X_SENDFILE = 'x-sendfile'
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+# Fallback responses may change when a background conversion completes
+FALLBACK_MAX_AGE = 60
+
+CACHE_SIZE = 10000
+
+# uuid4().hex names, optionally with a responsive variant suffix
+_IMMUTABLE_NAME_RE = re.compile(r'^[0-9a-f]{32}(_w\d+)?\.[a-z0-9]+$')
+
+PLACEHOLDER_SVG = '''<svg xmlns="http://www.w3.org/2000/svg" width="300" height="300">
+                <rect width="300" height="300" fill="#f0f0f0"/>
+                <text x="50%" y="50%" text-anchor="middle" dy=".3em" fill="#999" font-family="Arial" font-size="14">無圖片</text>
+            </svg>'''.encode('utf-8')
+PLACEHOLDER_ETAG = hashlib.sha1(PLACEHOLDER_SVG).hexdigest()
+
+
+class UploadCache:
+    """Negative lookups and content hashes, bounded LRU per process."""
+
+    def __init__(self, negative_ttl: float, size: int = CACHE_SIZE):
+        self.negative_ttl = negative_ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._missing: 'OrderedDict[str, Tuple[float, Optional[str]]]' = OrderedDict()
+        self._etags: 'OrderedDict[Tuple[str, int, int], str]' = OrderedDict()
+
+    def get_missing(self, filename: str) -> Tuple[bool, Optional[str]]:
+        """(known missing, fallback path) for a requested name."""
+        with self._lock:
+            entry = self._missing.get(filename)
+            if entry is None:
+                return False, None
+            if entry[0] < time.monotonic():
+                del self._missing[filename]
+                return False, None
+            self._missing.move_to_end(filename)
+            return True, entry[1]
+
+    def set_missing(self, filename: str, fallback: Optional[str]) -> None:
+        if self.negative_ttl <= 0:
+            return
+        with self._lock:
+            self._missing[filename] = (time.monotonic() + self.negative_ttl, fallback)
+            self._missing.move_to_end(filename)
+            while len(self._missing) > self.size:
+                self._missing.popitem(last=False)
+
+    def forget(self, filenames: Iterable[str]) -> None:
+        with self._lock:
+            for filename in filenames:
+                self._missing.pop(filename, None)
+
+    def etag(self, path: str, stat: os.stat_result) -> str:
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            etag = self._etags.get(key)
+            if etag is not None:
+                self._etags.move_to_end(key)
+                return etag
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()
+
+        with self._lock:
+            self._etags[key] = etag
+            while len(self._etags) > self.size:
+                self._etags.popitem(last=False)
+        return etag
+
+
+class UploadService:
+    """Service for serving uploaded files"""
+
+    @staticmethod
+    def get_cache() -> UploadCache:
+        """Get (and lazily create) the upload lookup cache for the current app."""
+        app = current_app._get_current_object()
+        cache = app.extensions.get('upload_cache')
+        if cache is None:
+            cache = UploadCache(app.config.get('UPLOADS_NEGATIVE_CACHE_TTL', 60))
+            app.extensions['upload_cache'] = cache
+        return cache
+
+    @staticmethod
+    def forget(filenames: Iterable[str]) -> None:
+        """Drop cached misses for files that have just been written."""
+        UploadService.get_cache().forget(filenames)
+
+    @staticmethod
+    def serve(filename: str) -> Response:
+        """
+        Serve an uploaded file.
+
+        Falls back to the WebP version of a raw image path, to the full image
+        for a missing responsive variant, and to a placeholder SVG for other
+        missing images. Non-image misses are 404.
+        """
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        if safe_join(upload_folder, filename) is None:
+            abort(404)
+
+        cache = UploadService.get_cache()
+        known_missing, fallback = cache.get_missing(filename)
+        if not known_missing:
+            response = UploadService._send(filename, immutable=True)
+            if response is not None:
+                return response
+            fallback = UploadService._find_fallback(filename)
+            cache.set_missing(filename, fallback)
+
+        if fallback is not None:
+            response = UploadService._send(fallback, immutable=False)
+            if response is not None:
+                return response
+            # Fallback vanished (e.g. raw file removed after conversion)
+            cache.forget([filename])
+            fallback = UploadService._find_fallback(filename)
+            if fallback is not None:
+                response = UploadService._send(fallback, immutable=False)
+                if response is not None:
+                    return response
+
+        if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+            # Placeholder instead of 404 so the browser doesn't show a broken image
+            return UploadService._placeholder()
+        abort(404)
+
+    @staticmethod
+    def _find_fallback(filename: str) -> Optional[str]:
+        """Existing file to serve in place of a missing one."""
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        candidates = []
+
+        # Responsive variant not generated yet (older upload or conversion
+        # still running): the full-size image
+        base = variant_base(filename)
+        if base:
+            candidates.extend(f'{base}.{ext}' for ext in ('webp',) + RAW_EXTENSIONS)
+        elif os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+            # Raw upload path whose image has been converted to WebP
+            candidates.append(os.path.splitext(filename)[0] + '.webp')
+
+        for candidate in candidates:
+            path = safe_join(upload_folder, candidate)
+            if path and os.path.isfile(path):
+                return candidate
+        return None
+
+    @staticmethod
+    def _send(filename: str, immutable: bool) -> Optional[Response]:
+        """Response for an existing file, or None if it doesn't exist."""
+        path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError):
+            return None
+        if not stat_module.S_ISREG(stat.st_mode):
+            return None
+
+        etag = UploadService.get_cache().etag(path, stat)
+        mode = current_app.config.get('UPLOADS_SERVE_MODE', UPLOADS_SERVE_APP)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        if mode == UPLOADS_SERVE_X_ACCEL:
+            response = Response(mimetype=mimetype)
+            prefix = current_app.config.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+            response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + filename
+        elif mode == UPLOADS_SERVE_X_SENDFILE:
+            response = Response(mimetype=mimetype)
+            response.headers['X-Sendfile'] = path
+        else:
+            response = send_file(path, mimetype=mimetype, etag=False, conditional=False)
+
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+        UploadService._set_cache_control(response, filename, immutable)
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _placeholder() -> Response:
+        response = Response(PLACEHOLDER_SVG, mimetype='image/svg+xml')
+        response.set_etag(PLACEHOLDER_ETAG)
+        response.cache_control.public = True
+        response.cache_control.max_age = FALLBACK_MAX_AGE
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _set_cache_control(response: Response, filename: str, immutable: bool) -> None:
+        # send_file defaults to no-cache; freshness is decided here
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        if immutable and _IMMUTABLE_NAME_RE.match(os.path.basename(filename)):
+            response.cache_control.max_age = current_app.config.get('UPLOADS_MAX_AGE', 31536000)
+            response.cache_control.immutable = True
+        elif immutable:
+            # Not a generated name: may be replaced in place, so revalidate
+            response.cache_control.max_age = 0
+        else:
+            response.cache_control.max_age = FALLBACK_MAX_AGE
@@ -42,8 +42,8 @@ def error_response(message: str = "Error", status_code: int = 400, errors: Optio
     }
     return jsonify(response), status_code
 
-def paginated_response(data: list, page: int, per_page: int, total: int, 
-                      message: str = "Success") -> tuple:
+def paginated_response(data: list, page: int, per_page: int, total: Optional[int], 
+                      message: str = "Success", cursors: Optional[Dict] = None) -> tuple:
     """
     Create a paginated API response.
     
@@ -51,12 +51,19 @@ def paginated_response(data: list, page: int, per_page: int, total: int,
         data: List of items for current page
         page: Current page number
         per_page: Items per page
-        total: Total number of items
+        total: Total number of items (None when counting was skipped)
         message: Success message
+        cursors: Optional keyset pagination fields (next_cursor, prev_cursor,
+            has_next, has_prev, total_is_estimate) merged into the envelope
         
     Returns:
         Tuple of (jsonify response, status_code)
     """
+    if total is None:
+        pages = None
+    else:
+        pages = (total + per_page - 1) // per_page if total > 0 else 0
+    
     response = {
         'success': True,
         'message': message,
@@ -65,8 +72,9 @@ def paginated_response(data: list, page: int, per_page: int, total: int,
             'page': page,
             'per_page': per_page,
             'total': total,
-            'pages': (total + per_page - 1) // per_page if total > 0 else 0
+            'pages': pages
         }
     }
+    if cursors:
+        response['pagination'].update(cursors)
     return jsonify(response), 200
-
@@ -12,6 +12,15 @@ from app.services.auth_service import AuthService
 from app.services.cart_service import CartService
 from app.services.order_service import OrderService
 from app.utils.helpers import save_uploaded_file, delete_file, slugify
+from app.utils.db_routing import use_replica
+from app.utils.pagination import PRODUCT_SORT_KEYS, paginate_offset, paginate_keyset
+from app.utils.serializers import (PROJECTION_CARD, PROJECTION_LIST, PROJECTION_DETAIL,
+                                   product_load_options, serialize_product, serialize_products)
+from app.services.search_service import SearchService
+from app.services.category_service import CategoryService
+from app.services.dashboard_service import DashboardService
+from app.services.related_products import RelatedProductsService
+from app.constants import SORT_NEWEST, SORT_RELEVANCE, COUNT_EXACT
 from sqlalchemy.orm import joinedload
 from app.models import OrderItem
 
@@ -19,17 +28,10 @@ class APIService:
     """Service layer that provides API functionality as callable functions."""
     
     @staticmethod
+    @use_replica()
     def get_dashboard_stats() -> Dict[str, Any]:
         """Get dashboard statistics."""
-        stats = {
-            'total_users': User.query.count(),
-            'total_products': Product.query.count(),
-            'total_orders': Order.query.count(),
-            'total_categories': Category.query.count(),
-            'total_banners': Banner.query.count(),
-            'pending_orders': Order.query.filter_by(status='pending').count(),
-            'active_products': Product.query.filter_by(is_active=True).count(),
-        }
+        stats = DashboardService.get_stats()
         return {'success': True, 'data': stats}
     
     @staticmethod
@@ -48,9 +50,9 @@ class APIService:
             orders_data.append({
                 'id': order.id,
                 'order_number': order.order_number,
-                'total_amount': float(order.total_amount),
+                'total_amount': order.total_amount,
                 'status': order.status,
-                'created_at': order.created_at.isoformat(),
+                'created_at': order.created_at,
                 'shipping_name': order.shipping_name
             })
         
@@ -70,7 +72,7 @@ class APIService:
                 'username': user.username,
                 'email': user.email,
                 'role': user.role,
-                'created_at': user.created_at.isoformat()
+                'created_at': user.created_at
             })
         
         return {
@@ -85,161 +87,103 @@ class APIService:
         }
     
     @staticmethod
+    @use_replica()
     def get_products(page: int = 1, per_page: int = 20, 
                     category_id: Optional[int] = None,
                     search: Optional[str] = None,
                     is_active: Optional[bool] = None,
-                    sort: Optional[str] = None) -> Dict[str, Any]:
+                    sort: Optional[str] = None,
+                    cursor: Optional[str] = None,
+                    count: str = COUNT_EXACT) -> Dict[str, Any]:
         """
         Get products list.
         
         Args:
-            page: Page number
+            page: Page number (ignored in cursor mode)
             per_page: Items per page
             category_id: Filter by category
-            search: Search in product name
+            search: Full-text search in product name and description
             is_active: Filter by active status
-            sort: Sort option (newest, price_asc, price_desc, name)
+            sort: Sort option (newest, price_asc, price_desc, name, relevance).
+                Defaults to relevance when searching, newest otherwise.
+            cursor: Keyset cursor. None uses page numbers; '' starts
+                cursor pagination at the first page.
+            count: Total count mode (exact, estimate, none)
         """
-        query = db.session.query(Product).options(joinedload(Product.category))
+        query = db.session.query(Product).options(*product_load_options(PROJECTION_LIST))
         
         if category_id:
             query = query.filter_by(category_id=category_id)
-        if search:
-            query = query.filter(Product.name.contains(search))
         if is_active is not None:
             query = query.filter_by(is_active=is_active)
+        if search:
+            query, relevance = SearchService.apply(query, search, category_id=category_id)
+        
+        # Sorting and pagination
+        if search and (sort is None or sort == SORT_RELEVANCE):
+            # Ranked results are paged by number; cursors need plain columns
+            sort_keys = ((relevance, 'desc'), (Product.id, 'desc'))
+            pagination = paginate_offset(query, page, per_page, SORT_RELEVANCE, sort_keys,
+                                         count=count, with_cursors=False)
+        else:
+            if sort not in PRODUCT_SORT_KEYS:
+                sort = SORT_NEWEST
+            sort_keys = PRODUCT_SORT_KEYS[sort]
+            
+            if cursor is not None:
+                try:
+                    pagination = paginate_keyset(query, per_page, sort, sort_keys,
+                                                 cursor=cursor, count=count)
+                except ValueError:
+                    return {'success': False, 'message': '無效的分頁游標'}
+            else:
+                pagination = paginate_offset(query, page, per_page, sort, sort_keys,
+                                             count=count)
         
-        # Sorting
-        if sort == 'price_asc':
-            query = query.order_by(Product.price.asc())
-        elif sort == 'price_desc':
-            query = query.order_by(Product.price.desc())
-        elif sort == 'name':
-            query = query.order_by(Product.name.asc())
-        else:  # newest
-            query = query.order_by(Product.created_at.desc())
-        
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        products_data = []
-        for product in pagination.items:
-            images = product.get_images()
-            products_data.append({
-                'id': product.id,
-                'name': product.name,
-                'slug': product.slug,
-                'description': product.description,
-                'price': float(product.price),
-                'stock': product.stock,
-                'category_id': product.category_id,
-                'category_name': product.category.name if product.category else None,
-                'images': images,
-                'main_image': images[0] if images else '/static/images/no-image.png',
-                'is_active': product.is_active,
-                'is_in_stock': product.is_in_stock(),
-                'created_at': product.created_at.isoformat()
-            })
+        products_data = serialize_products(pagination.items, PROJECTION_LIST)
         
         return {
             'success': True,
             'data': products_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages
-            }
+            'pagination': pagination.to_dict()
         }
     
     @staticmethod
     def get_product(product_id: int) -> Dict[str, Any]:
         """Get product by ID."""
         product = db.session.query(Product)\
-            .options(joinedload(Product.category))\
+            .options(*product_load_options(PROJECTION_DETAIL))\
             .get(product_id)
         
         if not product:
             return {'success': False, 'message': 'Product not found'}
         
-        images = product.get_images()
-        product_data = {
-            'id': product.id,
-            'name': product.name,
-            'slug': product.slug,
-            'description': product.description,
-            'price': float(product.price),
-            'stock': product.stock,
-            'category_id': product.category_id,
-            'category_name': product.category.name if product.category else None,
-            'images': images,
-            'main_image': images[0] if images else '/static/images/no-image.png',
-            'is_active': product.is_active,
-            'is_in_stock': product.is_in_stock(),
-            'created_at': product.created_at.isoformat(),
-            'updated_at': product.updated_at.isoformat()
-        }
-        return {'success': True, 'data': product_data}
+        return {'success': True, 'data': serialize_product(product, PROJECTION_DETAIL)}
     
     @staticmethod
     def get_related_products(product_id: int, category_id: int, limit: int = 4) -> Dict[str, Any]:
-        """Get related products (same category)."""
-        products = db.session.query(Product)\
-            .options(joinedload(Product.category))\
-            .filter(
-                Product.category_id == category_id,
-                Product.id != product_id,
-                Product.is_active == True
-            )\
-            .limit(limit)\
-            .all()
+        """
+        Get related products (co-purchased first, then newest of the same category).
         
-        products_data = []
-        for product in products:
-            images = product.get_images()
-            products_data.append({
-                'id': product.id,
-                'name': product.name,
-                'slug': product.slug,
-                'price': float(product.price),
-                'images': images,
-                'main_image': images[0] if images else '/static/images/no-image.png',
-                'is_active': product.is_active,
-                'is_in_stock': product.is_in_stock()
-            })
+        Served from the in-memory related products index.
+        """
+        products_data = RelatedProductsService.get_related(product_id, category_id, limit)
         
         return {'success': True, 'data': products_data}
     
     @staticmethod
+    @use_replica()
     def get_categories(parent_id: Optional[int] = None,
                       is_active: Optional[bool] = None) -> Dict[str, Any]:
-        """Get categories list."""
-        query = Category.query
-        
-        if parent_id is not None:
-            query = query.filter_by(parent_id=parent_id)
-        if is_active is not None:
-            query = query.filter_by(is_active=is_active)
-        
-        categories = query.order_by(Category.sort_order, Category.id).all()
-        
-        categories_data = []
-        for category in categories:
-            categories_data.append({
-                'id': category.id,
-                'name': category.name,
-                'slug': category.slug,
-                'parent_id': category.parent_id,
-                'parent_name': category.parent.name if category.parent else None,
-                'description': category.description,
-                'image': category.image,
-                'sort_order': category.sort_order,
-                'is_active': category.is_active,
-                'children_count': len(category.children) if category.children else 0
-            })
+        """
+        Get categories list.
         
+        Served from the cached category tree (no per-row parent/children queries).
+        """
+        categories_data = CategoryService.get_tree().list_categories(
+            parent_id=parent_id,
+            is_active=is_active
+        )
         return {'success': True, 'data': categories_data}
     
     @staticmethod
@@ -281,10 +225,10 @@ class APIService:
             orders_data.append({
                 'id': order.id,
                 'order_number': order.order_number,
-                'total_amount': float(order.total_amount),
+                'total_amount': order.total_amount,
                 'status': order.status,
                 'shipping_name': order.shipping_name,
-                'created_at': order.created_at.isoformat()
+                'created_at': order.created_at
             })
         
         return {
@@ -318,22 +262,22 @@ class APIService:
                 'product_id': item.product_id,
                 'product_name': item.product.name if item.product else 'N/A',
                 'quantity': item.quantity,
-                'price': float(item.price),
-                'subtotal': float(item.get_subtotal())
+                'price': item.price,
+                'subtotal': item.get_subtotal()
             })
         
         order_data = {
             'id': order.id,
             'order_number': order.order_number,
-            'total_amount': float(order.total_amount),
+            'total_amount': order.total_amount,
             'status': order.status,
             'shipping_name': order.shipping_name,
             'shipping_phone': order.shipping_phone,
             'shipping_email': order.shipping_email,
             'shipping_address': order.shipping_address,
             'items': items_data,
-            'created_at': order.created_at.isoformat(),
-            'updated_at': order.updated_at.isoformat()
+            'created_at': order.created_at,
+            'updated_at': order.updated_at
         }
         
         return {'success': True, 'data': order_data}
@@ -367,14 +311,15 @@ class APIService:
         order_data = {
             'id': order.id,
             'order_number': order.order_number,
-            'total_amount': float(order.total_amount),
+            'total_amount': order.total_amount,
             'status': order.status,
-            'created_at': order.created_at.isoformat()
+            'created_at': order.created_at
         }
         
         return {'success': True, 'data': order_data, 'message': '訂單建立成功'}
     
     @staticmethod
+    @use_replica()
     def get_banners(is_active: Optional[bool] = None) -> Dict[str, Any]:
         """Get banners list."""
         query = Banner.query
@@ -403,43 +348,20 @@ class APIService:
         cart_items = CartService.get_cart_items()
         total = CartService.calculate_total(cart_items)
         
-        # Convert cart items to dict format
-        items_data = []
-        for item in cart_items:
-            product = item.get('product')
-            if product:
-                images = product.get_images()
-                items_data.append({
-                    'product': {
-                        'id': product.id,
-                        'name': product.name,
-                        'price': float(product.price),
-                        'stock': product.stock,
-                        'main_image': images[0] if images else '/static/images/no-image.png',
-                        'is_in_stock': product.is_in_stock()
-                    },
-                    'quantity': item.get('quantity', 0),
-                    'subtotal': float(item.get('subtotal', 0))
-                })
-            else:
-                items_data.append({
-                    'product': {
-                        'id': None,
-                        'name': 'N/A',
-                        'price': 0,
-                        'stock': 0,
-                        'main_image': None,
-                        'is_in_stock': False
-                    },
-                    'quantity': item.get('quantity', 0),
-                    'subtotal': float(item.get('subtotal', 0))
-                })
+        items_data = [
+            {
+                'product': serialize_product(item['product'], PROJECTION_CARD),
+                'quantity': item.get('quantity', 0),
+                'subtotal': item.get('subtotal', 0)
+            }
+            for item in cart_items
+        ]
         
         return {
             'success': True,
             'data': {
                 'items': items_data,
-                'total': float(total),
+                'total': total,
                 'item_count': len(cart_items)
             }
         }
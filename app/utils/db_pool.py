@@ -0,0 +1,178 @@
+"""
+Database connection pool configuration and metrics.
+
+init_engine_options() turns the DB_POOL_* settings into
+SQLALCHEMY_ENGINE_OPTIONS before Flask-SQLAlchemy creates the engine:
+
+- pool_size / max_overflow: persistent connections and extra connections
+  opened under load. Each process has its own pool, so a deployment opens
+  up to workers x (pool_size + max_overflow) connections; keep that below
+  the server's max_connections
+- pool_timeout: seconds a request waits for a free connection before
+  sqlalchemy.exc.TimeoutError
+- pool_recycle: connections older than this are replaced, below MySQL's
+  wait_timeout and proxy / load balancer idle timeouts
+- pool_pre_ping: checks a connection with a cheap round trip on checkout
+  and transparently reconnects instead of failing on a stale one
+
+Options set explicitly in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+The pool is an InstrumentedQueuePool, which records how long checkouts
+wait; pool_status() reports those metrics with the pool's current usage.
+In-memory SQLite keeps Flask-SQLAlchemy's single shared connection.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """Thread-safe checkout counters and wait time histogram of one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.peak_checked_out = 0
+            self.buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def record(self, wait: float, checked_out: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if wait <= bound:
+                    self.buckets[i] += 1
+                    break
+            else:
+                self.buckets[-1] += 1
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            labels = [f'<={bound}s' for bound in WAIT_BUCKETS] + [f'>{WAIT_BUCKETS[-1]}s']
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / waits * 1000, 3) if waits else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'wait_histogram': dict(zip(labels, self.buckets)),
+                'peak_checked_out': self.peak_checked_out,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout takes.
+
+    The time includes waiting for a free connection, opening a new one and
+    the pre-ping, i.e. everything a request spends before it can query.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - started)
+            raise
+        self.metrics.record(time.perf_counter() - started, self.checkedout())
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; keep counting in the new one
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def engine_options(config, uri: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Engine options for a database URI from the DB_POOL_* settings.
+
+    Args:
+        config: App config
+        uri: Database URI
+        options: Explicit options, which take precedence
+
+    Returns:
+        Engine options (without the URL)
+    """
+    options = dict(options or {})
+    url = make_url(uri)
+
+    options.setdefault('pool_pre_ping', config.get('DB_POOL_PRE_PING', True))
+    in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+    if not in_memory and 'poolclass' not in options:
+        options['poolclass'] = InstrumentedQueuePool
+        options.setdefault('pool_size', config.get('DB_POOL_SIZE', 10))
+        options.setdefault('max_overflow', config.get('DB_MAX_OVERFLOW', 10))
+        options.setdefault('pool_timeout', config.get('DB_POOL_TIMEOUT', 30))
+        options.setdefault('pool_recycle', config.get('DB_POOL_RECYCLE', 1800))
+    return options
+
+
+def init_engine_options(app) -> None:
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* settings.
+
+    Must run before db.init_app(app).
+    """
+    config = app.config
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        config, config['SQLALCHEMY_DATABASE_URI'], config.get('SQLALCHEMY_ENGINE_OPTIONS')
+    )
+
+
+def pool_metrics(engine: Engine) -> Optional[PoolMetrics]:
+    """Checkout metrics of an engine's pool (None when not instrumented)."""
+    return getattr(engine.pool, 'metrics', None)
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """
+    Current usage, settings and checkout metrics of an engine's pool.
+
+    Returns:
+        Dict with the pool class, size, checked in/out and overflow
+        connections, and (for instrumented pools) checkout metrics
+    """
+    pool = engine.pool
+    status: Dict[str, Any] = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'recycle': pool._recycle,
+            'pre_ping': pool._pre_ping,
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    metrics = pool_metrics(engine)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,155 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+With DB_REPLICA_URI set, the replica is registered as the 'replica'
+Flask-SQLAlchemy bind. Code inside use_replica() (a context manager and
+decorator) sends its SELECTs to the replica; everything else, including
+all writes, uses the primary. A read still goes to the primary when:
+
+- the SQLAlchemy session has already flushed or executed a write in this
+  request, so the request sees its own uncommitted/just committed rows
+- the visitor committed a write less than REPLICA_STICKY_SECONDS ago
+  (recorded in the Flask session cookie), so pages shown right after a
+  write don't miss it because of replication lag
+
+Caches that outlive the request (response cache, search index, category
+tree, dashboard snapshot, related products) are filled inside cache_fill().
+Those caches are rebuilt right after the commit that invalidated them, so
+for REPLICA_STICKY_SECONDS after this process committed a write their
+reads use the primary; otherwise a rebuild would keep rows the replica
+hasn't received yet for the cache's whole TTL. Other processes refill a
+shared (Redis) response cache from the replica as soon as the tags are
+bumped, so those tags are bumped again when the window has passed.
+
+Without a replica, use_replica() and cache_fill() do nothing.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+from flask import current_app, has_app_context, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from app.utils.db_pool import engine_options
+
+REPLICA_BIND = 'replica'
+# Session.info keys: use_replica() and cache_fill() nesting depths, and whether this session wrote
+_READS_KEY = 'replica_reads'
+_FILL_KEY = 'replica_cache_fill'
+_WROTE_KEY = 'replica_wrote'
+# app.extensions key: monotonic time of the last write committed in this process
+_PROCESS_WRITE_KEY = 'db_last_write'
+# Flask session key: time of the visitor's last committed write
+_LAST_WRITE_KEY = '_db_last_write'
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends use_replica() reads to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and self._read_from_replica(clause):
+            engines = self._db.engines
+            # Models with their own bind_key keep it
+            if engine is engines.get(None):
+                return engines[REPLICA_BIND]
+        return engine
+
+    def _read_from_replica(self, clause: Any) -> bool:
+        if not self.info.get(_READS_KEY) or self.info.get(_WROTE_KEY) or self._flushing:
+            return False
+        # SELECTs only: DML, text() and connection() calls (clause None) use the primary
+        if clause is None or not getattr(clause, 'is_select', False):
+            return False
+        if REPLICA_BIND not in self._db.engines or _recently_wrote():
+            return False
+        return not (self.info.get(_FILL_KEY) and _process_recently_wrote())
+
+
+@contextmanager
+def use_replica() -> Iterator[None]:
+    """Send the reads of the block (or decorated function) to the replica."""
+    from app import db
+
+    info = db.session().info
+    info[_READS_KEY] = info.get(_READS_KEY, 0) + 1
+    try:
+        yield
+    finally:
+        info[_READS_KEY] -= 1
+
+
+@contextmanager
+def cache_fill() -> Iterator[None]:
+    """
+    Mark the reads of the block as filling a cache that outlives the request.
+
+    They keep using the replica under use_replica(), except within
+    REPLICA_STICKY_SECONDS of a write committed in this process.
+    """
+    from app import db
+
+    info = db.session().info
+    info[_FILL_KEY] = info.get(_FILL_KEY, 0) + 1
+    try:
+        yield
+    finally:
+        info[_FILL_KEY] -= 1
+
+
+def init_replica(app) -> None:
+    """
+    Register DB_REPLICA_URI as the 'replica' bind with the DB_POOL_* options.
+
+    Must run before db.init_app(app).
+    """
+    uri = app.config.get('DB_REPLICA_URI')
+    if not uri:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.setdefault(REPLICA_BIND, {'url': uri, **engine_options(app.config, uri)})
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def _recently_wrote() -> bool:
+    """Whether the current visitor committed a write within REPLICA_STICKY_SECONDS."""
+    if not has_request_context():
+        return False
+    last_write = flask_session.get(_LAST_WRITE_KEY)
+    return last_write is not None and \
+        time.time() - last_write < current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+
+
+def _process_recently_wrote() -> bool:
+    """Whether this process committed a write within REPLICA_STICKY_SECONDS."""
+    last_write = current_app.extensions.get(_PROCESS_WRITE_KEY)
+    return last_write is not None and \
+        time.monotonic() - last_write < current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+
+
+def _mark_written(session) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+def _on_execute(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_written(orm_execute_state.session)
+
+
+def _after_flush(session, flush_context) -> None:
+    _mark_written(session)
+
+
+def _after_commit(session) -> None:
+    if not session.info.get(_WROTE_KEY) or not has_app_context():
+        return
+    if REPLICA_BIND not in session._db.engines:
+        return
+    current_app.extensions[_PROCESS_WRITE_KEY] = time.monotonic()
+    if has_request_context():
+        flask_session[_LAST_WRITE_KEY] = time.time()
+
+
+event.listen(RoutingSession, 'do_orm_execute', _on_execute)
+event.listen(RoutingSession, 'after_flush', _after_flush)
+event.listen(RoutingSession, 'after_commit', _after_commit)
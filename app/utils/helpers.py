@@ -4,6 +4,8 @@ from werkzeug.utils import secure_filename
 from flask import current_app
 from PIL import Image
 import io
+from app.services.image_service import ImageService, flatten_image, save_webp_set, WEBP_QUALITY
+from app.utils.images import variant_paths
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -25,16 +27,8 @@ def convert_to_webp(image_path, quality=85):
         # Open image
         img = Image.open(image_path)
         
-        # Convert RGBA to RGB if necessary (WebP supports RGBA, but we'll use RGB for better compatibility)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Create a white background
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
+        # Convert to RGB (WebP supports RGBA, but we'll use RGB for better compatibility)
+        img = flatten_image(img)
         
         # Generate WebP filename
         webp_path = os.path.splitext(image_path)[0] + '.webp'
@@ -56,13 +50,20 @@ def save_uploaded_file(file, subfolder='', convert_webp=True):
     """
     Save uploaded file and optionally convert to WebP format.
     
+    With IMAGE_PROCESSING=async (default) images are stored as uploaded and
+    converted to WebP in the background once the request has finished; the
+    stored path is swapped to the WebP file when the conversion is done.
+    If the background queue is full, or in sync mode, the image is
+    converted in the request.
+    
     Args:
         file: Uploaded file object
         subfolder: Subfolder within uploads directory
         convert_webp: Whether to convert image to WebP format (default: True)
         
     Returns:
-        Relative path to saved file (WebP if converted, original otherwise)
+        Relative path to saved file (raw upload while a background
+        conversion is pending, WebP if converted, original otherwise)
     """
     if file and allowed_file(file.filename):
         # Generate unique filename
@@ -76,29 +77,26 @@ def save_uploaded_file(file, subfolder='', convert_webp=True):
         is_image = original_ext in {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         
         if is_image and convert_webp:
+            name = uuid.uuid4().hex
+            webp_path = os.path.join(subfolder, f"{name}.webp").replace('\\', '/')
+            
+            if ImageService.is_async():
+                # Store the raw upload now; the conversion runs after the request
+                raw_path = os.path.join(subfolder, f"{name}.{original_ext}").replace('\\', '/')
+                if ImageService.enqueue(subfolder, raw_path, webp_path):
+                    file.save(os.path.join(upload_folder, f"{name}.{original_ext}"))
+                    return raw_path
+            
             # For images, save as WebP
-            filename = f"{uuid.uuid4().hex}.webp"
-            filepath = os.path.join(upload_folder, filename)
+            filepath = os.path.join(upload_folder, f"{name}.webp")
             
             try:
-                # Open and convert image
+                # Open and convert image, saving WebP plus responsive variants
                 img = Image.open(io.BytesIO(file.read()))
-                
-                # Convert RGBA to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Save as WebP
-                img.save(filepath, 'WEBP', quality=85, optimize=True)
+                save_webp_set(img, filepath, WEBP_QUALITY)
                 
                 # Return relative path
-                return os.path.join(subfolder, filename).replace('\\', '/')
+                return webp_path
             except Exception as e:
                 # If conversion fails, save original format
                 current_app.logger.error(f'WebP conversion failed: {str(e)}')
@@ -119,6 +117,7 @@ def delete_file(filepath):
     """
     Delete file from uploads directory.
     Also handles WebP files - if deleting a non-WebP file, will also try to delete corresponding WebP.
+    Responsive width variants of the image are deleted as well.
     
     Args:
         filepath: Relative path to file (e.g., 'products/image.jpg' or 'products/image.webp')
@@ -147,6 +146,15 @@ def delete_file(filepath):
                 except Exception as e:
                     current_app.logger.error(f'Failed to delete WebP file {webp_path}: {str(e)}')
         
+        # Delete responsive variants
+        for variant in variant_paths(filepath).values():
+            variant_full_path = os.path.join(current_app.config['UPLOAD_FOLDER'], variant)
+            if os.path.exists(variant_full_path):
+                try:
+                    os.remove(variant_full_path)
+                except Exception as e:
+                    current_app.logger.error(f'Failed to delete image variant {variant}: {str(e)}')
+        
         return deleted
     return False
 
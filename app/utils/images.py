@@ -0,0 +1,115 @@
+"""
+Upload image path helpers.
+
+Every uploaded image products/<uuid>.webp has resized WebP variants stored
+next to it as products/<uuid>_w<width>.webp, one per IMAGE_VARIANT_WIDTHS
+entry narrower than the image (images are never upscaled). Variant paths
+are derived from the stored path, so no extra columns are needed; the
+/uploads route serves the full image when a variant is missing (e.g.
+images uploaded before variants existed). srcset and image_variants only
+list the variants found in the upload folder.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from flask import current_app, has_app_context
+from app.constants import IMAGE_VARIANT_WIDTHS
+
+# Raw upload formats that are converted to WebP
+RAW_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif')
+
+_VARIANT_RE = re.compile(r'^(?P<stem>.+)_w(?P<width>\d+)\.webp$')
+
+# Shown for products without images
+NO_IMAGE_PATH = '/static/images/no-image.png'
+
+# Distinct Product.images values whose parsed form is kept in memory
+PARSED_IMAGES_CACHE_SIZE = 4096
+
+
+class ParsedImages(NamedTuple):
+    """Images of a product row with everything derived from them."""
+    paths: Tuple[str, ...]
+    variants: Tuple[Dict[str, str], ...]
+    main_srcset: Optional[str]
+
+
+def is_upload_path(path: Optional[str]) -> bool:
+    """Whether a stored image path points into the uploads folder."""
+    return bool(path) and not path.startswith('/')
+
+
+def variant_path(path: str, width: int) -> str:
+    """Path of the variant of an uploaded image at the given width."""
+    stem = path.rsplit('.', 1)[0]
+    return f'{stem}_w{width}.webp'
+
+
+def variant_paths(path: Optional[str]) -> Dict[str, str]:
+    """All variants of an uploaded image keyed by width (as string, for JSON)."""
+    if not is_upload_path(path):
+        return {}
+    return {str(width): variant_path(path, width) for width in IMAGE_VARIANT_WIDTHS}
+
+
+def variant_widths(image_width: int) -> Tuple[int, ...]:
+    """Variant widths generated for an image of the given width."""
+    return tuple(width for width in IMAGE_VARIANT_WIDTHS if width < image_width)
+
+
+def generated_widths(path: Optional[str]) -> Tuple[int, ...]:
+    """Variant widths of an uploaded image that exist in the upload folder."""
+    if not is_upload_path(path):
+        return ()
+    if not has_app_context():
+        return IMAGE_VARIANT_WIDTHS
+    folder = current_app.config['UPLOAD_FOLDER']
+    return tuple(width for width in IMAGE_VARIANT_WIDTHS
+                 if os.path.exists(os.path.join(folder, variant_path(path, width))))
+
+
+def image_srcset(path: Optional[str], url_prefix: str = '/uploads/',
+                 widths: Iterable[int] = IMAGE_VARIANT_WIDTHS) -> Optional[str]:
+    """srcset attribute value for an uploaded image's variants, or None without any."""
+    if not is_upload_path(path):
+        return None
+    return ', '.join(f'{url_prefix}{variant_path(path, width)} {width}w' for width in widths) or None
+
+
+def variant_base(path: str) -> Optional[str]:
+    """Stem of the original image if path names a variant, else None."""
+    match = _VARIANT_RE.match(path)
+    if not match or int(match.group('width')) not in IMAGE_VARIANT_WIDTHS:
+        return None
+    return match.group('stem')
+
+
+@lru_cache(maxsize=PARSED_IMAGES_CACHE_SIZE)
+def parse_images(images_json: Optional[str]) -> ParsedImages:
+    """
+    Parse a Product.images JSON value, memoized.
+
+    The stored JSON text is the cache key, so any change to a row's images
+    (upload, removal, WebP path swap) is a new entry and stale results are
+    never returned. Variants are looked up on disk when a value is first
+    parsed; variants created later by generate_image_variants.py are listed
+    once the entry is evicted or the process restarts. Results are shared:
+    copy the tuples before mutating.
+    """
+    paths = ()
+    if images_json:
+        try:
+            parsed = json.loads(images_json)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list):
+            paths = tuple(parsed)
+    widths = [generated_widths(path) for path in paths]
+    return ParsedImages(
+        paths=paths,
+        variants=tuple({str(width): variant_path(path, width) for width in path_widths}
+                       for path, path_widths in zip(paths, widths)),
+        main_srcset=image_srcset(paths[0], widths=widths[0]) if paths else None,
+    )
@@ -0,0 +1,88 @@
+"""
+JSON provider for API responses.
+
+jsonify / success_response / paginated_response go through app.json. With
+orjson installed (pip install orjson) OrjsonProvider encodes responses in
+C; otherwise StdlibJSONProvider is used. Both produce the same JSON values
+(orjson writes non-ASCII text as UTF-8 instead of escaping it):
+
+- Decimal -> number (float), so Numeric columns can be returned as is
+- datetime / date -> ISO 8601 string (not Flask's default HTTP date)
+- keys sorted (app.json.sort_keys), non-string keys allowed
+
+Config.JSON_PROVIDER selects auto (orjson when installed), orjson or stdlib.
+"""
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime
+from typing import Any, Union
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_PROVIDER_AUTO = 'auto'
+JSON_PROVIDER_ORJSON = 'orjson'
+JSON_PROVIDER_STDLIB = 'stdlib'
+
+
+def _default(o: Any) -> Any:
+    """Types the encoders don't handle natively."""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's json module based provider with ISO dates and numeric Decimals."""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """orjson based provider encoding like StdlibJSONProvider."""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._encode(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys),
+                            indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self._encode(obj, sort_keys=self.sort_keys, indent=indent) + b'\n',
+            mimetype=self.mimetype
+        )
+
+    def _encode(self, obj: Any, sort_keys: bool, indent: bool) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+
+def init_json_provider(app) -> None:
+    """Install the configured JSON provider on an app."""
+    choice = app.config.get('JSON_PROVIDER', JSON_PROVIDER_AUTO)
+    if choice == JSON_PROVIDER_ORJSON and orjson is None:
+        app.logger.warning('JSON_PROVIDER=orjson but orjson is not installed; using the stdlib encoder')
+    use_orjson = orjson is not None and choice in (JSON_PROVIDER_AUTO, JSON_PROVIDER_ORJSON)
+    app.json = (OrjsonProvider if use_orjson else StdlibJSONProvider)(app)
@@ -0,0 +1,335 @@
+"""
+Pagination utilities with keyset (cursor) support.
+
+OFFSET pagination makes the database walk and discard every row before the
+requested page, and Flask-SQLAlchemy's paginate() issues an extra COUNT(*)
+on every call. Keyset pagination seeks directly past the last row of the
+previous page using the sort columns, so deep pages cost the same as the
+first one. Cursors are opaque URL-safe tokens that encode the sort key of
+the boundary row.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, or_, func
+from app.models import Product, Order
+from app.constants import (
+    SORT_NEWEST, SORT_PRICE_ASC, SORT_PRICE_DESC, SORT_NAME, SORT_STOCK_ASC, SORT_STOCK_DESC,
+    COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE, COUNT_ESTIMATE_CAP
+)
+
+# Sort keys for each product sort option: (column, direction) pairs.
+# The primary key is always the last column so the ordering is total.
+PRODUCT_SORT_KEYS = {
+    SORT_NEWEST: ((Product.created_at, 'desc'), (Product.id, 'desc')),
+    SORT_PRICE_ASC: ((Product.price, 'asc'), (Product.id, 'asc')),
+    SORT_PRICE_DESC: ((Product.price, 'desc'), (Product.id, 'desc')),
+    SORT_NAME: ((Product.name, 'asc'), (Product.id, 'asc')),
+}
+
+# Admin product list: the public sorts plus stock
+ADMIN_PRODUCT_SORT_KEYS = dict(PRODUCT_SORT_KEYS, **{
+    SORT_STOCK_ASC: ((Product.stock, 'asc'), (Product.id, 'asc')),
+    SORT_STOCK_DESC: ((Product.stock, 'desc'), (Product.id, 'desc')),
+})
+
+# Admin order list: newest first
+ORDER_SORT_KEYS = ((Order.created_at, 'desc'), (Order.id, 'desc'))
+
+CURSOR_NEXT = 'n'
+CURSOR_PREV = 'p'
+
+
+class PageResult:
+    """A single page of results, produced by either pagination mode."""
+
+    def __init__(self, items: List[Any], page: int, per_page: int,
+                 total: Optional[int], total_is_estimate: bool,
+                 has_next: bool, has_prev: bool,
+                 next_cursor: Optional[str] = None,
+                 prev_cursor: Optional[str] = None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def pages(self) -> Optional[int]:
+        if self.total is None:
+            return None
+        return (self.total + self.per_page - 1) // self.per_page if self.total > 0 else 0
+
+    def cursor_info(self) -> Dict[str, Any]:
+        """Cursor fields to merge into the pagination envelope."""
+        return {
+            'has_next': self.has_next,
+            'has_prev': self.has_prev,
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'total_is_estimate': self.total_is_estimate,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Full pagination envelope as used by APIService responses."""
+        data = {
+            'page': self.page,
+            'per_page': self.per_page,
+            'total': self.total,
+            'pages': self.pages,
+        }
+        data.update(self.cursor_info())
+        return data
+
+
+def encode_cursor(sort: str, values: Sequence[Any], direction: str, page: int) -> str:
+    """
+    Encode a boundary row's sort key into an opaque cursor token.
+
+    Args:
+        sort: Sort option the cursor belongs to
+        values: Sort key values of the boundary row
+        direction: CURSOR_NEXT or CURSOR_PREV
+        page: Page number the cursor leads to (for display only)
+    """
+    payload = {
+        's': sort,
+        'd': direction,
+        'p': page,
+        'v': [_dump_value(value) for value in values],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, keys: Sequence[Tuple[Any, str]]) -> Dict[str, Any]:
+    """
+    Decode a cursor token produced by encode_cursor().
+
+    Raises:
+        ValueError: If the token is malformed or belongs to another sort
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['v']
+        direction = payload['d']
+        page = int(payload.get('p', 1))
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+    if payload.get('s') != sort or direction not in (CURSOR_NEXT, CURSOR_PREV):
+        raise ValueError('Cursor does not match the requested sort')
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError('Invalid cursor')
+
+    try:
+        loaded = [_load_value(column, value) for (column, _), value in zip(keys, values)]
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError('Invalid cursor')
+
+    return {'values': loaded, 'direction': direction, 'page': max(page, 1)}
+
+
+def count_query(query, mode: str = COUNT_EXACT,
+                cap: int = COUNT_ESTIMATE_CAP) -> Tuple[Optional[int], bool]:
+    """
+    Count rows matched by a query.
+
+    Args:
+        query: SQLAlchemy query (ordering and eager loads are stripped)
+        mode: COUNT_EXACT, COUNT_ESTIMATE or COUNT_NONE
+        cap: Upper bound scanned in COUNT_ESTIMATE mode
+
+    Returns:
+        Tuple of (total or None, total_is_estimate)
+    """
+    base = query.enable_eagerloads(False).order_by(None)
+
+    if mode == COUNT_EXACT:
+        return base.count(), False
+    if mode == COUNT_ESTIMATE:
+        # Count at most cap + 1 rows; anything beyond the cap is reported as the cap
+        bounded = base.limit(cap + 1).subquery()
+        total = query.session.query(func.count()).select_from(bounded).scalar()
+        if total > cap:
+            return cap, True
+        return total, False
+    return None, False
+
+
+def paginate_offset(query, page: int, per_page: int, sort: str,
+                    keys: Sequence[Tuple[Any, str]],
+                    count: str = COUNT_EXACT,
+                    with_cursors: bool = True) -> PageResult:
+    """
+    Classic page-number pagination.
+
+    Also emits cursors for the page boundaries so clients can switch to
+    keyset pagination for further navigation. Pass with_cursors=False when
+    the sort keys include computed expressions (e.g. search relevance).
+    """
+    page = max(page, 1)
+    ordered = query.order_by(*_order_by(keys, backwards=False))
+    rows = ordered.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    has_prev = page > 1
+    has_cursors = with_cursors and bool(rows)
+
+    total, total_is_estimate = count_query(query, count)
+
+    return PageResult(
+        items=rows,
+        page=page,
+        per_page=per_page,
+        total=total,
+        total_is_estimate=total_is_estimate,
+        has_next=has_next,
+        has_prev=has_prev,
+        next_cursor=_boundary_cursor(rows, -1, sort, keys, CURSOR_NEXT, page + 1) if has_next and has_cursors else None,
+        prev_cursor=_boundary_cursor(rows, 0, sort, keys, CURSOR_PREV, page - 1) if has_prev and has_cursors else None,
+    )
+
+
+def paginate_keyset(query, per_page: int, sort: str,
+                    keys: Sequence[Tuple[Any, str]],
+                    cursor: Optional[str] = None,
+                    count: str = COUNT_NONE) -> PageResult:
+    """
+    Keyset (cursor) pagination.
+
+    Args:
+        query: Filtered query without ORDER BY
+        per_page: Items per page
+        sort: Sort option name, embedded in cursors
+        keys: (column, direction) pairs ending with a unique column
+        cursor: Cursor token from a previous page, or None/'' for the first page
+        count: Total count mode (defaults to skipping the count)
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    position = decode_cursor(cursor, sort, keys) if cursor else None
+    backwards = position is not None and position['direction'] == CURSOR_PREV
+    page = position['page'] if position else 1
+
+    paged = query
+    if position is not None:
+        paged = paged.filter(_seek_predicate(keys, position['values'], backwards))
+    rows = paged.order_by(*_order_by(keys, backwards)).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = position is not None, has_more
+
+    total, total_is_estimate = count_query(query, count)
+
+    return PageResult(
+        items=rows,
+        page=page,
+        per_page=per_page,
+        total=total,
+        total_is_estimate=total_is_estimate,
+        has_next=has_next and bool(rows),
+        has_prev=has_prev and bool(rows),
+        next_cursor=_boundary_cursor(rows, -1, sort, keys, CURSOR_NEXT, page + 1) if has_next else None,
+        prev_cursor=_boundary_cursor(rows, 0, sort, keys, CURSOR_PREV, page - 1) if has_prev else None,
+    )
+
+
+def query_args(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Non-empty list filters, for links that keep them (pagination, redirects)."""
+    return {key: value for key, value in filters.items() if value not in (None, '')}
+
+
+def _order_by(keys: Sequence[Tuple[Any, str]], backwards: bool) -> List[Any]:
+    """ORDER BY clauses for the sort keys, reversed when paging backwards."""
+    clauses = []
+    for column, direction in keys:
+        ascending = (direction == 'asc') != backwards
+        clauses.append(column.asc() if ascending else column.desc())
+    return clauses
+
+
+def _seek_predicate(keys: Sequence[Tuple[Any, str]], values: Sequence[Any], backwards: bool):
+    """
+    Build (a > x) OR (a = x AND b > y) ... for the boundary row.
+
+    Expanded instead of a row-value comparison so MySQL can use a range
+    scan on the sort index.
+
+    Nullable columns (created_at) follow the database's own ORDER BY, where
+    NULL sorts as the lowest value (MySQL, SQLite): a NULL boundary value
+    seeks to the remaining NULL rows instead of comparing with NULL, which
+    would match nothing.
+    """
+    clauses = []
+    for i, (column, direction) in enumerate(keys):
+        ascending = (direction == 'asc') != backwards
+        seek = _seek_past(column, values[i], ascending)
+        if seek is None:
+            continue
+        equals = [_equals(keys[j][0], values[j]) for j in range(i)]
+        clauses.append(and_(*equals, seek))
+    return or_(*clauses)
+
+
+def _seek_past(column, value: Any, ascending: bool):
+    """Rows after value in the given direction; None when there are none."""
+    if value is None:
+        return column.isnot(None) if ascending else None
+    if ascending:
+        return column > value
+    if column.nullable:
+        return or_(column < value, column.is_(None))
+    return column < value
+
+
+def _equals(column, value: Any):
+    """column = value, with IS NULL for a NULL boundary value."""
+    return column.is_(None) if value is None else column == value
+
+
+def _boundary_cursor(rows: List[Any], index: int, sort: str,
+                     keys: Sequence[Tuple[Any, str]], direction: str,
+                     page: int) -> Optional[str]:
+    """Cursor for the first (index 0) or last (index -1) row of a page."""
+    if not rows:
+        return None
+    row = rows[index]
+    values = [getattr(row, column.key) for column, _ in keys]
+    return encode_cursor(sort, values, direction, max(page, 1))
+
+
+def _dump_value(value: Any) -> Any:
+    """Convert a sort key value to a JSON-safe representation."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(column, value: Any) -> Any:
+    """Convert a JSON cursor value back to the column's Python type."""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(str(value))
+    if python_type is int:
+        return int(value)
+    return str(value)
@@ -0,0 +1,96 @@
+"""
+Product serialization shared by the API endpoints and APIService.
+
+Each projection is a fixed field set together with the columns it needs:
+
+- card: id, name, slug, price, stock, images, main_image, image_variants,
+  main_image_srcset, is_active, is_in_stock (related products, cart lines)
+- list: card + description, category_id, category_name, created_at
+  (product lists)
+- detail: list + updated_at (single product)
+
+Use product_load_options() on the query so only those columns (and the
+category name, when the projection has it) are selected. Image lists come
+from the memoized parse_images, so a row's images JSON is parsed once per
+distinct value instead of once per serialization. Prices (Decimal) and
+timestamps (datetime) are left as is for the app's JSON provider to encode.
+"""
+from typing import Any, Dict, Iterable, List
+from sqlalchemy.orm import joinedload, load_only
+from app.models import Product, Category
+from app.utils.images import NO_IMAGE_PATH, parse_images
+
+PROJECTION_CARD = 'card'
+PROJECTION_LIST = 'list'
+PROJECTION_DETAIL = 'detail'
+
+PROJECTIONS = [PROJECTION_CARD, PROJECTION_LIST, PROJECTION_DETAIL]
+
+_CARD_COLUMNS = (Product.id, Product.name, Product.slug, Product.price, Product.stock,
+                 Product.images, Product.is_active)
+_LIST_COLUMNS = _CARD_COLUMNS + (Product.description, Product.category_id, Product.created_at)
+
+PROJECTION_COLUMNS = {
+    PROJECTION_CARD: _CARD_COLUMNS,
+    PROJECTION_LIST: _LIST_COLUMNS,
+    PROJECTION_DETAIL: _LIST_COLUMNS + (Product.updated_at,),
+}
+
+
+def product_load_options(projection: str = PROJECTION_LIST) -> list:
+    """
+    Query options loading only the columns a projection serializes.
+
+    Args:
+        projection: card, list or detail
+
+    Returns:
+        Options for Query.options() / select().options()
+    """
+    options = [load_only(*PROJECTION_COLUMNS[projection])]
+    if projection != PROJECTION_CARD:
+        options.append(joinedload(Product.category).load_only(Category.id, Category.name))
+    return options
+
+
+def serialize_product(product: Product, projection: str = PROJECTION_LIST) -> Dict[str, Any]:
+    """
+    Convert a product to its API dict.
+
+    Args:
+        product: Product loaded with at least the projection's columns
+        projection: card, list or detail
+
+    Returns:
+        Dict for jsonify (Decimal/datetime values are encoded by the JSON provider)
+    """
+    images = parse_images(product.images)
+    data = {
+        'id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'price': product.price,
+        'stock': product.stock,
+        'images': list(images.paths),
+        'main_image': images.paths[0] if images.paths else NO_IMAGE_PATH,
+        'image_variants': list(images.variants),
+        'main_image_srcset': images.main_srcset,
+        'is_active': product.is_active,
+        'is_in_stock': product.stock > 0 and product.is_active,
+    }
+    if projection == PROJECTION_CARD:
+        return data
+
+    category = product.category
+    data['description'] = product.description
+    data['category_id'] = product.category_id
+    data['category_name'] = category.name if category else None
+    data['created_at'] = product.created_at
+    if projection == PROJECTION_DETAIL:
+        data['updated_at'] = product.updated_at
+    return data
+
+
+def serialize_products(products: Iterable[Product], projection: str = PROJECTION_LIST) -> List[Dict[str, Any]]:
+    """Serialize several products with the same projection."""
+    return [serialize_product(product, projection) for product in products]
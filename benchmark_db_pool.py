@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Connection pool load test: find the saturation point of a worker/thread layout.
+
+Simulates a gunicorn deployment with --workers processes, each with its
+own app and connection pool (DB_POOL_* or the --pool-* overrides), and
+steps the number of request threads per worker (like gunicorn --threads).
+Every step hammers one API endpoint for --duration seconds and reports
+throughput, latency percentiles and pool checkout waits / timeouts.
+
+The saturation point is the first step at which adding threads no longer
+raises throughput by --min-gain (default 10%), or at which checkouts time
+out. Beyond it requests only queue: for the pool (checkout waits grow) or
+for the CPU / database (latency grows without pool waits).
+
+The response cache and fragment cache are disabled so every request
+reaches the database. The endpoint is read-only; run it against a
+database with realistic data (see index_advisor.py --seed).
+
+Usage:
+    python benchmark_db_pool.py
+    python benchmark_db_pool.py --workers 4 --threads 1,2,4,8,16 --pool-size 5 --max-overflow 0
+    python benchmark_db_pool.py --database-url sqlite:///advisor.db --path "/api/v1/products?category_id=3"
+"""
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+
+from app.config import Config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Connection pool saturation load test')
+    parser.add_argument('--database-url', help='SQLAlchemy database URL (default: configured database)')
+    parser.add_argument('--workers', type=int, default=2, help='Worker processes (default: 2)')
+    parser.add_argument('--threads', default='1,2,4,8,16,32',
+                        help='Comma separated threads per worker to step through (default: 1,2,4,8,16,32)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per step (default: 5)')
+    parser.add_argument('--path', default='/api/v1/products?per_page=20',
+                        help='Endpoint to request (default: /api/v1/products?per_page=20)')
+    parser.add_argument('--pool-size', type=int, help='Override DB_POOL_SIZE')
+    parser.add_argument('--max-overflow', type=int, help='Override DB_MAX_OVERFLOW')
+    parser.add_argument('--pool-timeout', type=int, help='Override DB_POOL_TIMEOUT')
+    parser.add_argument('--min-gain', type=float, default=0.1,
+                        help='Throughput gain below which a step counts as saturated (default: 0.1)')
+    return parser.parse_args()
+
+
+def configure(args):
+    """Apply the command line overrides to Config (also in worker processes)"""
+    if args.database_url:
+        Config.SQLALCHEMY_DATABASE_URI = args.database_url
+    Config.SQLALCHEMY_ECHO = False
+    Config.RESPONSE_CACHE_ENABLED = False
+    Config.FRAGMENT_CACHE_ENABLED = False
+    if args.pool_size is not None:
+        Config.DB_POOL_SIZE = args.pool_size
+    if args.max_overflow is not None:
+        Config.DB_MAX_OVERFLOW = args.max_overflow
+    if args.pool_timeout is not None:
+        Config.DB_POOL_TIMEOUT = args.pool_timeout
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_worker(args, threads, ready, start, results):
+    """One worker process: its own app and pool, `threads` request loops"""
+    configure(args)
+    from app import create_app, db
+    from app.utils.db_pool import pool_metrics, pool_status
+
+    app = create_app()
+    # Pool timeouts are counted as errors; don't print a traceback for each
+    app.logger.disabled = True
+    with app.app_context():
+        # Warm up (imports, first connection, caches of the process) before measuring
+        app.test_client().get(args.path)
+        metrics = pool_metrics(db.engine)
+        if metrics is not None:
+            metrics.reset()
+
+    latencies = [[] for _ in range(threads)]
+    errors = [0] * threads
+
+    def loop(index):
+        client = app.test_client()
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = client.get(args.path).status_code
+            except Exception:
+                status = 500
+            latencies[index].append(time.perf_counter() - started)
+            if status >= 500:
+                errors[index] += 1
+
+    ready.release()
+    start.wait()
+    loops = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    for thread in loops:
+        thread.start()
+    for thread in loops:
+        thread.join()
+
+    with app.app_context():
+        status = pool_status(db.engine)
+    results.put({
+        'latencies': [latency for thread_latencies in latencies for latency in thread_latencies],
+        'errors': sum(errors),
+        'pool': status,
+    })
+
+
+def run_step(args, threads):
+    """Run all workers with `threads` threads each; aggregate their results"""
+    ready = multiprocessing.Semaphore(0)
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=run_worker, args=(args, threads, ready, start, results))
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.acquire()
+    start.set()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    latencies = [latency for result in collected for latency in result['latencies']]
+    pools = [result['pool'] for result in collected]
+    checkouts = sum(pool.get('checkouts', 0) for pool in pools)
+    return {
+        'concurrency': args.workers * threads,
+        'requests': len(latencies),
+        'errors': sum(result['errors'] for result in collected),
+        'rps': len(latencies) / args.duration,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'wait_avg_ms': (sum(pool.get('wait_avg_ms', 0) * pool.get('checkouts', 0) for pool in pools)
+                        / checkouts if checkouts else 0.0),
+        'wait_max_ms': max(pool.get('wait_max_ms', 0) for pool in pools),
+        'timeouts': sum(pool.get('timeouts', 0) for pool in pools),
+        'peak_checked_out': max(pool.get('peak_checked_out', 0) for pool in pools),
+    }
+
+
+def main():
+    args = parse_args()
+    configure(args)
+    try:
+        steps = [int(value) for value in args.threads.split(',') if value.strip()]
+    except ValueError:
+        sys.exit('--threads must be a comma separated list of integers')
+
+    from app import create_app, db
+    from app.utils.db_pool import pool_status
+    app = create_app()
+    with app.app_context():
+        pool = pool_status(db.engine)
+        print(f'Database: {db.engine.dialect.name}, pool per worker: {pool["pool"]} '
+              f'size={pool.get("size")} max_overflow={pool.get("max_overflow")} timeout={pool.get("timeout")}s')
+    print(f'Workers: {args.workers}, endpoint: {args.path}, {args.duration:g}s per step\n')
+    print(f'{"threads":>7} {"conc":>5} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+          f'{"wait avg":>9} {"wait max":>9} {"peak":>5} {"timeouts":>8} {"errors":>6}')
+
+    saturation, previous = None, None
+    for threads in steps:
+        result = run_step(args, threads)
+        print(f'{threads:>7} {result["concurrency"]:>5} {result["rps"]:>8.1f} {result["p50_ms"]:>8.1f} '
+              f'{result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f} {result["wait_avg_ms"]:>9.2f} '
+              f'{result["wait_max_ms"]:>9.1f} {result["peak_checked_out"]:>5} {result["timeouts"]:>8} '
+              f'{result["errors"]:>6}')
+        if saturation is None and previous is not None and (
+            result['timeouts'] or result['rps'] < previous['rps'] * (1 + args.min_gain)
+        ):
+            saturation = previous
+        previous = result
+
+    print()
+    if saturation is None:
+        print('No saturation within the tested steps; try more threads.')
+    else:
+        print(f'Saturation at ~{saturation["concurrency"]} concurrent requests '
+              f'({args.workers} workers x {saturation["concurrency"] // args.workers} threads, '
+              f'{saturation["rps"]:.1f} req/s). More threads only add latency.')
+
+
+if __name__ == '__main__':
+    main()
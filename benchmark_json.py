@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark of API response encoding.
+
+Encodes a product list page (paginated_response envelope with list
+projection items) with:
+
+- Flask's default provider, values pre-converted with float()/isoformat()
+  as the controllers did before the JSON provider handled them
+- StdlibJSONProvider (Decimal/datetime encoded by the provider)
+- OrjsonProvider, when orjson is installed
+
+Only the response body encoding is measured (app.json.response), no
+database access.
+
+Usage:
+    python benchmark_json.py
+    python benchmark_json.py --items 100 --repeat 2000
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.images import image_srcset, variant_paths
+from app.utils.json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='API response JSON encoding benchmark')
+    parser.add_argument('--items', type=int, default=100, help='Products per page (default: 100)')
+    parser.add_argument('--images', type=int, default=4, help='Images per product (default: 4)')
+    parser.add_argument('--repeat', type=int, default=1000, help='Encodes per case (default: 1000)')
+    return parser.parse_args()
+
+
+def build_page(args, native: bool):
+    """A paginated_response body; native keeps Decimal/datetime values"""
+    created = datetime(2025, 1, 1, 12, 30, 15)
+    items = []
+    for i in range(args.items):
+        images = [f'products/{i:08d}{n:024d}.webp' for n in range(args.images)]
+        price = Decimal(f'{100 + i % 900}.{i % 100:02d}')
+        created_at = created + timedelta(minutes=i)
+        items.append({
+            'id': i + 1,
+            'name': f'筆記型電腦 {i:03d}',
+            'slug': f'product-{i}',
+            'description': '輕薄高效能筆電，適合辦公與娛樂。' * 6,
+            'price': price if native else float(price),
+            'stock': i % 20,
+            'category_id': i % 7 + 1,
+            'category_name': '3C 電子',
+            'images': images,
+            'main_image': images[0],
+            'image_variants': [variant_paths(image) for image in images],
+            'main_image_srcset': image_srcset(images[0]),
+            'is_active': True,
+            'is_in_stock': i % 20 > 0,
+            'created_at': created_at if native else created_at.isoformat(),
+        })
+    return {
+        'success': True,
+        'message': '產品列表',
+        'data': items,
+        'pagination': {'page': 1, 'per_page': args.items, 'total': 5000, 'pages': 50},
+    }
+
+
+def timed(app, page, repeat):
+    """Median seconds per encode (batches of repeat // 10) and body size"""
+    with app.app_context():
+        body = app.json.response(page).get_data()
+        batch = max(1, repeat // 10)
+        times = []
+        for _ in range(10):
+            started = time.perf_counter()
+            for _ in range(batch):
+                app.json.response(page)
+            times.append((time.perf_counter() - started) / batch)
+    return statistics.median(times), len(body)
+
+
+def main():
+    args = parse_args()
+    legacy_page = build_page(args, native=False)
+    native_page = build_page(args, native=True)
+
+    cases = [
+        ('flask default (pre-converted)', DefaultJSONProvider, legacy_page),
+        ('stdlib provider', StdlibJSONProvider, native_page),
+    ]
+    if orjson is not None:
+        cases.append(('orjson provider', OrjsonProvider, native_page))
+    else:
+        print('orjson is not installed; pip install orjson to include it\n')
+
+    print(f'{args.items} products per page, {args.repeat} encodes per case')
+    baseline = None
+    for name, provider_class, page in cases:
+        app = Flask(__name__)
+        app.json = provider_class(app)
+        median, size = timed(app, page, args.repeat)
+        baseline = baseline or median
+        print(f'  {name:<30} {median * 1e6:9.1f} us/response  {size / 1024:7.1f} KiB  x{baseline / median:.2f}')
+
+
+if __name__ == '__main__':
+    main()
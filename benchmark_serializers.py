@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the product serializer layer.
+
+Compares the per-row dict-building loops the API used before
+app/utils/serializers.py (full entity + joinedload category, json.loads of
+images on every call) with serialize_products() and its projections:
+
+- serialize: converting already loaded products (image parsing memoized)
+- query+serialize: loading a page of products and converting it, with all
+  columns vs. only the projection's columns
+
+Runs against a throwaway SQLite database unless --database-url is given.
+
+Usage:
+    python benchmark_serializers.py
+    python benchmark_serializers.py --rows 5000 --repeat 20
+    python benchmark_serializers.py --database-url sqlite:///bench.db
+"""
+import argparse
+import json
+import statistics
+import time
+import uuid
+
+from app.config import Config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Product serializer microbenchmark')
+    parser.add_argument('--database-url', help='SQLAlchemy database URL (default: in-memory SQLite)')
+    parser.add_argument('--rows', type=int, default=2000, help='Products to create (default: 2000)')
+    parser.add_argument('--page-size', type=int, default=100, help='Rows per query+serialize run (default: 100)')
+    parser.add_argument('--images', type=int, default=4, help='Images per product (default: 4)')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per case (default: 10)')
+    return parser.parse_args()
+
+
+def create_bench_app(args):
+    Config.SQLALCHEMY_DATABASE_URI = args.database_url or 'sqlite://'
+    Config.SQLALCHEMY_ECHO = False
+    if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        from sqlalchemy.pool import StaticPool
+        Config.SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': StaticPool,
+                                            'connect_args': {'check_same_thread': False}}
+
+    from app import create_app
+    return create_app()
+
+
+def setup_products(app, args):
+    """Create a benchmark category with products that have images"""
+    from app import db
+    from app.models import Category, Product
+
+    tag = uuid.uuid4().hex[:8]
+    with app.app_context():
+        db.create_all()
+        category = Category(name=f'bench-{tag}', slug=f'bench-{tag}', is_active=True)
+        db.session.add(category)
+        db.session.flush()
+        db.session.execute(Product.__table__.insert(), [
+            {
+                'name': f'bench-{tag}-{i}',
+                'slug': f'bench-{tag}-{i}',
+                'description': 'Lorem ipsum dolor sit amet. ' * 40,
+                'price': 10 + i % 500,
+                'stock': i % 20,
+                'category_id': category.id,
+                'images': json.dumps([f'products/{uuid.uuid4().hex}.webp' for _ in range(args.images)]),
+                'is_active': True,
+            }
+            for i in range(args.rows)
+        ])
+        db.session.commit()
+        return category.id
+
+
+def teardown_products(app, category_id):
+    from app import db
+    from app.models import Category, Product
+
+    with app.app_context():
+        Product.query.filter_by(category_id=category_id).delete()
+        Category.query.filter_by(id=category_id).delete()
+        db.session.commit()
+
+
+def legacy_serialize(products):
+    """The list loop from before the serializer layer (baseline)"""
+    from app.utils.images import image_srcset, variant_paths
+
+    products_data = []
+    for product in products:
+        try:
+            images = json.loads(product.images) if product.images else []
+        except ValueError:
+            images = []
+        products_data.append({
+            'id': product.id,
+            'name': product.name,
+            'slug': product.slug,
+            'description': product.description,
+            'price': float(product.price),
+            'stock': product.stock,
+            'category_id': product.category_id,
+            'category_name': product.category.name if product.category else None,
+            'images': images,
+            'main_image': images[0] if images else '/static/images/no-image.png',
+            'image_variants': [variant_paths(image) for image in images],
+            'main_image_srcset': image_srcset(images[0]) if images else None,
+            'is_active': product.is_active,
+            'is_in_stock': product.stock > 0 and product.is_active,
+            'created_at': product.created_at.isoformat()
+        })
+    return products_data
+
+
+def timed(fn, repeat):
+    """Median and best wall time of fn over repeat runs"""
+    fn()  # warm up (also fills the parsed-images memo, as in a running server)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), min(times)
+
+
+def report(name, rows, median, best, baseline=None):
+    per_row = median / rows * 1e6
+    speedup = f'  x{baseline / median:.2f}' if baseline else ''
+    print(f'  {name:<34} {median * 1000:9.2f} ms  {per_row:7.2f} us/row  (best {best * 1000:.2f} ms){speedup}')
+
+
+def main():
+    args = parse_args()
+    app = create_bench_app(args)
+
+    from app import db
+    from app.models import Product
+    from sqlalchemy.orm import joinedload
+    from app.utils.serializers import (PROJECTION_CARD, PROJECTION_LIST, product_load_options,
+                                       serialize_products)
+
+    category_id = setup_products(app, args)
+    try:
+        with app.app_context():
+            products = db.session.query(Product).options(joinedload(Product.category))\
+                .filter_by(category_id=category_id).all()
+            rows = len(products)
+
+            print(f'serialize ({rows} loaded products, {args.images} images each)')
+            baseline, best = timed(lambda: legacy_serialize(products), args.repeat)
+            report('legacy loop', rows, baseline, best)
+            median, best = timed(lambda: serialize_products(products, PROJECTION_LIST), args.repeat)
+            report('serialize_products(list)', rows, median, best, baseline)
+            median, best = timed(lambda: serialize_products(products, PROJECTION_CARD), args.repeat)
+            report('serialize_products(card)', rows, median, best, baseline)
+
+            def page_query(options):
+                db.session.expunge_all()
+                return db.session.query(Product).options(*options)\
+                    .filter_by(category_id=category_id)\
+                    .order_by(Product.id.desc())\
+                    .limit(args.page_size).all()
+
+            page = args.page_size
+            print(f'\nquery+serialize ({page} rows per page)')
+            baseline, best = timed(
+                lambda: legacy_serialize(page_query([joinedload(Product.category)])), args.repeat)
+            report('all columns + legacy loop', page, baseline, best)
+            median, best = timed(
+                lambda: serialize_products(page_query(product_load_options(PROJECTION_LIST)), PROJECTION_LIST),
+                args.repeat)
+            report('list projection', page, median, best, baseline)
+            median, best = timed(
+                lambda: serialize_products(page_query(product_load_options(PROJECTION_CARD)), PROJECTION_CARD),
+                args.repeat)
+            report('card projection', page, median, best, baseline)
+    finally:
+        teardown_products(app, category_id)
+
+
+if __name__ == '__main__':
+    main()
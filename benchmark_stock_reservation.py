@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress benchmark for checkout stock reservation.
+
+Fires N concurrent checkouts (default 200) at a few hot products with
+limited stock, then verifies that no stock was oversold: for every
+product, initial stock - final stock must equal the quantity actually
+ordered, and final stock must never be negative.
+
+Usage:
+    python benchmark_stock_reservation.py
+    python benchmark_stock_reservation.py --strategy lock --concurrency 200
+    python benchmark_stock_reservation.py --database-url sqlite:///bench.db
+
+Without --database-url the configured database (DB_* in .env) is used.
+Benchmark rows are created under a dedicated category and removed afterwards.
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from app.config import Config
+from app.constants import STOCK_STRATEGIES
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Checkout stock reservation stress benchmark')
+    parser.add_argument('--database-url', help='SQLAlchemy database URL (default: configured database)')
+    parser.add_argument('--strategy', choices=STOCK_STRATEGIES + ['all'], default='all',
+                        help='Reservation strategy to benchmark (default: all)')
+    parser.add_argument('--concurrency', type=int, default=200, help='Concurrent checkouts (default: 200)')
+    parser.add_argument('--products', type=int, default=3, help='Number of hot products (default: 3)')
+    parser.add_argument('--stock', type=int, default=100, help='Initial stock per product (default: 100)')
+    parser.add_argument('--max-quantity', type=int, default=3, help='Max quantity per cart line (default: 3)')
+    parser.add_argument('--pool-size', type=int, default=50, help='Connection pool size (default: 50)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for cart generation')
+    return parser.parse_args()
+
+
+def create_bench_app(args):
+    """Create the app with a pool large enough for the benchmark threads"""
+    if args.database_url:
+        Config.SQLALCHEMY_DATABASE_URI = args.database_url
+    Config.SQLALCHEMY_ECHO = False
+
+    engine_options = {'pool_size': args.pool_size, 'max_overflow': 0, 'pool_timeout': 120}
+    if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        engine_options['connect_args'] = {'timeout': 60, 'check_same_thread': False}
+    Config.SQLALCHEMY_ENGINE_OPTIONS = engine_options
+
+    from app import create_app
+    return create_app()
+
+
+def setup_products(app, args):
+    """Create a benchmark category with hot products"""
+    from app import db
+    from app.models import Category, Product
+
+    tag = uuid.uuid4().hex[:8]
+    with app.app_context():
+        db.create_all()
+        category = Category(name=f'bench-{tag}', slug=f'bench-{tag}', is_active=True)
+        db.session.add(category)
+        db.session.flush()
+
+        product_ids = []
+        for i in range(args.products):
+            product = Product(
+                name=f'bench-{tag}-{i}',
+                slug=f'bench-{tag}-{i}',
+                price=10,
+                stock=args.stock,
+                category_id=category.id,
+                is_active=True
+            )
+            db.session.add(product)
+            db.session.flush()
+            product_ids.append(product.id)
+
+        db.session.commit()
+        return category.id, product_ids
+
+
+def teardown_products(app, category_id, product_ids):
+    """Remove benchmark orders, products and category"""
+    from app import db
+    from app.models import Category, Order, OrderItem, Product
+
+    with app.app_context():
+        order_ids = [row[0] for row in db.session.query(OrderItem.order_id)
+                     .filter(OrderItem.product_id.in_(product_ids)).distinct()]
+        if order_ids:
+            OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+            Order.query.filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+        Product.query.filter(Product.id.in_(product_ids)).delete(synchronize_session=False)
+        Category.query.filter_by(id=category_id).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def reset_stock(app, product_ids, stock):
+    from app import db
+    from app.models import Product
+
+    with app.app_context():
+        Product.query.filter(Product.id.in_(product_ids))\
+            .update({Product.stock: stock}, synchronize_session=False)
+        db.session.commit()
+
+
+def build_carts(args, product_ids):
+    """Random multi-line carts; line order is shuffled to exercise lock ordering"""
+    rng = random.Random(args.seed)
+    carts = []
+    for _ in range(args.concurrency):
+        lines = rng.sample(product_ids, rng.randint(1, len(product_ids)))
+        carts.append([(product_id, rng.randint(1, args.max_quantity)) for product_id in lines])
+    return carts
+
+
+def run_strategy(app, args, strategy, product_ids, carts):
+    """Run all checkouts concurrently and collect results"""
+    from app import db
+    from app.models import Product
+    from app.services.order_service import OrderService
+
+    app.config['STOCK_RESERVATION_STRATEGY'] = strategy
+    barrier = threading.Barrier(len(carts) + 1)
+    results = [None] * len(carts)
+
+    def checkout(index, cart):
+        with app.app_context():
+            products = {p.id: p for p in Product.query.filter(Product.id.in_([pid for pid, _ in cart])).all()}
+            cart_items = [
+                {'product': products[pid], 'quantity': qty, 'subtotal': float(products[pid].price) * qty}
+                for pid, qty in cart
+            ]
+            # Detach the snapshot and end the read transaction so waiting
+            # threads don't hold read locks (SQLite would block writers)
+            db.session.expunge_all()
+            db.session.rollback()
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                order, error = OrderService.create_order(
+                    shipping_name='bench',
+                    shipping_phone='0900000000',
+                    shipping_address='bench',
+                    cart_items=cart_items
+                )
+                if order is not None:
+                    status = 'ok'
+                elif error and error.startswith('Insufficient stock'):
+                    status = 'rejected'
+                else:
+                    status = 'error'
+            except Exception as e:
+                status, error = 'error', str(e)
+            results[index] = (status, time.perf_counter() - started, cart)
+            db.session.remove()
+
+    threads = [threading.Thread(target=checkout, args=(i, cart)) for i, cart in enumerate(carts)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return results, elapsed
+
+
+def verify(app, args, product_ids, results):
+    """Compare stock movement with quantities of successful orders"""
+    from app.models import Product
+
+    ordered = defaultdict(int)
+    for status, _, cart in results:
+        if status == 'ok':
+            for product_id, quantity in cart:
+                ordered[product_id] += quantity
+
+    with app.app_context():
+        final = dict(Product.query.with_entities(Product.id, Product.stock)
+                     .filter(Product.id.in_(product_ids)).all())
+
+    oversold = 0
+    for product_id in product_ids:
+        sold = args.stock - final[product_id]
+        if final[product_id] < 0 or sold != ordered[product_id]:
+            oversold += abs(sold - ordered[product_id]) + max(0, -final[product_id])
+    return final, ordered, oversold
+
+
+def report(strategy, args, results, elapsed, final, ordered, oversold):
+    counts = defaultdict(int)
+    for status, _, _ in results:
+        counts[status] += 1
+    latencies = sorted(latency for _, latency, _ in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+
+    print(f'\n=== strategy: {strategy} ===')
+    print(f'checkouts:        {len(results)} concurrent')
+    print(f'succeeded:        {counts["ok"]}')
+    print(f'rejected (stock): {counts["rejected"]}')
+    print(f'errors:           {counts["error"]}')
+    print(f'wall time:        {elapsed:.3f}s')
+    print(f'throughput:       {len(results) / elapsed:.1f} checkouts/s')
+    print(f'latency p50/p95:  {statistics.median(latencies) * 1000:.1f}ms / {p95 * 1000:.1f}ms')
+    for product_id in sorted(final):
+        print(f'product {product_id}: stock {args.stock} -> {final[product_id]} '
+              f'(ordered {ordered[product_id]})')
+    print(f'oversold units:   {oversold}')
+
+
+def main():
+    args = parse_args()
+    app = create_bench_app(args)
+    strategies = STOCK_STRATEGIES if args.strategy == 'all' else [args.strategy]
+
+    category_id, product_ids = setup_products(app, args)
+    failed = False
+    try:
+        carts = build_carts(args, product_ids)
+        demand = sum(qty for cart in carts for _, qty in cart)
+        print(f'{len(product_ids)} products x {args.stock} stock, total demand {demand} units')
+
+        for strategy in strategies:
+            reset_stock(app, product_ids, args.stock)
+            results, elapsed = run_strategy(app, args, strategy, product_ids, carts)
+            final, ordered, oversold = verify(app, args, product_ids, results)
+            report(strategy, args, results, elapsed, final, ordered, oversold)
+            failed = failed or oversold > 0
+    finally:
+        teardown_products(app, category_id, product_ids)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Rebuild "customers also bought" recommendations from order history.
+
+Streams order lines of non-cancelled orders in chunks, counts how often
+each pair of products was bought in the same order (sparse co-occurrence
+matrix) and replaces product_recommendations with the top K neighbours
+of every product. Run it periodically, e.g. nightly from cron.
+
+Usage:
+    python build_recommendations.py
+    python build_recommendations.py --top-k 20 --chunk-size 10000 --max-order-size 100
+"""
+import argparse
+
+from app import create_app
+from app.constants import RECOMMENDATION_CHUNK_SIZE, RECOMMENDATION_MAX_ORDER_SIZE, RECOMMENDATION_TOP_K
+from app.services.recommendation_service import RecommendationService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild co-purchase recommendations')
+    parser.add_argument('--top-k', type=int, default=RECOMMENDATION_TOP_K,
+                        help=f'Neighbours stored per product (default: {RECOMMENDATION_TOP_K})')
+    parser.add_argument('--chunk-size', type=int, default=RECOMMENDATION_CHUNK_SIZE,
+                        help=f'Order lines read per query (default: {RECOMMENDATION_CHUNK_SIZE})')
+    parser.add_argument('--max-order-size', type=int, default=RECOMMENDATION_MAX_ORDER_SIZE,
+                        help=f'Skip orders with more distinct products (default: {RECOMMENDATION_MAX_ORDER_SIZE})')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        stats = RecommendationService.rebuild(
+            chunk_size=args.chunk_size,
+            top_k=args.top_k,
+            max_order_size=args.max_order_size
+        )
+
+    print(f"Orders counted: {stats['orders']} ({stats['skipped_orders']} skipped as too large)")
+    print(f"Product pairs: {stats['nonzero_pairs']}")
+    print(f"Recommendations written: {stats['rows_written']}")
+    print(f"Done in {stats['build_seconds'] + stats['save_seconds']:.1f}s "
+          f"(matrix {stats['build_seconds']:.1f}s, save {stats['save_seconds']:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Generate responsive width variants for uploaded images that don't have them.
+
+Images uploaded before variants existed are served at full size (the
+/uploads route falls back to the original). This script creates the
+missing <name>_w<width>.webp files for every WebP image in the upload
+folders using a process pool, and removes variants at or above an image's
+own width (same-size copies written by earlier versions).
+
+Usage:
+    python generate_image_variants.py
+    python generate_image_variants.py --workers 4 --dry-run
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+
+from app import create_app
+from app.constants import IMAGE_VARIANT_WIDTHS
+from app.services.image_service import UPLOAD_FOLDERS, create_variants
+from app.utils.images import variant_base, variant_path, variant_widths
+
+
+def find_missing(upload_folder):
+    """Absolute paths of WebP images whose variants don't match their width"""
+    missing = []
+    for folder in UPLOAD_FOLDERS:
+        directory = os.path.join(upload_folder, folder)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if not name.endswith('.webp') or variant_base(name):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with Image.open(path) as img:
+                    expected = variant_widths(img.width)
+            except OSError:
+                continue
+            if any(os.path.exists(variant_path(path, width)) != (width in expected)
+                   for width in IMAGE_VARIANT_WIDTHS):
+                missing.append(path)
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate missing responsive image variants')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Worker processes')
+    parser.add_argument('--dry-run', action='store_true', help='Only list images missing variants')
+    args = parser.parse_args()
+
+    app = create_app()
+    missing = find_missing(app.config['UPLOAD_FOLDER'])
+    print(f'{len(missing)} images missing variants')
+    if args.dry_run or not missing:
+        for path in missing:
+            print(path)
+        return
+
+    started = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(create_variants, path): path for path in missing}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f'Failed: {futures[future]}: {e}')
+            if done % 100 == 0:
+                print(f'{done}/{len(missing)} images processed')
+
+    elapsed = time.perf_counter() - started
+    print(f'Done: {len(missing) - failed} images in {elapsed:.1f}s, {failed} failed')
+
+
+if __name__ == '__main__':
+    main()
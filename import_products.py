@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Bulk import products from a CSV or JSON Lines file.
+
+Columns / keys: name, price, category (category slug) are required;
+slug, description, stock, is_active and images are optional. Rows whose
+slug already exists update that product; rows without a slug create a
+new product with a unique slug generated from the name. Images are URLs
+or local file paths (separated by | in CSV, a list in JSONL); they are
+downloaded and converted to WebP in a worker pool.
+
+Usage:
+    python import_products.py products.csv
+    python import_products.py products.jsonl --batch-size 1000 --workers 8
+"""
+import argparse
+
+from app import create_app
+from app.constants import IMPORT_FORMATS, IMPORT_FORMAT_CSV
+from app.services.product_import import ProductImportService
+
+
+def print_progress(report):
+    print(f'{report.total} rows: {report.inserted} inserted, {report.updated} updated, '
+          f'{report.failed} failed, {report.images} images '
+          f'({report.rows_per_second:.0f} rows/s)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import products from CSV or JSONL')
+    parser.add_argument('path', help='CSV or JSONL file')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='File format (default: from the extension)')
+    parser.add_argument('--batch-size', type=int, help='Rows per batch (default: IMPORT_BATCH_SIZE)')
+    parser.add_argument('--workers', type=int, help='Image worker processes (default: IMPORT_IMAGE_WORKERS)')
+    args = parser.parse_args()
+
+    fmt = args.format or ProductImportService.format_for(args.path) or IMPORT_FORMAT_CSV
+
+    app = create_app()
+    with app.app_context(), open(args.path, encoding='utf-8-sig', newline='') as stream:
+        report = ProductImportService.import_file(
+            stream, fmt,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            allow_local_images=True,
+            progress=print_progress
+        )
+
+    for error in report.errors:
+        print(f"  line {error['line']}: {error['message']}")
+    if report.failed > len(report.errors):
+        print(f'  ... {report.failed - len(report.errors)} more rows failed')
+    print(f'Done: {report.total} rows in {report.elapsed:.1f}s ({report.rows_per_second:.0f} rows/s), '
+          f'{report.inserted} inserted, {report.updated} updated, {report.failed} failed, '
+          f'{report.image_failures} images failed')
+
+
+if __name__ == '__main__':
+    main()
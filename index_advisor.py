@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Index advisor: EXPLAIN the hot catalog, order and user queries.
+
+Runs the planner on the query shapes used by APIService, the API and the
+admin controllers (product listings per sort and category, order lists
+per status, dashboard counts, exports, ...) and flags:
+
+- FULL SCAN: a table is read entirely (MySQL type=ALL, SQLite "SCAN
+  <table>" without an index, PostgreSQL "Seq Scan")
+- SORT: rows are sorted after reading (filesort / temp b-tree) instead of
+  being read in index order
+
+Plans depend on table sizes, so run it against a seeded database: either
+the configured one after seed_categories_products.py / import_products.py,
+or a scratch database filled with --seed (refused if it already has
+products). Exits with status 1 when a full scan is found.
+
+Usage:
+    python index_advisor.py
+    python index_advisor.py --database-url sqlite:///advisor.db --seed 20000
+    python index_advisor.py --verbose
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, func, or_, select
+
+from app.config import Config
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='EXPLAIN hot queries and flag full scans')
+    parser.add_argument('--database-url', help='SQLAlchemy database URL (default: configured database)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Products to generate into an empty database first (orders: 2x, users: 1/2)')
+    parser.add_argument('--verbose', action='store_true', help='Print the full plan of every query')
+    return parser.parse_args()
+
+
+def query_shapes():
+    """(name, statement) pairs mirroring the application's queries"""
+    from app.models import Product, Order, OrderItem, User, Banner, ProductRecommendation
+
+    now = datetime(2025, 6, 1)
+    category_id = 3
+    active = Product.is_active == True
+
+    def page(statement, *order):
+        return statement.order_by(*order).limit(20)
+
+    newest = (Product.created_at.desc(), Product.id.desc())
+    price_asc = (Product.price.asc(), Product.id.asc())
+    price_desc = (Product.price.desc(), Product.id.desc())
+
+    return [
+        ('products: active, newest (homepage, product list)',
+         page(select(Product.id).where(active), *newest)),
+        ('products: active in category, newest',
+         page(select(Product.id).where(active, Product.category_id == category_id), *newest)),
+        ('products: active, price ascending',
+         page(select(Product.id).where(active), *price_asc)),
+        ('products: active in category, price descending',
+         page(select(Product.id).where(active, Product.category_id == category_id), *price_desc)),
+        ('products: active, newest, keyset page',
+         page(select(Product.id).where(active, or_(
+             Product.created_at < now,
+             and_(Product.created_at == now, Product.id < 1000)
+         )), *newest)),
+        ('products: all, newest (admin list)',
+         page(select(Product.id), *newest)),
+        ('products: count active in category',
+         select(func.count()).select_from(Product).where(active, Product.category_id == category_id)),
+        ('orders: by status, newest (admin, API)',
+         select(Order.id).where(Order.status == 'pending').order_by(Order.created_at.desc()).limit(20)),
+        ('orders: newest (dashboard recent orders)',
+         select(Order.id).order_by(Order.created_at.desc()).limit(20)),
+        ('orders: count pending (dashboard)',
+         select(func.count()).select_from(Order).where(Order.status == 'pending')),
+        ('orders: created in date range (export)',
+         select(Order.id).where(Order.created_at >= now - timedelta(days=7), Order.created_at < now)),
+        ('order items: of an order',
+         select(OrderItem.id).where(OrderItem.order_id == 1000)),
+        ('order items: orders containing a product',
+         select(OrderItem.order_id).where(OrderItem.product_id == 42)),
+        ('users: newest (admin, API)',
+         select(User.id).order_by(User.created_at.desc()).limit(20)),
+        ('banners: active in display order',
+         select(Banner.id).where(Banner.is_active == True).order_by(Banner.sort_order)),
+        ('recommendations: of a product',
+         select(ProductRecommendation.recommended_id)
+         .where(ProductRecommendation.product_id == 42)
+         .order_by(ProductRecommendation.rank).limit(8)),
+    ]
+
+
+def explain(connection, statement):
+    """Plan lines and (full scan, sort) flags for a statement"""
+    dialect = connection.dialect
+    compiled = statement.compile(dialect=dialect)
+    params = compiled.construct_params()
+    # Raw DB-API execution: pass values the drivers understand natively
+    params = {key: str(value) if isinstance(value, datetime) else
+              float(value) if isinstance(value, Decimal) else value
+              for key, value in params.items()}
+    if compiled.positional:
+        params = tuple(params[key] for key in compiled.positiontup)
+    sql = str(compiled)
+
+    if dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+        lines = [row[-1] for row in rows]
+        full_scan = any(line.startswith('SCAN ') and ' USING ' not in line for line in lines)
+        sort = any('TEMP B-TREE' in line for line in lines)
+    elif dialect.name == 'mysql':
+        result = connection.exec_driver_sql('EXPLAIN ' + sql, params)
+        rows = [dict(row._mapping) for row in result]
+        lines = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} "
+                 f"extra={row['Extra']}" for row in rows]
+        full_scan = any(row['type'] == 'ALL' for row in rows)
+        sort = any('filesort' in (row['Extra'] or '') for row in rows)
+    else:
+        lines = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + sql, params)]
+        full_scan = any('Seq Scan' in line for line in lines)
+        sort = any(line.strip().startswith('Sort') or '->  Sort' in line for line in lines)
+    return lines, full_scan, sort
+
+
+def seed(app, products):
+    """Fill an empty database with synthetic catalog, order and user rows"""
+    from app import db
+    from app.models import Category, Product, Order, OrderItem, User, Banner
+
+    with app.app_context():
+        db.create_all()
+        if db.session.query(Product.id).first() is not None:
+            sys.exit('--seed needs an empty database (products table is not empty)')
+
+        rng = random.Random(42)
+        start = datetime(2024, 1, 1)
+        statuses = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+
+        categories = [{'id': i, 'name': f'category {i}', 'slug': f'category-{i}', 'sort_order': i,
+                       'is_active': True} for i in range(1, 21)]
+        db.session.execute(db.insert(Category), categories)
+        db.session.execute(db.insert(Banner), [
+            {'title': f'banner {i}', 'image': f'banners/{i}.webp', 'sort_order': i, 'is_active': i % 3 > 0}
+            for i in range(20)
+        ])
+        for first in range(0, products, 5000):
+            db.session.execute(db.insert(Product), [{
+                'id': i, 'name': f'product {i}', 'slug': f'product-{i}', 'price': rng.randint(10, 50000),
+                'stock': rng.randint(0, 100), 'category_id': rng.randint(1, len(categories)),
+                'is_active': rng.random() < 0.9, 'created_at': start + timedelta(minutes=i),
+            } for i in range(first + 1, min(first + 5000, products) + 1)])
+
+        users = max(1, products // 2)
+        db.session.execute(db.insert(User), [{
+            'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': '-',
+            'role': 'customer', 'created_at': start + timedelta(minutes=3 * i),
+        } for i in range(1, users + 1)])
+
+        orders = products * 2
+        for first in range(0, orders, 5000):
+            ids = range(first + 1, min(first + 5000, orders) + 1)
+            db.session.execute(db.insert(Order), [{
+                'id': i, 'user_id': rng.randint(1, users), 'order_number': f'ORD-{i:08d}',
+                'total_amount': 100, 'status': rng.choice(statuses), 'shipping_address': '-',
+                'shipping_name': '-', 'shipping_phone': '-', 'created_at': start + timedelta(minutes=i),
+            } for i in ids])
+            db.session.execute(db.insert(OrderItem), [{
+                'order_id': i, 'product_id': rng.randint(1, products), 'quantity': 1, 'price': 100,
+            } for i in ids for _ in range(rng.randint(1, 4))])
+        db.session.commit()
+
+        # Give the planner statistics for the new rows
+        with db.engine.begin() as connection:
+            if db.engine.dialect.name == 'mysql':
+                for table in ('products', 'orders', 'order_items', 'users', 'banners'):
+                    connection.exec_driver_sql(f'ANALYZE TABLE {table}')
+            else:
+                connection.exec_driver_sql('ANALYZE')
+        print(f'Seeded {products} products, {orders} orders, {users} users\n')
+
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        Config.SQLALCHEMY_DATABASE_URI = args.database_url
+    Config.SQLALCHEMY_ECHO = False
+
+    from app import create_app, db
+    app = create_app()
+    if args.seed:
+        seed(app, args.seed)
+
+    full_scans = 0
+    with app.app_context(), db.engine.connect() as connection:
+        print(f'Database: {db.engine.dialect.name}')
+        for name, statement in query_shapes():
+            lines, full_scan, sort = explain(connection, statement)
+            flags = [flag for flag, on in (('FULL SCAN', full_scan), ('SORT', sort)) if on]
+            full_scans += full_scan
+            print(f"  {' + '.join(flags) or 'ok':<18} {name}")
+            if args.verbose or flags:
+                for line in lines:
+                    print(f'      {line}')
+
+    print(f'\n{full_scans} queries with full scans')
+    sys.exit(1 if full_scans else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Add cart_lines table for the server-side cart store
+
+Revision ID: 3a9d2c71e5b8
+Revises: 7c1f9e2ab4d0
+Create Date: 2025-11-24 09:31:07.114520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a9d2c71e5b8'
+down_revision = '7c1f9e2ab4d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cart_lines',
+    sa.Column('token', sa.String(length=64), nullable=False),
+    sa.Column('product_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('image', sa.String(length=255), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('token', 'product_id')
+    )
+    with op.batch_alter_table('cart_lines', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cart_lines_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cart_lines', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cart_lines_updated_at'))
+
+    op.drop_table('cart_lines')
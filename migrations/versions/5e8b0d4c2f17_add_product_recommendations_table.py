@@ -0,0 +1,31 @@
+"""Add product_recommendations table for co-purchase recommendations
+
+Revision ID: 5e8b0d4c2f17
+Revises: 3a9d2c71e5b8
+Create Date: 2025-11-26 14:02:45.381907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b0d4c2f17'
+down_revision = '3a9d2c71e5b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_recommendations',
+    sa.Column('product_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('recommended_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('product_id', 'rank')
+    )
+
+
+def downgrade():
+    op.drop_table('product_recommendations')
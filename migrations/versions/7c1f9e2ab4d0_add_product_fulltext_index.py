@@ -0,0 +1,35 @@
+"""Add FULLTEXT index on product name and description
+
+Revision ID: 7c1f9e2ab4d0
+Revises: 044e5d1e7a71
+Create Date: 2025-11-20 10:12:41.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1f9e2ab4d0'
+down_revision = '044e5d1e7a71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT with the ngram parser is MySQL-only; other databases use
+    # the in-process search index instead
+    if op.get_bind().dialect.name != 'mysql':
+        return
+
+    op.create_index(
+        'ft_products_name_description', 'products', ['name', 'description'],
+        mysql_prefix='FULLTEXT', mysql_with_parser='ngram'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+
+    op.drop_index('ft_products_name_description', table_name='products')
@@ -0,0 +1,48 @@
+"""Add composite indexes for catalog, order and user list queries
+
+Revision ID: 9d41c6a0b7e3
+Revises: 5e8b0d4c2f17
+Create Date: 2025-11-28 16:45:12.904163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d41c6a0b7e3'
+down_revision = '5e8b0d4c2f17'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns); see python index_advisor.py for the queries they serve
+INDEXES = [
+    ('ix_products_active_created', 'products', ['is_active', 'created_at', 'id']),
+    ('ix_products_active_category_created', 'products', ['is_active', 'category_id', 'created_at', 'id']),
+    ('ix_products_active_price', 'products', ['is_active', 'price', 'id']),
+    ('ix_products_active_category_price', 'products', ['is_active', 'category_id', 'price', 'id']),
+    ('ix_orders_status_created', 'orders', ['status', 'created_at']),
+    ('ix_orders_created', 'orders', ['created_at']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_items_product_order', 'order_items', ['product_id', 'order_id']),
+    ('ix_users_created_at', 'users', ['created_at']),
+    ('ix_banners_active_sort', 'banners', ['is_active', 'sort_order']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        # MySQL dropped its implicit foreign key indexes on order_items when
+        # the new indexes took over; put them back before dropping ours
+        op.create_index('order_id', 'order_items', ['order_id'], unique=False)
+        op.create_index('product_id', 'order_items', ['product_id'], unique=False)
+
+    for name, table, columns in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
@@ -0,0 +1,28 @@
+"""Add products (created_at, id) index for the admin product list
+
+Revision ID: b62f4e9a1d05
+Revises: 9d41c6a0b7e3
+Create Date: 2025-12-02 10:21:37.512840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b62f4e9a1d05'
+down_revision = '9d41c6a0b7e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The admin list shows active and inactive products newest first; the
+    # is_active-prefixed indexes only serve it when a status is selected
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_created', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_created')
@@ -0,0 +1,114 @@
+import shutil
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.config import Config
+from app.models import Banner, Category, Product, User
+from app.utils.db_routing import _PROCESS_WRITE_KEY, use_replica
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Primary and replica as two SQLite files; the replica has an extra banner."""
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{primary}')
+    monkeypatch.setattr(Config, 'DB_REPLICA_URI', f'sqlite:///{replica}')
+    monkeypatch.setattr(Config, 'SQLALCHEMY_ECHO', False)
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(Config, 'IMPORT_FOLDER', str(tmp_path / 'imports'))
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(User(username='admin', email='admin@example.com', role='admin',
+                            password_hash=generate_password_hash('admin123')))
+        category = Category(name='3C', slug='3c')
+        db.session.add(category)
+        db.session.flush()
+        db.session.add(Product(name='筆記電腦', slug='laptop', price=100, stock=10,
+                               category_id=category.id, is_active=True))
+        db.session.add(Banner(title='primary', image='a.webp', sort_order=1, is_active=True))
+        db.session.commit()
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        shutil.copy(primary, replica)
+        # The seed rows are on the replica too: no replication lag to wait for
+        app.extensions.pop(_PROCESS_WRITE_KEY, None)
+        with db.engines['replica'].begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO banners (title, image, sort_order, is_active) VALUES ('replica', 'b.webp', 2, 1)"
+            )
+    return app
+
+
+def _banner_titles(client):
+    return [banner['title'] for banner in client.get('/api/v1/banners').get_json()['data']]
+
+
+def _product_names(client, per_page=50):
+    response = client.get(f'/api/v1/products?per_page={per_page}')
+    return [product['name'] for product in response.get_json()['data']], response.headers.get('X-Cache')
+
+
+def _admin_client(app):
+    client = app.test_client()
+    response = client.post('/api/v1/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 200
+    return client
+
+
+def _rename_product(client, name):
+    response = client.put('/api/v1/products/1', data={
+        'name': name, 'price': '100', 'stock': '10', 'category_id': '1', 'is_active': 'true'
+    })
+    assert response.status_code == 200
+
+
+def test_use_replica_reads_go_to_the_replica(app):
+    client = app.test_client()
+    assert _banner_titles(client) == ['primary', 'replica']
+    # Banner detail isn't routed: the replica-only row doesn't exist there
+    assert client.get('/api/v1/banners/2').status_code == 404
+
+
+def test_reads_after_a_write_in_the_request_use_the_primary(app):
+    with app.test_request_context():
+        with use_replica():
+            assert db.session.query(Banner).count() == 2
+            db.session.add(Banner(title='new', image='c.webp', sort_order=3))
+            db.session.flush()
+            assert [banner.title for banner in db.session.query(Banner).order_by(Banner.id)] == \
+                ['primary', 'new']
+        db.session.rollback()
+
+
+def test_writer_stays_on_the_primary_for_the_sticky_window(app):
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    admin, visitor = _admin_client(app), app.test_client()
+    _rename_product(admin, '新名稱')
+
+    assert _banner_titles(admin) == ['primary']
+    assert _product_names(admin)[0] == ['新名稱']
+    # Other visitors keep reading the (lagging) replica
+    assert _product_names(visitor)[0] == ['筆記電腦']
+
+    app.config['REPLICA_STICKY_SECONDS'] = 0
+    assert _banner_titles(admin) == ['primary', 'replica']
+
+
+def test_cache_refill_after_a_write_uses_the_primary(app):
+    admin, visitor = _admin_client(app), app.test_client()
+    assert _product_names(visitor) == (['筆記電腦'], 'MISS')
+    assert _product_names(visitor) == (['筆記電腦'], 'HIT')
+
+    _rename_product(admin, '新名稱')
+    # Refilled from the primary, so the cache doesn't keep the replica's old row
+    assert _product_names(visitor) == (['新名稱'], 'MISS')
+    assert _product_names(visitor) == (['新名稱'], 'HIT')
+
+    app.config['REPLICA_STICKY_SECONDS'] = 0
+    assert _product_names(visitor, per_page=20) == (['筆記電腦'], 'MISS')
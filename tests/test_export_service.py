@@ -0,0 +1,41 @@
+import csv
+import io
+from decimal import Decimal
+
+from app.services.export_service import ORDER_COLUMNS, _csv_chunks
+
+
+def _order(**values):
+    order = {column: None for column in ORDER_COLUMNS}
+    order.update(id=1, order_number='ORD-1', status='pending', total_amount=Decimal('-5'))
+    order.update(values)
+    order.setdefault('items', [])
+    return order
+
+
+def _rows(entity, records):
+    text = ''.join(_csv_chunks(entity, iter(records), 100)).lstrip('\ufeff')
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def test_csv_escapes_formula_cells():
+    order = _order(shipping_name='=cmd|x', notes='+1+1', shipping_address='@SUM(A1)',
+                   shipping_phone='-2', shipping_email='\tx',
+                   items=[{'product_id': 1, 'product_name': '=HYPERLINK("x")', 'quantity': 1, 'price': 1}])
+    row, = _rows('orders', [order])
+    assert row['shipping_name'] == "'=cmd|x"
+    assert row['notes'] == "'+1+1"
+    assert row['shipping_address'] == "'@SUM(A1)"
+    assert row['shipping_phone'] == "'-2"
+    assert row['shipping_email'] == "'\tx"
+    assert row['item_product_name'] == "'=HYPERLINK(\"x\")"
+
+
+def test_csv_keeps_plain_and_numeric_cells():
+    product = {'id': 1, 'name': '筆記電腦 a=b', 'slug': 'p1', 'price': Decimal('-1'), 'stock': -3,
+               'category_id': None, 'category_name': None, 'is_active': True,
+               'created_at': None, 'updated_at': None}
+    row, = _rows('products', [product])
+    assert row['name'] == '筆記電腦 a=b'
+    assert row['price'] == '-1'
+    assert row['stock'] == '-3'
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from app import create_app, db
+from app.config import Config
+from app.models import Category, Product
+from app.services.response_cache import (MemoryResponseStore, RedisResponseStore, ResponseCache,
+                                         TAG_PRODUCTS, product_tag)
+from app.services.stock_service import StockService
+
+
+class LocalRedis:
+    """Stand-in for a Redis server: the get/set/mget/incr subset the store uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "shop.db"}')
+    monkeypatch.setattr(Config, 'SQLALCHEMY_ECHO', False)
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(Config, 'IMPORT_FOLDER', str(tmp_path / 'imports'))
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all(bind_key=None)
+        category = Category(name='3C', slug='3c')
+        db.session.add(category)
+        db.session.flush()
+        for i in range(3):
+            db.session.add(Product(name=f'產品 {i}', slug=f'p{i}', price=100, stock=10,
+                                   category_id=category.id, is_active=True))
+        db.session.commit()
+    return app
+
+
+def _entry(body, versions):
+    return {'body': body, 'status': 200, 'mimetype': 'application/json', 'etag': 'e', 'versions': versions}
+
+
+def test_shared_store_is_seen_by_every_process():
+    server = LocalRedis()
+    first = ResponseCache(MemoryResponseStore(10), RedisResponseStore(server))
+    second = ResponseCache(MemoryResponseStore(10), RedisResponseStore(server))
+
+    versions = first.tag_versions([TAG_PRODUCTS])
+    first.set('key', _entry(b'{"a":1}', versions))
+    assert second.get('key', second.tag_versions([TAG_PRODUCTS]))['body'] == b'{"a":1}'
+
+    first.bump([TAG_PRODUCTS])
+    assert second.tag_versions([TAG_PRODUCTS]) == [versions[0] + 1]
+    assert second.get('key', second.tag_versions([TAG_PRODUCTS])) is None
+
+
+def test_shared_tags_are_bumped_again_after_the_replica_window(app):
+    server = LocalRedis()
+    cache = ResponseCache(MemoryResponseStore(10), RedisResponseStore(server), rebump_after=0.05)
+    with app.app_context():
+        cache.bump([TAG_PRODUCTS])
+    assert cache.tag_versions([TAG_PRODUCTS]) == [1]
+    time.sleep(0.2)
+    assert cache.tag_versions([TAG_PRODUCTS]) == [2]
+
+
+def test_stock_reservation_only_invalidates_the_reserved_products(app):
+    client = app.test_client()
+    for product_id in (1, 2):
+        assert client.get(f'/api/v1/products/{product_id}').headers['X-Cache'] == 'MISS'
+
+    with app.app_context():
+        versions = app.extensions['response_cache'].tag_versions([product_tag(1), product_tag(2)])
+        StockService.reserve([(2, 3)])
+        db.session.commit()
+        assert app.extensions['response_cache'].tag_versions([product_tag(1), product_tag(2)]) == \
+            [versions[0], versions[1] + 1]
+
+    assert client.get('/api/v1/products/1').headers['X-Cache'] == 'HIT'
+    response = client.get('/api/v1/products/2')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['data']['stock'] == 7